@@ -0,0 +1,48 @@
+"""meal plan jobs
+
+Revision ID: a4e2c9d7b1f0
+Revises: d3a8f61c5e72
+Create Date: 2026-10-19 18:05:27.640113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e2c9d7b1f0'
+down_revision: Union[str, None] = 'd3a8f61c5e72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('meal_plan_jobs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'running', 'succeeded', 'failed', name='mealplanjobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('locked_until', sa.TIMESTAMP(), nullable=True),
+    sa.Column('meal_plan_id', sa.Integer(), nullable=True),
+    sa.Column('generation_status', sa.String(length=30), nullable=True),
+    sa.Column('error_code', sa.String(length=64), nullable=True),
+    sa.Column('error_message', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+    sa.Column('started_at', sa.TIMESTAMP(), nullable=True),
+    sa.Column('finished_at', sa.TIMESTAMP(), nullable=True),
+    sa.ForeignKeyConstraint(['meal_plan_id'], ['meal_plans.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_meal_plan_jobs_status_locked_until', 'meal_plan_jobs', ['status', 'locked_until'], unique=False)
+    op.create_index('ix_meal_plan_jobs_user_id', 'meal_plan_jobs', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_meal_plan_jobs_user_id', table_name='meal_plan_jobs')
+    op.drop_index('ix_meal_plan_jobs_status_locked_until', table_name='meal_plan_jobs')
+    op.drop_table('meal_plan_jobs')
@@ -0,0 +1,32 @@
+"""precomputed meal plans
+
+Revision ID: b5d2e8f4a137
+Revises: c81f5b3e9a04
+Create Date: 2026-10-19 21:02:17.518330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2e8f4a137'
+down_revision: Union[str, None] = 'c81f5b3e9a04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('meal_plans', sa.Column('is_precomputed', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('meal_plans', sa.Column('preferences_fingerprint', sa.String(length=64), nullable=True))
+    op.create_index('ix_meal_plans_is_precomputed_created_at', 'meal_plans', ['is_precomputed', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_meal_plans_is_precomputed_created_at', table_name='meal_plans')
+    op.drop_column('meal_plans', 'preferences_fingerprint')
+    op.drop_column('meal_plans', 'is_precomputed')
@@ -0,0 +1,106 @@
+"""recipe filter flags
+
+Revision ID: b7c41e9d2f3a
+Revises: 6bdefcb17752
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core import recipe_flags
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c41e9d2f3a'
+down_revision: Union[str, None] = '6bdefcb17752'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+recipes = sa.table(
+    'recipes',
+    sa.column('id', sa.Integer), sa.column('vegetarian', sa.Boolean), sa.column('vegan', sa.Boolean),
+    sa.column('gluten_free', sa.Boolean), sa.column('dairy_free', sa.Boolean), sa.column('low_fodmap', sa.Boolean),
+    sa.column('diet_flags', sa.BigInteger), sa.column('dish_type_flags', sa.BigInteger), sa.column('cuisine_flags', sa.BigInteger),
+)
+recipes_diet_types = sa.table('recipes_diet_types', sa.column('recipe_id', sa.Integer), sa.column('diet_type_id', sa.Integer))
+diet_types = sa.table('diet_types', sa.column('id', sa.Integer), sa.column('name', sa.String))
+recipes_dish_types = sa.table('recipes_dish_types', sa.column('recipe_id', sa.Integer), sa.column('dish_type_id', sa.Integer))
+dish_types = sa.table('dish_types', sa.column('id', sa.Integer), sa.column('name', sa.String))
+recipes_cuisines = sa.table('recipes_cuisines', sa.column('recipe_id', sa.Integer), sa.column('cuisine_id', sa.Integer))
+cuisine_regions = sa.table('cuisine_regions', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+
+def _names_by_recipe(connection, recipe_column, foreign_key, name_table, first_id, last_id):
+    names = defaultdict(list)
+    rows = connection.execute(
+        sa.select(recipe_column, name_table.c.name)
+        .join(name_table, name_table.c.id == foreign_key)
+        .where(recipe_column.between(first_id, last_id))
+    )
+    for recipe_id, name in rows:
+        names[recipe_id].append(name)
+    return names
+
+
+def backfill_flags(connection):
+    """Computes the flags of the existing recipes in id batches"""
+    last_seen = 0
+    while True:
+        rows = connection.execute(
+            sa.select(recipes.c.id, recipes.c.vegetarian, recipes.c.vegan, recipes.c.gluten_free, recipes.c.dairy_free, recipes.c.low_fodmap)
+            .where(recipes.c.id > last_seen)
+            .order_by(recipes.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        first_id, last_id = rows[0].id, rows[-1].id
+        diets = _names_by_recipe(connection, recipes_diet_types.c.recipe_id, recipes_diet_types.c.diet_type_id, diet_types, first_id, last_id)
+        dishes = _names_by_recipe(connection, recipes_dish_types.c.recipe_id, recipes_dish_types.c.dish_type_id, dish_types, first_id, last_id)
+        cuisines = _names_by_recipe(connection, recipes_cuisines.c.recipe_id, recipes_cuisines.c.cuisine_id, cuisine_regions, first_id, last_id)
+
+        connection.execute(
+            recipes.update().where(recipes.c.id == sa.bindparam('recipe_id')).values(
+                diet_flags=sa.bindparam('diet'), dish_type_flags=sa.bindparam('dish'), cuisine_flags=sa.bindparam('cuisine'),
+            ),
+            [
+                {
+                    'recipe_id': row.id,
+                    'diet': recipe_flags.diet_flags(
+                        diets[row.id], vegetarian=row.vegetarian, vegan=row.vegan, gluten_free=row.gluten_free,
+                        dairy_free=row.dairy_free, low_fodmap=row.low_fodmap,
+                    ),
+                    'dish': recipe_flags.dish_type_flags(dishes[row.id]),
+                    'cuisine': recipe_flags.cuisine_flags(cuisines[row.id]),
+                }
+                for row in rows
+            ],
+        )
+        last_seen = last_id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('recipes', sa.Column('diet_flags', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('recipes', sa.Column('dish_type_flags', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('recipes', sa.Column('cuisine_flags', sa.BigInteger(), server_default='0', nullable=False))
+    backfill_flags(op.get_bind())
+    op.create_index(
+        'ix_recipes_suggestions', 'recipes',
+        ['health_score', 'spoonacular_score', 'dish_type_flags', 'diet_flags', 'cuisine_flags', 'calories'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_recipes_suggestions', table_name='recipes')
+    op.drop_column('recipes', 'cuisine_flags')
+    op.drop_column('recipes', 'dish_type_flags')
+    op.drop_column('recipes', 'diet_flags')
@@ -0,0 +1,39 @@
+"""ingredient allergens
+
+Revision ID: d3a8f61c5e72
+Revises: b7c41e9d2f3a
+Create Date: 2026-10-19 15:40:03.582917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f61c5e72'
+down_revision: Union[str, None] = 'b7c41e9d2f3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingredient_allergens',
+    sa.Column('ingredient_id', sa.Integer(), nullable=False),
+    sa.Column('intolerance_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ingredient_id'], ['ingredients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['intolerance_id'], ['intolerances.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ingredient_id', 'intolerance_id')
+    )
+    op.add_column('ingredients', sa.Column('allergens_tagged', sa.Boolean(), server_default='0', nullable=False))
+    # NULL until app.scripts.tag_recipe_allergens tags the existing recipes
+    op.add_column('recipes', sa.Column('allergen_flags', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('recipes', 'allergen_flags')
+    op.drop_column('ingredients', 'allergens_tagged')
+    op.drop_table('ingredient_allergens')
@@ -0,0 +1,35 @@
+"""one active meal plan job per user
+
+Revision ID: d9f3a6c1e842
+Revises: b5d2e8f4a137
+Create Date: 2026-10-20 10:14:32.806214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f3a6c1e842'
+down_revision: Union[str, None] = 'b5d2e8f4a137'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('meal_plan_jobs', sa.Column('active_user_id', sa.Integer(), nullable=True))
+    # Latest active job of each user (the derived table lets MySQL read the table it updates)
+    op.execute(
+        "UPDATE meal_plan_jobs SET active_user_id = user_id WHERE id IN ("
+        "SELECT id FROM (SELECT MAX(id) AS id FROM meal_plan_jobs WHERE status IN ('pending', 'running') GROUP BY user_id) AS latest)"
+    )
+    op.create_unique_constraint('uq_meal_plan_jobs_active_user_id', 'meal_plan_jobs', ['active_user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_meal_plan_jobs_active_user_id', 'meal_plan_jobs', type_='unique')
+    op.drop_column('meal_plan_jobs', 'active_user_id')
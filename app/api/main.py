@@ -1,16 +1,23 @@
+import asyncio
+from contextlib import asynccontextmanager
 import logging
 from fastapi import FastAPI
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import feedback, recipes, shopping_lists, tasks, users, auth, users_preferences, meal_plans, waitlist
+from app.api.routes import feedback, home, metrics, recipes, shopping_lists, tasks, users, auth, users_preferences, meal_plans, waitlist
+from app.core.compression import CompressionMiddleware
+from app.core.concurrency import monitor_event_loop_lag, run_blocking
 from app.core.config import get_settings
-from app.core.logging_config import setup_logging
+from app.core.metrics import REQUEST_LATENCY
+from app.core.logging_config import get_request_id, request_id_var, setup_logging
 from app.core.rate_limiter import limiter
+from app.core.request_metrics import RequestMetrics, request_metrics_var
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.middleware import SlowAPIMiddleware
 from slowapi.errors import RateLimitExceeded
-from app.db.db_connection import init_db
+from app.services.meal_plan_jobs import meal_plan_job_worker
+from app.db.db_connection import close_db, init_db, warmup_db_pool
 
 
 
@@ -19,11 +26,32 @@ logger = logging.getLogger(__name__)
 
 init_db()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    if settings.db_pool_warmup_connections > 0:
+        await run_blocking(warmup_db_pool, settings.db_pool_warmup_connections)
+
+    lag_monitor = asyncio.create_task(
+        monitor_event_loop_lag(settings.event_loop_lag_interval_seconds, settings.event_loop_lag_warning_ms)
+    )
+    if settings.meal_plan_job_workers > 0:
+        meal_plan_job_worker.start(settings.meal_plan_job_workers, settings.meal_plan_job_poll_seconds)
+    yield
+    await meal_plan_job_worker.stop()
+    lag_monitor.cancel()
+    close_db()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Limiter Configuration
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=get_settings().compression_minimum_size,
+    thread_threshold=get_settings().compression_thread_threshold,
+)
 
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -35,20 +63,39 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 @app.middleware("http")
 async def log_requests_and_errors_middleware(request: Request, call_next) -> Response | JSONResponse:
+    request_id = get_request_id(request)
+    token = request_id_var.set(request_id)
+    request_metrics = RequestMetrics()
+    metrics_token = request_metrics_var.set(request_metrics)
     logger.info(f"Incoming request: {request.method} {request.url.path}")
     try:
-        response = await call_next(request)
-        logger.info(f"Request finished: {request.method} {request.url.path} - Status {response.status_code}")
-        return response
-    except Exception as e:
-        logger.error(
-            f"Unhandled error during the request {request.method} {request.url.path}",
-            exc_info=True
-        )
-        return JSONResponse(
-            status_code=500,
-            content={"detail": f"Internal server error: {str(e)}"},
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            logger.error(f"Unhandled error during the request {request.method} {request.url.path}", exc_info=True)
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": f"Internal server error: {str(e)}"},
+            )
+
+        summary = request_metrics.summary()
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            method=request.method, route=route.path if route else "unmatched", status=response.status_code
+        ).observe(summary["total_ms"] / 1000)
+        logger.info(
+            f"Request finished: {request.method} {request.url.path} - Status {response.status_code} "
+            f"in {summary['total_ms']:.1f} ms ({request_metrics.count('db')} DB queries)",
+            extra={"metrics": {"method": request.method, "path": request.url.path, "status": response.status_code, **summary}},
         )
+    finally:
+        request_metrics_var.reset(metrics_token)
+        request_id_var.reset(token)
+
+    response.headers["X-Request-ID"] = request_id
+    if settings.server_timing_enabled:
+        response.headers["Server-Timing"] = request_metrics.server_timing()
+    return response
 
     
 ### CORS configuration
@@ -62,6 +109,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"], 
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(users.router)
@@ -73,6 +121,8 @@ app.include_router(shopping_lists.router)
 app.include_router(tasks.router)
 app.include_router(waitlist.router)
 app.include_router(feedback.router)
+app.include_router(home.router)
+app.include_router(metrics.router)
 
 @app.get("/", summary="Endpoint to check API status")
 def read_root():
@@ -0,0 +1,25 @@
+import logging
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from app.core.auth import get_current_user, get_language
+from app.core.concurrency import run_blocking
+from app.db.db_connection import get_db
+from app.models.user import User
+from app.schemas.home import HomeResponse
+from app.services.home import build_home_payload
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["home"], prefix="/home")
+
+
+@router.get("", response_model=HomeResponse)
+async def get_home(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    language: str = Depends(get_language)
+):
+    """Endpoint with everything the app needs on launch, instead of the profile, meal plan and shopping list calls"""
+    logger.info(f"User ID: {current_user.id} ({current_user.username}) is loading their home screen.")
+    return ORJSONResponse(await run_blocking(build_home_payload, db, current_user, language))
@@ -1,45 +1,165 @@
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from app.core.concurrency import run_blocking
+from app.core.config import Settings, get_settings
 from app.core.errors import ErrorCode
 from app.crud.meal_item import create_db_meal_item, get_complete_meal_item_by_id, get_meal_item_by_id
-from app.crud.meal_plan import get_latest_meal_plan_for_user, get_meal_plan_by_id
+from app.crud.idempotency_key import get_idempotency_key, save_idempotency_key
+from app.crud.meal_plan import get_latest_meal_plan_for_user, get_meal_plan_by_id, get_meal_plan_for_response
 from app.crud.recipe import get_recipe_by_id
-from app.crud.user_preferences import get_user_preferences_by_user_id
+from app.crud.user_preferences import get_user_preferences_details
 from app.db.db_connection import get_db
 from app.core.auth import get_current_user, get_language
 from app.models.user import User
 from app.schemas.common import SuccessResponse
-from app.schemas.meal_plan import MealItemCreate, MealPlanResponse, GeneratedMealResponse, SlotMealResponse
+from app.schemas.meal_plan import MealItemCreate, MealPlanJobResponse, MealPlanResponse, GeneratedMealResponse, SlotMealResponse
 from app.schemas.recipe import RecipeId, RecipeShort
-from app.services.meal_plan import generate_meal_plan_for_user, get_meal_replacement_suggestions, meal_plan_to_response
+from app.services.meal_plan import generate_meal_plan_once, get_meal_replacement_suggestions, meal_plan_to_response
+from app.services.meal_plan_jobs import (
+    JOB_RECHECK_SECONDS,
+    enqueue_meal_plan_job,
+    is_active,
+    join_active_meal_plan_job,
+    meal_plan_job_snapshot,
+    meal_plan_job_worker,
+    wait_for_meal_plan_job,
+)
 from app.services.recipe import serialize_recipe_short, serialize_recipe_short_list
 from app.services.spoonacular import SpoonacularService
+from app.utils.cursor import InvalidCursorError, decode_cursor, encode_cursor
 from app.core.rate_limiter import limiter
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["meal_plans"], prefix="/meal_plans")
 
-@router.post("/generate", response_model=GeneratedMealResponse)
+GENERATE_ENDPOINT = "POST /meal_plans/generate"
+# Clients reconnect to the event stream after this
+JOB_STREAM_SECONDS = 120.0
+
+
+@router.post("/generate", response_model=GeneratedMealResponse, responses={202: {"model": MealPlanJobResponse}})
 @limiter.limit("10/minute")
 async def generate_meal_plan(
     request: Request,
+    prefer: str | None = Header(None),
+    idempotency_key: str | None = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    lang: str = Depends(get_language),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Endpoint to generate a meal plan for the user. With 'Prefer: respond-async' the generation runs
+    as a background job and the response is a 202 with the job to follow at its Location.
+    A repeated 'Idempotency-Key' gets the stored response of the first request back
+    """
+    user_id = current_user.id
+    logger.info(f"Meal plan generation requested by user ID: {user_id} ({current_user.username})")
+    if idempotency_key:
+        stored = await run_blocking(get_idempotency_key, db, user_id, idempotency_key)
+        if stored is not None:
+            logger.info(f"Replaying the stored meal plan generation response for user ID {user_id}.")
+            return _generate_response(stored.response_body, stored.status_code, replayed=True)
+
+    if prefer and "respond-async" in prefer.lower():
+        job = await run_blocking(enqueue_meal_plan_job, db, user_id)
+        meal_plan_job_worker.notify()
+        body, status_code = {"job_id": job.id, "status": job.status.value, "result": None, "error": None}, 202
+    else:
+        job_snapshot = await join_active_meal_plan_job(db, user_id, lang, settings.meal_plan_generate_budget_seconds)
+        if job_snapshot is not None:
+            body, status_code = _joined_job_result(user_id, job_snapshot), 200
+        else:
+            meal_plan_id, status = await generate_meal_plan_once(db, user_id, settings.meal_plan_generate_budget_seconds)
+            db_meal_plan = await run_blocking(get_meal_plan_for_response, db, meal_plan_id)
+            logger.info(f"Meal plan generation for user ID {user_id} completed with status: {status.value}")
+            # Built from our own rows: returned as is instead of validating it against GeneratedMealResponse again
+            body, status_code = {"meal_plan": meal_plan_to_response(db_meal_plan, lang), "status": status.value}, 200
+
+    if idempotency_key:
+        await run_blocking(
+            save_idempotency_key, db, user_id, idempotency_key, GENERATE_ENDPOINT, status_code, body, settings.idempotency_key_ttl_seconds
+        )
+    return _generate_response(body, status_code)
+
+
+def _joined_job_result(user_id: int, snapshot: dict) -> dict:
+    """The generate response of a joined job, or the error a synchronous generation would have raised"""
+    if snapshot["result"] is not None:
+        return snapshot["result"]
+    if is_active(snapshot):
+        logger.warning(f"Meal plan job {snapshot['job_id']} of user ID {user_id} did not finish within the generation budget.")
+        raise HTTPException(
+            status_code=503,
+            detail={"code": ErrorCode.MEAL_PLAN_DEADLINE_EXCEEDED, "message": "The meal plan generation in progress did not finish in time"}
+        )
+    error = snapshot["error"] or {"code": ErrorCode.INTERNAL_SERVER_ERROR, "message": "Could not generate meal plan"}
+    status_code = {ErrorCode.MEAL_PLAN_DEADLINE_EXCEEDED: 503, ErrorCode.INTERNAL_SERVER_ERROR: 500}.get(error["code"], 400)
+    raise HTTPException(status_code=status_code, detail=error)
+
+
+def _generate_response(body: dict, status_code: int, replayed: bool = False) -> ORJSONResponse:
+    headers = {"Idempotent-Replayed": "true"} if replayed else {}
+    if status_code == 202:
+        headers.update({"Location": f"/meal_plans/jobs/{body['job_id']}", "Preference-Applied": "respond-async"})
+    return ORJSONResponse(body, status_code=status_code, headers=headers)
+
+
+@router.get("/jobs/{job_id}", response_model=MealPlanJobResponse)
+async def get_meal_plan_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to hold the request while the job is pending or running"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     lang: str = Depends(get_language)
 ):
-    """Endpoint to generate a meal plan for the user"""
-    logger.info(f"Meal plan generation requested by user ID: {current_user.id} ({current_user.username})")
-    db_meal_plan, status = await generate_meal_plan_for_user(db, current_user.id)
-    meal_plan_response = meal_plan_to_response(db_meal_plan, lang)
-    logger.info(f"Meal plan generation for user ID {current_user.id} completed with status: {status.value}")
-    return GeneratedMealResponse(
-        meal_plan=meal_plan_response,
-        status=status.value
-    )
+    """Endpoint to follow a meal plan generation job, long polling with 'wait'"""
+    user_id = current_user.id
+    snapshot = await wait_for_meal_plan_job(db, job_id, user_id, lang, wait)
+    if snapshot is None:
+        logger.warning(f"Meal plan job {job_id} not found for user ID {user_id}.")
+        raise HTTPException(status_code=404, detail={"code": ErrorCode.MEAL_PLAN_JOB_NOT_FOUND, "message": "Meal plan job not found"})
+    return ORJSONResponse(snapshot)
+
+
+@router.get("/jobs/{job_id}/events", response_class=StreamingResponse)
+async def stream_meal_plan_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    lang: str = Depends(get_language)
+):
+    """Endpoint streaming a meal plan generation job as server-sent events: one per status, the last one with the result"""
+    user_id = current_user.id
+    snapshot = await run_blocking(meal_plan_job_snapshot, db, job_id, user_id, lang)
+    if snapshot is None:
+        logger.warning(f"Meal plan job {job_id} not found for user ID {user_id}.")
+        raise HTTPException(status_code=404, detail={"code": ErrorCode.MEAL_PLAN_JOB_NOT_FOUND, "message": "Meal plan job not found"})
+
+    async def events(last: dict):
+        yield _server_sent_event(last)
+        deadline = asyncio.get_running_loop().time() + JOB_STREAM_SECONDS
+        while is_active(last) and asyncio.get_running_loop().time() < deadline:
+            await meal_plan_job_worker.wait_for_update(job_id, JOB_RECHECK_SECONDS)
+            current = await run_blocking(meal_plan_job_snapshot, db, job_id, user_id, lang)
+            if current is None:
+                return
+            if current != last:
+                yield _server_sent_event(current)
+                last = current
+
+    return StreamingResponse(events(snapshot), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def _server_sent_event(snapshot: dict) -> bytes:
+    return b"event: " + snapshot["status"].encode() + b"\ndata: " + orjson.dumps(snapshot) + b"\n\n"
+
 
-    
 @router.get("/me", response_model=MealPlanResponse)
 def get_my_meal_plan(
     db: Session = Depends(get_db),
@@ -56,7 +176,7 @@ def get_my_meal_plan(
             status_code=404,
             detail={"code": ErrorCode.MEAL_PLAN_NOT_FOUND, "message": "No meal plan found for this user"}
         )
-    return meal_plan_to_response(meal_plan, lang)
+    return ORJSONResponse(meal_plan_to_response(meal_plan, lang))
 
 @router.delete("/me", response_model=SuccessResponse)
 def delete_my_meal_plan(
@@ -85,18 +205,30 @@ def delete_my_meal_plan(
 @limiter.limit("60/minute")
 async def get_meal_suggestions(
     request: Request,
+    response: Response,
     meal_item_id: int | None = Query(None),
     day_index: int | None = Query(None, ge=0, le=6),
     slot: int | None = Query(None, ge=0),
     meal_type: str | None = Query(None),
     limit: int = Query(10, ge=1, le=40),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Deprecated: use the cursor from the X-Next-Cursor header"),
+    cursor: str | None = Query(None, max_length=200),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     lang: str = Depends(get_language)
 ):
+    """
+    Endpoint to get a page of recipe suggestions. When there are more, the X-Next-Cursor header
+    holds the cursor of the next page, which also keeps the shuffle of the pages stable.
+    """
     logger.info(f"User ID: {current_user.id} ({current_user.username}) is requesting meal suggestions.")
-    preferences = get_user_preferences_by_user_id(db, current_user.id)
+    page_cursor = None
+    if cursor:
+        try:
+            page_cursor = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail={"code": ErrorCode.INVALID_CURSOR, "message": "Invalid pagination cursor"})
+    preferences = await run_blocking(get_user_preferences_details, db, current_user.id)
     if not preferences:
         logger.warning(f"Suggestions request failed for user ID {current_user.id} ({current_user.username}): Preferences not found.")
         raise HTTPException(status_code=404, detail="User preferences not found")
@@ -105,7 +237,7 @@ async def get_meal_suggestions(
     meal_to_replace = None
     if meal_item_id:
         logger.info(f"Getting suggestions to replace meal_item_id: {meal_item_id}")
-        db_meal_item = get_complete_meal_item_by_id(db, meal_item_id)
+        db_meal_item = await run_blocking(get_complete_meal_item_by_id, db, meal_item_id)
         
         if not db_meal_item:
             logger.warning(f"Suggestions request failed: Meal item ID {meal_item_id} not found.")
@@ -125,9 +257,17 @@ async def get_meal_suggestions(
         logger.warning(f"Bad request for suggestions from user ID {current_user.id}({current_user.username}): incorrect parameters.")
         raise HTTPException(status_code=400, detail="Either meal_item_id or (day_index and slot) must be provided")
     
-    recipe_suggestions = await get_meal_replacement_suggestions(db, preferences, meal_to_replace, type_to_search, limit, offset )
-        
-    return serialize_recipe_short_list(recipe_suggestions, lang)
+    try:
+        recipe_suggestions, next_cursor = await get_meal_replacement_suggestions(
+            db, preferences, meal_to_replace, type_to_search, limit, offset, page_cursor
+        )
+    except InvalidCursorError:
+        logger.info(f"Suggestions cursor of user ID {current_user.id} points to a deleted recipe.")
+        raise HTTPException(status_code=400, detail={"code": ErrorCode.INVALID_CURSOR, "message": "Invalid pagination cursor"})
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_cursor)
+
+    return await run_blocking(serialize_recipe_short_list, recipe_suggestions, lang)
 
 @router.post("/meal_items", response_model=SlotMealResponse, status_code=201)
 def create_meal_item(
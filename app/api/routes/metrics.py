@@ -0,0 +1,18 @@
+import logging
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from app.core.config import get_settings
+from app.core.metrics import render_metrics
+
+router = APIRouter(tags=["Metrics"])
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@router.get("/metrics", summary="Prometheus metrics of all the workers", include_in_schema=False)
+def get_metrics(authorization: str | None = Header(None)):
+    if not settings.metrics_auth_token or authorization != f"Bearer {settings.metrics_auth_token}":
+        logger.warning("Unauthorized attempt to read the metrics.")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
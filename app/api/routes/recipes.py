@@ -1,19 +1,26 @@
 
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from app.core.auth import get_current_user, get_language
 from app.core.config import Settings, get_settings
 from app.core.errors import ErrorCode
-from app.crud.recipe import get_recipe_by_id, get_recipe_details, get_recipes_by_creator_id
+from app.crud.recipe import get_recipe_by_id, get_recipes_by_creator_id
 from app.db.db_connection import get_db
 from app.models.meal_item import MealItem
 from app.models.user import User
 from app.schemas.common import SuccessResponse
 from app.schemas.image_uploader import UploadURLRequest, UploadURLResponse
-from app.schemas.recipe import RecipeCreate, RecipeDetailResponse, RecipeUpdate, RecipesListResponse
+from app.schemas.recipe import (
+    MAX_BATCH_RECIPES, RecipeCreate, RecipeDetailResponse, RecipeDetailsBatchRequest, RecipeDetailsBatchResponse, RecipeUpdate,
+    RecipesListResponse,
+)
 from app.services.image_uploader import ImageUploaderService
-from app.services.recipe import create_recipe_from_user_input, serialize_recipe_detail, serialize_recipe_short_list, update_recipe_in_db
+from app.services.recipe import (
+    create_recipe_from_user_input, get_recipe_detail_payload, invalidate_recipe_detail_payload, parse_recipe_detail_fields,
+    serialize_recipe_detail, serialize_recipe_details, serialize_recipe_short_list, update_recipe_in_db,
+)
 from app.core.rate_limiter import limiter
 
 logger = logging.getLogger(__name__)
@@ -62,24 +69,69 @@ def get_my_recipes(
     
     return RecipesListResponse(recipes=translated_recipes)
 
+@router.get("", response_model=RecipeDetailsBatchResponse)
+def get_recipes_batch(
+    ids: str = Query(..., description="Comma separated recipe ids"),
+    fields: str | None = Query(None, description="Comma separated RecipeDetailResponse fields, all of them by default"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    language: str = Depends(get_language)
+):
+    """Endpoint to get the details of many recipes at once, e.g. every meal of the week"""
+    try:
+        recipe_ids = [int(recipe_id) for recipe_id in ids.split(",") if recipe_id.strip()]
+    except ValueError:
+        recipe_ids = []
+    if not recipe_ids or len(recipe_ids) > MAX_BATCH_RECIPES:
+        logger.warning(f"User ID: {current_user.id} ({current_user.username}) sent an invalid recipe batch: '{ids}'.")
+        raise HTTPException(
+            status_code=400,
+            detail={"code": ErrorCode.INVALID_RECIPE_IDS, "message": f"Send between 1 and {MAX_BATCH_RECIPES} comma separated recipe ids"}
+        )
+    return _recipes_batch_response(db, current_user, recipe_ids, fields.split(",") if fields else None, language)
+
+
+@router.post("/batch", response_model=RecipeDetailsBatchResponse)
+def post_recipes_batch(
+    batch: RecipeDetailsBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    language: str = Depends(get_language)
+):
+    """Same as GET /recipes, for id lists too long for a query string"""
+    return _recipes_batch_response(db, current_user, batch.ids, batch.fields, language)
+
+
+def _recipes_batch_response(db: Session, current_user: User, recipe_ids: list[int], fields: list[str] | None, language: str):
+    selected_fields = parse_recipe_detail_fields(fields)
+    logger.info(f"User ID: {current_user.id} ({current_user.username}) is fetching details for {len(recipe_ids)} recipes.")
+    recipes, missing_ids = serialize_recipe_details(db, recipe_ids, language, selected_fields)
+    if missing_ids:
+        logger.warning(f"Recipe batch for user ID {current_user.id}: recipes {missing_ids} not found.")
+    return ORJSONResponse({"recipes": recipes, "missing_ids": missing_ids})
+
+
 @router.get("/{recipe_id}", response_model=RecipeDetailResponse)
 def get_recipe(
+    request: Request,
     recipe_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    language: str = Depends(get_language)
+    language: str = Depends(get_language),
+    settings: Settings = Depends(get_settings)
 ):
     """Endpoint to get detailed information for a specific recipe"""
     logger.info(f"User ID: {current_user.id} ({current_user.username}) is fetching details for recipe ID: {recipe_id}.")
-    db_recipe = get_recipe_details(db, recipe_id)
-    if not db_recipe:
+    payload = get_recipe_detail_payload(db, recipe_id, language)
+    if payload is None:
         logger.warning(f"Failed to fetch recipe ID {recipe_id}: Not found.")
         raise HTTPException(
             status_code=404,
             detail={"code": ErrorCode.RECIPE_NOT_FOUND, "message": "Recipe not found"}
         )
     
-    return serialize_recipe_detail(db_recipe, language)
+    # Cached with its compressed variants, so hot recipes are neither serialized nor compressed again
+    return payload.response(request.headers.get("accept-encoding"), settings.compression_minimum_size)
 
 
 @router.post("/me", response_model=RecipeDetailResponse, status_code=201)
@@ -191,6 +243,7 @@ def delete_user_recipe(
 
     db.delete(db_recipe)
     db.commit()
+    invalidate_recipe_detail_payload(recipe_id)
     logger.info(f"Recipe ID {recipe_id} deleted successfully by user ID {current_user.id} ({current_user.username}).")
     return SuccessResponse(success=True, message="Recipe deleted successfully")
 
@@ -6,8 +6,9 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app.core.auth import get_current_user, get_language
+from app.core.concurrency import run_blocking
 from app.core.errors import ErrorCode
-from app.crud.ingredient import get_ingredient_by_spoonacular_id
+from app.crud.ingredient import get_ingredients_by_spoonacular_ids
 from app.crud.meal_plan import get_latest_meal_plan_for_shopping_list
 from app.db.db_connection import get_db
 from app.models.user import User
@@ -33,9 +34,9 @@ async def generate_shopping_list(
 ):
     """Endpoint to generate the shopping list of the meal plan"""
     logger.info(f"User ID: {current_user.id} ({current_user.username}) requested their shopping list in language '{language}'.")
-    meal_plan = get_latest_meal_plan_for_shopping_list(db, current_user.id)
+    meal_plan = await run_blocking(get_latest_meal_plan_for_shopping_list, db, current_user.id)
     if not meal_plan:
-        logger.warning(f"Shopping list generation failed for user ID {current_user.id} ({current_user.username}): No meal plan found.") 
+        logger.warning(f"Shopping list generation failed for user ID {current_user.id} ({current_user.username}): No meal plan found.")
         raise HTTPException(
             status_code=404,
             detail={"code": ErrorCode.MEAL_PLAN_NOT_FOUND, "message": "Meal Plan not found"}
@@ -62,7 +63,14 @@ async def generate_shopping_list(
             logger.warning(f"Spoonacular API call failed for user ID {current_user.id} ({current_user.username}). Status: {e.status_code}. Detail: {e.detail}. Proceeding with manual items.")
 
     final_aisles = defaultdict(list)
-    
+    unknown_ids = {
+        item.get("ingredientId")
+        for aisle in spoonacular_data.get("aisles", [])
+        for item in aisle.get("items", [])
+        if item.get("ingredientId") not in ingredient_map
+    }
+    db_ingredients = await run_blocking(get_ingredients_by_spoonacular_ids, db, unknown_ids) if unknown_ids else {}
+
     for aisle in spoonacular_data.get("aisles", []):
         for item in aisle.get("items", []):
             spoonacular_id = item.get("ingredientId")
@@ -79,7 +87,7 @@ async def generate_shopping_list(
                     item["name"] = local_ingredient.name_en
                     item["measures"] = translate_measures_for_shopping_list(item.get("measures"), "en")
             else:
-                db_ingredient = get_ingredient_by_spoonacular_id(db, spoonacular_id)
+                db_ingredient = db_ingredients.get(spoonacular_id)
                 if db_ingredient:
                     item["image_filename"] = db_ingredient.image_filename
                     item["ingredientId"] = db_ingredient.id
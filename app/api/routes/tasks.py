@@ -1,9 +1,11 @@
 import logging
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.db.db_connection import get_sync_session
 from app.core.config import get_settings
+from app.crud.idempotency_key import delete_expired_idempotency_keys
+from app.services.meal_plan_precompute import precompute_meal_plans
 from app.services.user import delete_unverified_users
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
@@ -22,4 +24,33 @@ async def trigger_delete_unverified_users(
     
     result = delete_unverified_users(db)
     logger.info(f"Task delete_unverified_users executed: {result}")
-    return result
\ No newline at end of file
+    return result
+
+
+@router.post("/delete-expired-idempotency-keys", summary="Deletes stored responses of expired Idempotency-Keys")
+async def trigger_delete_expired_idempotency_keys(
+    x_task_auth: str | None = Header(None, alias="X-Task-Auth-Key"),
+    db: Session = Depends(get_sync_session)
+):
+    if not settings.task_secret_key or x_task_auth != settings.task_secret_key:
+        logger.warning("Unauthorized attempt to run a task.")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+    deleted = delete_expired_idempotency_keys(db)
+    logger.info(f"Task delete_expired_idempotency_keys executed: {deleted} keys deleted")
+    return {"deleted": deleted}
+
+
+@router.post("/precompute-meal-plans", summary="Generates next plans of active users ahead of time, to run off-peak")
+async def trigger_precompute_meal_plans(
+    x_task_auth: str | None = Header(None, alias="X-Task-Auth-Key"),
+    limit: int | None = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_sync_session)
+):
+    if not settings.task_secret_key or x_task_auth != settings.task_secret_key:
+        logger.warning("Unauthorized attempt to run a task.")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+    result = await precompute_meal_plans(db, limit)
+    logger.info(f"Task precompute_meal_plans executed: {result}")
+    return result
@@ -3,8 +3,8 @@ import logging
 import secrets
 from fastapi import  Depends, HTTPException, Header
 from fastapi.security import OAuth2PasswordBearer
-import requests
 from app.core.errors import ErrorCode
+from app.core.jwks import JWKSCache
 from app.core.security import verify_password
 from app.crud.user_preferences import get_user_preferences_by_user_id, get_user_preferences_details
 from app.schemas.token import AuthResponse, TokenResponse
@@ -16,8 +16,6 @@ from sqlalchemy.orm import Session
 from app.db.db_connection import get_db
 from app.models import User
 from app.crud.refresh_token import create_refresh_token_in_db, get_valid_refresh_token, revoke_all_refresh_tokens
-from google.oauth2 import id_token 
-from google.auth.transport import requests as google_request
 
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -26,9 +24,16 @@ APPLE_PUBLIC_KEYS_URL = "https://appleid.apple.com/auth/keys"
 APPLE_AUDIENCE = "com.fastdiet.app"
 APPLE_ISSUER = "https://appleid.apple.com"
 
+GOOGLE_PUBLIC_KEYS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+
 logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login-with-docs")
 
+# Public key sets of the social login providers, shared by all requests of the process
+apple_jwks = JWKSCache(APPLE_PUBLIC_KEYS_URL)
+google_jwks = JWKSCache(GOOGLE_PUBLIC_KEYS_URL)
+
 # Function to create a new access token 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
@@ -51,7 +56,7 @@ def create_refresh_token(user_id: int, db: Session) -> str:
     
     return token
 
-def verify_google_token(authorization: str = Header(...)):
+async def verify_google_token(authorization: str = Header(...)):
     try:
         if not authorization.startswith("Bearer "):
             raise ValueError("Authorization header must start with 'Bearer '")
@@ -60,20 +65,27 @@ def verify_google_token(authorization: str = Header(...)):
         if not token:
             raise ValueError("Token cannot be empty")
 
-        id_info = id_token.verify_oauth2_token(
-            token, 
-            google_request.Request(), 
+        kid = jwt.get_unverified_header(token).get("kid")
+        if not kid:
+            raise ValueError("Missing 'kid' in token header")
+
+        key = await google_jwks.get_key(kid)
+        id_info = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            options={"verify_aud": False, "verify_at_hash": False}
         )
 
         # Verify the token is issued by Google
-        if id_info['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
+        if id_info['iss'] not in GOOGLE_ISSUERS:
             logger.warning(f"Invalid Google token issuer: {id_info['iss']}")
             raise ValueError('Invalid issuer')
 
         logger.info(f"Successfully verified Google token for email: {id_info.get('email')}")
         return {"sub": id_info.get("sub"), "email": id_info.get("email"),}
 
-    except ValueError as e:
+    except (ValueError, JWTError) as e:
         logger.warning(f"Google token verification failed: {e}")
         raise HTTPException(
             status_code=400,
@@ -87,7 +99,7 @@ def verify_google_token(authorization: str = Header(...)):
         )
     
 
-def verify_apple_token(authorization: str = Header(...)):
+async def verify_apple_token(authorization: str = Header(...)):
     try:
         if not authorization.startswith("Bearer "):
             raise ValueError("Authorization header must start with 'Bearer '")
@@ -99,10 +111,7 @@ def verify_apple_token(authorization: str = Header(...)):
         if not kid:
             raise ValueError("Missing 'kid' in token header")
 
-        apple_keys = requests.get(APPLE_PUBLIC_KEYS_URL).json()["keys"]
-        key = next((k for k in apple_keys if k["kid"] == kid), None)
-        if not key:
-            raise ValueError("No matching public key found")
+        key = await apple_jwks.get_key(kid)
 
         decoded = jwt.decode(
             token,
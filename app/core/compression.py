@@ -0,0 +1,159 @@
+"""
+Response compression for the JSON API.
+
+CompressionMiddleware compresses buffered JSON and text responses with the best encoding the client
+accepts (zstd, br, then gzip) once they pass a minimum size, and moves large bodies to a worker thread
+so the event loop keeps serving. Responses that already carry a Content-Encoding (the precompressed
+variants of CompressedPayload) and event streams are passed through untouched.
+"""
+import gzip
+import threading
+import brotli
+import zstandard
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Preferred first when the client weighs them the same
+ENCODINGS = ("zstd", "br", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+STREAMING_TYPES = ("text/event-stream",)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+_zstd_compressor = threading.local()
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Best supported encoding of an Accept-Encoding header, or None to send the body as is"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    default = weights.get("*", 0.0)
+    candidates = [(weights.get(encoding, default), -i, encoding) for i, encoding in enumerate(ENCODINGS)]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        # ZstdCompressor is not thread safe, keep one per thread
+        compressor = getattr(_zstd_compressor, "value", None)
+        if compressor is None:
+            compressor = _zstd_compressor.value = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        return compressor.compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def _vary_on_accept_encoding(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressedPayload:
+    """A serialized JSON body with its compressed variants, built once per encoding and reused"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.variants: dict[str, bytes] = {}
+
+    def variant(self, encoding: str) -> bytes:
+        compressed = self.variants.get(encoding)
+        if compressed is None:
+            compressed = self.variants[encoding] = compress(self.body, encoding)
+        return compressed
+
+    def response(self, accept_encoding: str | None, minimum_size: int) -> Response:
+        encoding = negotiate_encoding(accept_encoding) if len(self.body) >= minimum_size else None
+        if encoding is None:
+            response = Response(self.body, media_type="application/json")
+        else:
+            response = Response(self.variant(encoding), media_type="application/json", headers={"Content-Encoding": encoding})
+        _vary_on_accept_encoding(response.headers)
+        return response
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, thread_threshold: int = 65536):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_threshold = thread_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                content_length = headers.get("content-length")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(STREAMING_TYPES)
+                    or (content_length is not None and int(content_length) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start_message["headers"])
+            if len(body) >= self.minimum_size:
+                if len(body) >= self.thread_threshold:
+                    body = await run_in_threadpool(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                _vary_on_accept_encoding(headers)
+                start_message["headers"] = headers.raw
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,56 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Bounded pool for blocking work (sync SQLAlchemy sessions, Google Translate) called from async routes.
+# Its size caps how many requests of a worker can hold a DB connection at the same time.
+blocking_executor = ThreadPoolExecutor(
+    max_workers=get_settings().blocking_io_workers,
+    thread_name_prefix="blocking-io"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking function in the bounded executor without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(blocking_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+class EventLoopLagStats:
+    def __init__(self):
+        self.samples = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.slow_ticks = 0
+
+    def record(self, lag_ms: float, slow: bool):
+        self.samples += 1
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if slow:
+            self.slow_ticks += 1
+
+
+event_loop_lag = EventLoopLagStats()
+
+
+async def monitor_event_loop_lag(interval: float, warning_ms: float):
+    """Measures how late the event loop wakes up from a sleep. Lag means something blocked the loop"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (time.perf_counter() - started - interval) * 1000)
+        slow = lag_ms >= warning_ms
+        event_loop_lag.record(lag_ms, slow)
+        if slow:
+            logger.warning(f"Event loop was blocked for {lag_ms:.1f} ms (max so far {event_loop_lag.max_lag_ms:.1f} ms).")
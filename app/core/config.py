@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     sender_email: str | None = None
     web_client_id: str | None = None
     spoonacular_api_key: str | None = None
+    spoonacular_base_url: str = "https://spoonacular-recipe-food-nutrition-v1.p.rapidapi.com"
     google_translation_credentials: str | None = None
     google_image_uploader_credentials: str | None = None
     gcs_bucket_name: str | None = None
@@ -16,6 +17,44 @@ class Settings(BaseSettings):
     task_secret_key: str | None = None
     brevo_api_key: str | None = None
     gcp_project_id: str | None = None
+    translate_enabled: bool = True
+    blocking_io_workers: int = 16
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_warmup_connections: int = 2
+    event_loop_lag_interval_seconds: float = 0.5
+    event_loop_lag_warning_ms: float = 100.0
+    log_level: str = "INFO"
+    log_levels: str | None = None
+    log_format: str = "json"
+    log_sampling: str | None = None
+    server_timing_enabled: bool = True
+    # Bearer token Prometheus scrapes /metrics with. While unset /metrics answers 401
+    metrics_auth_token: str | None = None
+    rate_limit_enabled: bool = True
+    rate_limit_storage_uri: str = "memory://"
+    rate_limit_strategy: str = "moving-window"
+    compression_minimum_size: int = 1024
+    compression_thread_threshold: int = 65536
+    recipe_payload_cache_size: int = 2048
+    recipe_payload_cache_ttl_seconds: int = 300
+    recipe_pool_cache_size: int = 1024
+    recipe_pool_ttl_seconds: int = 1800
+    meal_plan_job_workers: int = 2
+    meal_plan_job_poll_seconds: float = 2.0
+    meal_plan_job_lease_seconds: int = 300
+    meal_plan_job_max_attempts: int = 2
+    idempotency_key_ttl_seconds: int = 86400
+    # Time a generation may spend waiting for Spoonacular before it settles for a partial plan
+    meal_plan_generate_budget_seconds: float = 10.0
+    meal_plan_job_budget_seconds: float = 45.0
+    meal_plan_precompute_budget_seconds: float = 60.0
+    precompute_active_days: int = 14
+    precompute_batch_size: int = 500
+    precomputed_meal_plan_max_age_hours: int = 72
     model_config = SettingsConfigDict(env_file=".env")
 
 @lru_cache
@@ -35,7 +35,11 @@ class ErrorCode(StrEnum):
     MEAL_PLAN_ACCESS_DENIED = "MEAL_PLAN_ACCESS_DENIED"
     MEAL_PLAN_NOT_FOUND = "MEAL_PLAN_NOT_FOUND"
     MEAL_PLAN_GENERATION_FAILED = "MEAL_PLAN_GENERATION_FAILED"
+    MEAL_PLAN_JOB_NOT_FOUND = "MEAL_PLAN_JOB_NOT_FOUND"
+    MEAL_PLAN_DEADLINE_EXCEEDED = "MEAL_PLAN_DEADLINE_EXCEEDED"
     USER_PREFERENCES_NOT_FOUND = "USER_PREFERENCES_NOT_FOUND"
+    INVALID_RECIPE_IDS = "INVALID_RECIPE_IDS"
+    INVALID_RECIPE_FIELDS = "INVALID_RECIPE_FIELDS"
 
 
     # Preferences
@@ -49,3 +53,4 @@ class ErrorCode(StrEnum):
     # Generic
     INCORRECT_CURRENT_PASSWORD = "INCORRECT_CURRENT_PASSWORD"
     INTERNAL_SERVER_ERROR = "INTERNAL_SERVER_ERROR"
+    INVALID_CURSOR = "INVALID_CURSOR"
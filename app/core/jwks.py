@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import re
+import time
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+MIN_REFETCH_INTERVAL_SECONDS = 60
+REFRESH_AHEAD_RATIO = 0.8
+
+_MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def parse_max_age(cache_control: str | None) -> int | None:
+    """Extracts the max-age directive (in seconds) from a Cache-Control header"""
+    if not cache_control or "no-store" in cache_control or "no-cache" in cache_control:
+        return None
+    match = _MAX_AGE_PATTERN.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+class JWKSCache:
+    """
+    Cache of a remote JSON Web Key Set.
+
+    Keys are kept for the max-age announced by the provider, refreshed in the background
+    shortly before they expire and refetched early when a token references an unknown 'kid'.
+    """
+    def __init__(
+        self,
+        url: str,
+        default_ttl: int = DEFAULT_TTL_SECONDS,
+        min_refetch_interval: int = MIN_REFETCH_INTERVAL_SECONDS,
+        timeout: float = 5.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.url = url
+        self.default_ttl = default_ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.transport = transport
+
+        self._keys: dict[str, dict] = {}
+        self._fetched_at = 0.0
+        self._refresh_at = 0.0
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._background_task: asyncio.Task | None = None
+
+    async def get_key(self, kid: str) -> dict:
+        """Returns the JWK matching 'kid', fetching the key set only when needed"""
+        now = time.monotonic()
+        if not self._keys or now >= self._expires_at:
+            await self._refresh()
+        elif now >= self._refresh_at:
+            self._schedule_background_refresh()
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at >= self.min_refetch_interval:
+            logger.info(f"Unknown key id '{kid}' for {self.url}. Refetching key set.")
+            await self._refresh(force=True)
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise ValueError("No matching public key found")
+        return key
+
+    def clear(self) -> None:
+        self._keys = {}
+        self._fetched_at = self._refresh_at = self._expires_at = 0.0
+
+    def _schedule_background_refresh(self) -> None:
+        if self._background_task and not self._background_task.done():
+            return
+        self._background_task = asyncio.get_running_loop().create_task(self._refresh(background=True))
+
+    async def _refresh(self, force: bool = False, background: bool = False) -> None:
+        fetched_before = self._fetched_at
+        async with self._lock:
+            # Another coroutine refreshed the keys while we were waiting for the lock
+            if self._fetched_at != fetched_before and (force or time.monotonic() < self._expires_at):
+                return
+            try:
+                keys, ttl = await self._fetch()
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                if self._keys and (background or force or time.monotonic() < self._expires_at + self.default_ttl):
+                    logger.warning(f"Could not refresh key set from {self.url}, keeping cached keys. Error: {e}")
+                    return
+                raise
+
+            now = time.monotonic()
+            self._keys = keys
+            self._fetched_at = now
+            self._refresh_at = now + ttl * REFRESH_AHEAD_RATIO
+            self._expires_at = now + ttl
+            logger.info(f"Fetched {len(keys)} public keys from {self.url} (ttl={ttl}s).")
+
+    async def _fetch(self) -> tuple[dict[str, dict], int]:
+        async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+
+        keys = {key["kid"]: key for key in response.json()["keys"] if "kid" in key}
+        if not keys:
+            raise ValueError(f"Key set from {self.url} is empty")
+
+        ttl = parse_max_age(response.headers.get("Cache-Control")) or self.default_ttl
+        return keys, ttl
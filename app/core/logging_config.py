@@ -1,28 +1,44 @@
+import atexit
+import copy
+import json
 import logging
-from logging.config import dictConfig
+import queue
+import random
 import sys
-import os
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from starlette.requests import Request
+from app.core.config import get_settings
+
+# Id of the request being handled, added to every log record emitted while handling it
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
 
 LOGGING_CONFIG = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
-        "default": {
-            "format": "%(levelname)s: %(asctime)s - %(name)s - %(message)s",
+        "text": {
+            "format": "%(levelname)s: %(asctime)s - %(name)s - [%(request_id)s] %(message)s",
             "datefmt": "%d-%m-%Y %H:%M:%S",
         },
+        "json": {
+            "()": "app.core.logging_config.JsonFormatter",
+        },
     },
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
             "level": "DEBUG",
-            "formatter": "default",
+            "formatter": "json",
             "stream": sys.stdout,
         },
     },
     "loggers": {
         "root": {
-            "level": "DEBUG",
+            "level": "INFO",
             "handlers": ["console"],
         },
         "uvicorn.error": { "level": "WARNING", "handlers": ["console"], "propagate": False },
@@ -30,5 +46,137 @@ LOGGING_CONFIG = {
     },
 }
 
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the field names Cloud Logging understands"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        if hasattr(record, "metrics"):
+            entry["metrics"] = record.metrics
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id. Runs on the calling thread, before the record is queued."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the DEBUG/INFO records of the configured loggers (and their children).
+    Warnings and errors are never dropped.
+    """
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._rate_by_logger: dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._rate_by_logger.get(name)
+        if rate is None:
+            prefixes = [p for p in self.rates if name == p or name.startswith(p + ".")]
+            rate = self.rates[max(prefixes, key=len)] if prefixes else 1.0
+            self._rate_by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DeferredFormattingQueueHandler(QueueHandler):
+    """
+    Renders the message and the traceback on the calling thread, so the record no longer refers to the
+    arguments (mutable objects, lazy ORM attributes) or the frames of the request, and leaves the
+    formatting into the output line (JSON serialization, timestamps) to the listener thread.
+    """
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def get_request_id(request: Request) -> str:
+    """Reuses the id set by the client or Cloud Run's trace header, or generates a new one"""
+    request_id = request.headers.get("X-Request-ID")
+    if not request_id:
+        trace = request.headers.get("X-Cloud-Trace-Context")
+        request_id = trace.split("/", 1)[0] if trace else uuid.uuid4().hex
+    return request_id[:128]
+
+
+def parse_logger_mapping(value: str | None) -> dict[str, str]:
+    """Parses 'logger.a=VALUE,logger.b=VALUE' settings into a dict"""
+    mapping = {}
+    for item in (value or "").split(","):
+        name, sep, setting = item.partition("=")
+        if sep and name.strip():
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+
 def setup_logging():
-    dictConfig(LOGGING_CONFIG)
\ No newline at end of file
+    """
+    Configures logging from settings (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_SAMPLING).
+    Records are put on an in-memory queue and written to stdout by a background listener thread.
+    """
+    global _listener
+    settings = get_settings()
+
+    config = {**LOGGING_CONFIG, "loggers": {**LOGGING_CONFIG["loggers"]}}
+    config["handlers"] = {"console": {**LOGGING_CONFIG["handlers"]["console"], "formatter": settings.log_format}}
+    config["loggers"]["root"] = {**config["loggers"]["root"], "level": settings.log_level.upper()}
+    dictConfig(config)
+
+    for name, level in parse_logger_mapping(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    if _listener is not None:
+        _listener.stop()
+
+    console = logging.getLogger().handlers[0]
+    queue_handler = DeferredFormattingQueueHandler(queue.SimpleQueue())
+    sampling_rates = {name: float(rate) for name, rate in parse_logger_mapping(settings.log_sampling).items()}
+    if sampling_rates:
+        queue_handler.addFilter(SamplingFilter(sampling_rates))
+    queue_handler.addFilter(RequestIdFilter())
+
+    for logger in (logging.getLogger(), logging.getLogger("uvicorn.error"), logging.getLogger("uvicorn.access")):
+        logger.handlers = [queue_handler]
+
+    _listener = QueueListener(queue_handler.queue, console, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flushes the queued records and stops the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -37,6 +37,8 @@ class MealPlanConfig:
     LOW_FODMAP_DIET_ID = 12
     CALORIE_SEARCH_RANGE = 0
     DAYS_IN_PLAN = 5
+    # Candidates searched per meal slot, as a multiple of DAYS_IN_PLAN: each plan samples DAYS_IN_PLAN of them
+    RECIPE_POOL_SIZE_FACTOR = 3
     MINIMUM_VIABLE_DAYS = 1
 
 MEAL_TYPE_SUGGESTION_CONFIG = {
@@ -0,0 +1,119 @@
+import os
+import re
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+# With several gunicorn workers every process writes its samples to PROMETHEUS_MULTIPROC_DIR
+# and /metrics merges them, so the numbers are the same whichever worker serves the scrape.
+MULTIPROCESS_MODE = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route template",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the DB pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
+    ["pool"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the DB pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+SPOONACULAR_REQUESTS = Counter(
+    "spoonacular_requests_total",
+    "Requests sent to the Spoonacular API, by endpoint and response status",
+    ["endpoint", "status"],
+)
+SPOONACULAR_LATENCY = Histogram(
+    "spoonacular_request_duration_seconds",
+    "Latency of single Spoonacular API attempts",
+    ["endpoint"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20),
+)
+SPOONACULAR_QUOTA_REMAINING = Gauge(
+    "spoonacular_ratelimit_remaining",
+    "Last X-Ratelimit-*-Remaining value returned by Spoonacular",
+    ["quota"],
+    multiprocess_mode="mostrecent",
+)
+
+TRANSLATION_REQUESTS = Counter(
+    "translation_requests_total",
+    "Calls to the translation API",
+    ["outcome"],
+)
+
+MEAL_PLAN_GENERATIONS = Counter(
+    "meal_plan_generations_total",
+    "Meal plan generation outcomes (PlanGenerationStatus or error code)",
+    ["outcome"],
+)
+
+RECIPE_POOL_LOOKUPS = Counter(
+    "recipe_pool_lookups_total",
+    "Meal plan generations served from a shared recipe pool (hit) or that searched for recipes (miss)",
+    ["result"],
+)
+
+SPOONACULAR_QUOTA_HEADERS = {
+    "results": "X-Ratelimit-Results-Remaining",
+    "tinyrequests": "X-Ratelimit-Tinyrequests-Remaining",
+    "requests": "X-Ratelimit-Requests-Remaining",
+}
+
+_NUMERIC_PATH_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Replaces ids in an upstream endpoint so each endpoint is a single label value"""
+    return _NUMERIC_PATH_SEGMENT.sub("/{id}", endpoint)
+
+
+def record_spoonacular_response(endpoint: str, status: int | str, seconds: float, headers=None):
+    label = endpoint_label(endpoint)
+    SPOONACULAR_REQUESTS.labels(endpoint=label, status=str(status)).inc()
+    SPOONACULAR_LATENCY.labels(endpoint=label).observe(seconds)
+    for quota, header in SPOONACULAR_QUOTA_HEADERS.items():
+        value = headers.get(header) if headers is not None else None
+        if value is not None:
+            try:
+                SPOONACULAR_QUOTA_REMAINING.labels(quota=quota).set(float(value))
+            except ValueError:
+                pass
+
+
+def instrument_pool(pool, name: str):
+    """Keeps the checked-out gauge of a pool up to date on checkout/checkin events"""
+    if not hasattr(pool, "checkedout"):
+        return
+
+    def update(*args):
+        DB_POOL_CHECKED_OUT.labels(pool=name).set(pool.checkedout())
+
+    event.listen(pool, "checkout", update)
+    event.listen(pool, "checkin", update)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Metrics in the Prometheus text format, aggregated over all workers in multiprocess mode"""
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+import time
+from limits.storage import MovingWindowSupport, Storage
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """
+    Rate limit storage on a local SQLite file (``sqlite:///path/to/file.db``).
+
+    Every process that opens the same file shares the counters, so it behaves like the
+    Redis storage for several workers on one machine (local runs, tests, load tests)
+    without an external service.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options: float | str | bool):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # sqlite:///relative.db or sqlite:////absolute/path.db, like SQLAlchemy URLs
+        self.path = uri.removeprefix("sqlite:///")
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path,
+            timeout=float(options.get("timeout", 5.0)),
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expiry REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS rate_limit_entries (key TEXT NOT NULL, atime REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_entries_key_atime ON rate_limit_entries (key, atime)")
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    def _transaction(self, callback):
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = callback(self._connection)
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            return result
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+
+        def increment(connection):
+            connection.execute("DELETE FROM rate_limit_counters WHERE key = ? AND expiry <= ?", (key, now))
+            connection.execute(
+                "INSERT INTO rate_limit_counters (key, value, expiry) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, amount, now + expiry),
+            )
+            return connection.execute("SELECT value FROM rate_limit_counters WHERE key = ?", (key,)).fetchone()[0]
+
+        return self._transaction(increment)
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM rate_limit_counters WHERE key = ? AND expiry > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            row = self._connection.execute("SELECT expiry FROM rate_limit_counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        def delete_all(connection):
+            deleted = connection.execute("DELETE FROM rate_limit_counters").rowcount
+            return deleted + connection.execute("DELETE FROM rate_limit_entries").rowcount
+
+        return self._transaction(delete_all)
+
+    def clear(self, key: str) -> None:
+        def delete_key(connection):
+            connection.execute("DELETE FROM rate_limit_counters WHERE key = ?", (key,))
+            connection.execute("DELETE FROM rate_limit_entries WHERE key = ?", (key,))
+
+        self._transaction(delete_key)
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+
+        def acquire(connection):
+            connection.execute("DELETE FROM rate_limit_entries WHERE key = ? AND atime < ?", (key, now - expiry))
+            in_window = connection.execute("SELECT COUNT(*) FROM rate_limit_entries WHERE key = ?", (key,)).fetchone()[0]
+            if in_window + amount > limit:
+                return False
+            connection.executemany("INSERT INTO rate_limit_entries (key, atime) VALUES (?, ?)", [(key, now)] * amount)
+            return True
+
+        return self._transaction(acquire)
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple[float, int]:
+        now = time.time()
+        with self._lock:
+            oldest, count = self._connection.execute(
+                "SELECT MIN(atime), COUNT(*) FROM rate_limit_entries WHERE key = ? AND atime >= ?", (key, now - expiry)
+            ).fetchone()
+        return (oldest, count) if count else (now, 0)
@@ -1,5 +1,33 @@
+from fastapi import Request
+from jose import JWTError, jwt
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from app.core.config import get_settings
+import app.core.rate_limit_storage  # noqa: F401 registers the sqlite:// storage scheme
 
-# Limiter instance for rate limiting
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+
+def get_rate_limit_key(request: Request) -> str:
+    """Rate limits authenticated requests per user and anonymous ones per client IP"""
+    authorization = request.headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        settings = get_settings()
+        try:
+            payload = jwt.decode(authorization[7:], settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except JWTError:
+            payload = {}
+        if payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"ip:{get_remote_address(request)}"
+
+
+settings = get_settings()
+
+# Limiter instance for rate limiting. With a shared storage (e.g. redis://) the limits apply
+# across all workers and instances; if that storage is down, requests fall back to per-process memory limits.
+limiter = Limiter(
+    key_func=get_rate_limit_key,
+    storage_uri=settings.rate_limit_storage_uri,
+    strategy=settings.rate_limit_strategy,
+    enabled=settings.rate_limit_enabled,
+    in_memory_fallback_enabled=True,
+)
@@ -0,0 +1,158 @@
+"""
+Bitmasks stored on each recipe (diet_flags, dish_type_flags, cuisine_flags) so the suggestion
+queries filter the recipes table alone instead of joining the association tables and de-duplicating.
+allergen_flags holds the Spoonacular intolerances of its ingredients (see app.services.allergens).
+
+Bits are assigned by name over the fixed Spoonacular vocabularies. Names outside them get no bit
+(or OTHER_CUISINE_FLAG), and the queries fall back to the joins for users who need one of them.
+Never reorder the lists: the bits are stored in the database.
+"""
+from app.core.meal_plan_config import MealPlanConfig
+
+DIET_NAMES = [
+    "vegetarian", "vegan", "gluten free", "dairy free", "low fodmap", "ketogenic",
+    "lacto ovo vegetarian", "lacto vegetarian", "ovo vegetarian", "pescatarian", "pescetarian",
+    "paleo", "paleolithic", "primal", "whole30", "whole 30", "fodmap friendly",
+]
+DISH_TYPE_NAMES = [
+    "main course", "side dish", "dessert", "appetizer", "salad", "bread", "breakfast", "soup",
+    "beverage", "sauce", "marinade", "fingerfood", "snack", "drink", "lunch", "dinner", "main dish",
+    "starter", "antipasti", "antipasto", "hor d'oeuvre", "condiment", "dip", "spread", "morning meal",
+    "brunch",
+]
+CUISINE_NAMES = [
+    "african", "asian", "american", "british", "cajun", "caribbean", "chinese", "eastern european",
+    "european", "french", "german", "greek", "indian", "irish", "italian", "japanese", "jewish",
+    "korean", "latin american", "mediterranean", "mexican", "middle eastern", "nordic", "southern",
+    "spanish", "thai", "vietnamese",
+]
+
+# Spoonacular intolerances
+ALLERGEN_NAMES = [
+    "dairy", "egg", "gluten", "grain", "peanut", "seafood", "sesame", "shellfish", "soy", "sulfite", "tree nut", "wheat",
+]
+# Filtered with the strict recipe booleans instead of the ingredient allergens
+BOOLEAN_INTOLERANCES = ("gluten", "dairy")
+
+DIET_BITS = {name: 1 << i for i, name in enumerate(DIET_NAMES)}
+DISH_TYPE_BITS = {name: 1 << i for i, name in enumerate(DISH_TYPE_NAMES)}
+CUISINE_BITS = {name: 1 << i for i, name in enumerate(CUISINE_NAMES)}
+ALLERGEN_BITS = {name: 1 << i for i, name in enumerate(ALLERGEN_NAMES)}
+
+# Intolerances only trust the recipe booleans, not the diet types
+STRICT_GLUTEN_FREE_FLAG = 1 << 40
+STRICT_DAIRY_FREE_FLAG = 1 << 41
+# A recipe whose cuisines have no bit must not look like a recipe without cuisines
+OTHER_CUISINE_FLAG = 1 << 62
+
+# Recipe booleans that make a recipe compatible with a diet even without the diet type row
+BOOLEAN_DIETS = {
+    "vegetarian": ("vegetarian",),
+    "vegan": ("vegetarian", "vegan"),
+    "gluten_free": ("gluten free",),
+    "dairy_free": ("dairy free",),
+    "low_fodmap": ("low fodmap",),
+}
+
+DIET_NAMES_BY_ID = {
+    MealPlanConfig.VEGETARIAN_DIET_ID: "vegetarian",
+    MealPlanConfig.VEGAN_DIET_ID: "vegan",
+    MealPlanConfig.GLUTEN_FREE_DIET_ID: "gluten free",
+    MealPlanConfig.DAIRY_FREE_DIET_ID: "dairy free",
+    MealPlanConfig.LOW_FODMAP_DIET_ID: "low fodmap",
+}
+
+
+def _normalize(name: str) -> str:
+    return name.strip().lower()
+
+
+def diet_flags(diet_names, **booleans) -> int:
+    """booleans: the vegetarian, vegan, gluten_free, dairy_free and low_fodmap columns of the recipe"""
+    names = {_normalize(name) for name in diet_names}
+    for column, diets in BOOLEAN_DIETS.items():
+        if booleans.get(column):
+            names.update(diets)
+    flags = 0
+    for name in names:
+        flags |= DIET_BITS.get(name, 0)
+    if booleans.get("gluten_free"):
+        flags |= STRICT_GLUTEN_FREE_FLAG
+    if booleans.get("dairy_free"):
+        flags |= STRICT_DAIRY_FREE_FLAG
+    return flags
+
+
+def dish_type_flags(dish_type_names) -> int:
+    flags = 0
+    for name in dish_type_names:
+        flags |= DISH_TYPE_BITS.get(_normalize(name), 0)
+    return flags
+
+
+def cuisine_flags(cuisine_names) -> int:
+    flags = 0
+    for name in cuisine_names:
+        flags |= CUISINE_BITS.get(_normalize(name), OTHER_CUISINE_FLAG)
+    return flags
+
+
+def allergen_flags(allergen_names) -> int:
+    flags = 0
+    for name in allergen_names:
+        flags |= ALLERGEN_BITS.get(_normalize(name), 0)
+    return flags
+
+
+def set_recipe_flags(recipe):
+    """Recomputes the bitmasks of a Recipe from its booleans and relationships"""
+    recipe.diet_flags = diet_flags(
+        (diet.name for diet in recipe.diet_types),
+        **{column: getattr(recipe, column) for column in BOOLEAN_DIETS},
+    )
+    recipe.dish_type_flags = dish_type_flags(dish_type.name for dish_type in recipe.dish_types)
+    recipe.cuisine_flags = cuisine_flags(cuisine.name for cuisine in recipe.cuisines)
+
+
+def required_diet_flags(preferences) -> int | None:
+    """Bits a recipe needs for the diet and intolerances of the user, or None if they have no bit"""
+    required = 0
+    if preferences.diet_type_id and preferences.diet_type_id != MealPlanConfig.BALANCE_DIET_ID:
+        name = DIET_NAMES_BY_ID.get(preferences.diet_type_id)
+        if name is None:
+            name = _normalize(preferences.diet_type.name) if preferences.diet_type else ""
+        if name not in DIET_BITS:
+            return None
+        required |= DIET_BITS[name]
+
+    for intolerance in preferences.intolerances or []:
+        intolerance_name = intolerance.name.lower()
+        if "gluten" in intolerance_name:
+            required |= STRICT_GLUTEN_FREE_FLAG
+        if "dairy" in intolerance_name:
+            required |= STRICT_DAIRY_FREE_FLAG
+    return required
+
+
+def excluded_allergen_flags(preferences) -> int | None:
+    """Allergens the recipes must not contain for the user, or None if an intolerance has no bit"""
+    excluded = 0
+    for intolerance in preferences.intolerances or []:
+        name = _normalize(intolerance.name)
+        if name in BOOLEAN_INTOLERANCES:
+            continue
+        if name not in ALLERGEN_BITS:
+            return None
+        excluded |= ALLERGEN_BITS[name]
+    return excluded
+
+
+def any_of_mask(names, bits: dict[str, int]) -> int | None:
+    """Mask matching any of the names, or None if one of them has no bit"""
+    mask = 0
+    for name in names:
+        bit = bits.get(_normalize(name))
+        if bit is None:
+            return None
+        mask |= bit
+    return mask
@@ -0,0 +1,79 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestMetrics:
+    """Time spent by one request in the database and in external services"""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        # Blocking work runs in worker threads that share this object through the copied context
+        with self._lock:
+            timing = self.timings.setdefault(name, [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+
+    def count(self, name: str) -> int:
+        return self.timings.get(name, [0, 0.0])[0]
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> dict:
+        summary = {"total_ms": round(self.elapsed_ms(), 2)}
+        for name, (count, seconds) in self.timings.items():
+            summary[f"{name}_count"] = count
+            summary[f"{name}_ms"] = round(seconds * 1000, 2)
+        return summary
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header"""
+        entries = [
+            f'{name};dur={seconds * 1000:.2f};desc="{count} calls"'
+            for name, (count, seconds) in self.timings.items()
+        ]
+        entries.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(entries)
+
+
+request_metrics_var: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def track(name: str):
+    """Adds the time spent in the block to the current request's metrics, if there is one"""
+    metrics = request_metrics_var.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record(name, time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_metrics_var.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = request_metrics_var.get()
+    started = conn.info.get("query_started")
+    if metrics is not None and started:
+        metrics.record("db", time.perf_counter() - started.pop())
+
+
+def instrument_sqlalchemy():
+    """Counts the statements and DB time of every engine (sync and async) in the request metrics"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
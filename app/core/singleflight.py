@@ -0,0 +1,33 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time in this process: callers arriving while it runs wait for
+    the same result (or exception) instead of starting their own. The call runs in its own task, so it
+    finishes even if the caller that started it goes away.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.info(f"Joining the call already in flight for {key}.")
+        # Shielded: a cancelled waiter must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.idempotency_key import IdempotencyKey
+
+
+def get_idempotency_key(db: Session, user_id: int, key: str) -> IdempotencyKey | None:
+    """The stored response of a key, unless it expired"""
+    return db.scalar(
+        select(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.expires_at > datetime.utcnow())
+    )
+
+def save_idempotency_key(db: Session, user_id: int, key: str, endpoint: str, status_code: int, response_body: dict, ttl_seconds: int) -> bool:
+    """Stores a response for its key. False if another request stored one first (that one wins)"""
+    db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.expires_at <= datetime.utcnow())
+    )
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        endpoint=endpoint,
+        status_code=status_code,
+        response_body=response_body,
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+def delete_expired_idempotency_keys(db: Session) -> int:
+    deleted = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())).rowcount
+    db.commit()
+    return deleted
@@ -70,4 +70,11 @@ def get_or_create_ingredient_by_name(db: Session, name: str, lang: str) -> Ingre
 
 def get_ingredient_by_spoonacular_id(db: Session, spoon_id: int) -> Ingredient | None:
     ingredient = db.query(Ingredient).filter(Ingredient.spoonacular_id == spoon_id).first()
-    return ingredient
\ No newline at end of file
+    return ingredient
+
+def get_ingredients_by_spoonacular_ids(db: Session, spoon_ids: set[int]) -> dict[int, Ingredient]:
+    """Loads several ingredients in one query, keyed by their Spoonacular id"""
+    if not spoon_ids:
+        return {}
+    ingredients = db.query(Ingredient).filter(Ingredient.spoonacular_id.in_(spoon_ids)).all()
+    return {ingredient.spoonacular_id: ingredient for ingredient in ingredients}
@@ -1,10 +1,19 @@
-from sqlalchemy.orm import Session, selectinload
+from datetime import datetime
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 from app.core.meal_plan_config import MealSlot
+from app.crud.recipe import RECIPE_LIST_COLUMNS
+from app.models.ingredient import Ingredient
 from app.models.meal_item import MealItem
 from app.models.meal_plan import MealPlan
 from app.models.recipe import Recipe
 from app.models.recipes_ingredient import RecipesIngredient
 
+SLOT_TO_MEAL_TYPE = {
+    MealSlot.BREAKFAST.value: "breakfast",
+    MealSlot.LUNCH.value: "lunch",
+    MealSlot.DINNER.value: "dinner",
+}
 
 
 def get_meal_plan_for_response(db: Session, meal_plan_id: int) -> MealPlan | None:
@@ -12,7 +21,7 @@ def get_meal_plan_for_response(db: Session, meal_plan_id: int) -> MealPlan | Non
     return (
         db.query(MealPlan)
         .filter(MealPlan.id == meal_plan_id)
-        .options(selectinload(MealPlan.meal_items).selectinload(MealItem.recipe))
+        .options(selectinload(MealPlan.meal_items).joinedload(MealItem.recipe).load_only(*RECIPE_LIST_COLUMNS))
         .first()
     )
 
@@ -24,30 +33,26 @@ def get_meal_plan_by_id(db: Session, meal_plan_id: int) -> MealPlan | None:
     )
 
 
-def save_meal_plan_to_db(db: Session, user_id: int, generated_plan: dict[int, dict[int, dict]]):
-    meal_plan = MealPlan(user_id=user_id)
-    db.add(meal_plan)
-    db.flush()
-
+def _build_meal_items(meal_plan_id: int, generated_plan: dict[int, dict[int, Recipe]]) -> list[MealItem]:
     meal_items = []
-
-    slot_to_meal_type = {
-        MealSlot.BREAKFAST.value: "breakfast",
-        MealSlot.LUNCH.value: "lunch",
-        MealSlot.DINNER.value: "dinner",
-    }
-
     for day, meals in generated_plan.items():
         for slot, recipe_data in meals.items():
             meal_items.append(MealItem(
                 day=day,
                 slot=slot,
                 recipe_id=recipe_data.id,
-                meal_plan_id=meal_plan.id,
-                meal_type=slot_to_meal_type[slot]
+                meal_plan_id=meal_plan_id,
+                meal_type=SLOT_TO_MEAL_TYPE[slot]
             ))
-    
-    db.add_all(meal_items)
+    return meal_items
+
+
+def save_meal_plan_to_db(db: Session, user_id: int, generated_plan: dict[int, dict[int, dict]]):
+    meal_plan = MealPlan(user_id=user_id)
+    db.add(meal_plan)
+    db.flush()
+
+    db.add_all(_build_meal_items(meal_plan.id, generated_plan))
     db.commit()
 
     return meal_plan
@@ -55,8 +60,8 @@ def save_meal_plan_to_db(db: Session, user_id: int, generated_plan: dict[int, di
 def get_latest_meal_plan_for_user(db: Session, user_id: int) -> MealPlan | None:
     return (
         db.query(MealPlan)
-        .filter(MealPlan.user_id == user_id)
-        .options(selectinload(MealPlan.meal_items).selectinload(MealItem.recipe))
+        .filter(MealPlan.user_id == user_id, MealPlan.is_precomputed.is_(False))
+        .options(selectinload(MealPlan.meal_items).joinedload(MealItem.recipe).load_only(*RECIPE_LIST_COLUMNS))
         .order_by(MealPlan.created_at.desc())
         .first()
     )
@@ -64,13 +69,94 @@ def get_latest_meal_plan_for_user(db: Session, user_id: int) -> MealPlan | None:
 def get_latest_meal_plan_for_shopping_list(db: Session, user_id: int) -> MealPlan | None:
      return (
         db.query(MealPlan)
-        .filter(MealPlan.user_id == user_id)
+        .filter(MealPlan.user_id == user_id, MealPlan.is_precomputed.is_(False))
         .options(
             selectinload(MealPlan.meal_items)
             .selectinload(MealItem.recipe)
-            .selectinload(Recipe.recipes_ingredients)
-            .selectinload(RecipesIngredient.ingredient)
+            .options(
+                load_only(Recipe.id, Recipe.servings),
+                selectinload(Recipe.recipes_ingredients).selectinload(RecipesIngredient.ingredient),
+            )
         )
         .order_by(MealPlan.created_at.desc())
         .first()
-    )
\ No newline at end of file
+    )
+
+def get_latest_meal_plan_for_home(db: Session, user_id: int) -> MealPlan | None:
+    """Latest meal plan with what both the plan response and the shopping list summary read, in three queries"""
+    return (
+        db.query(MealPlan)
+        .filter(MealPlan.user_id == user_id, MealPlan.is_precomputed.is_(False))
+        .options(
+            selectinload(MealPlan.meal_items)
+            .joinedload(MealItem.recipe)
+            .options(
+                load_only(*RECIPE_LIST_COLUMNS),
+                selectinload(Recipe.recipes_ingredients).joinedload(RecipesIngredient.ingredient).load_only(Ingredient.id, Ingredient.aisle),
+            )
+        )
+        .order_by(MealPlan.created_at.desc())
+        .first()
+    )
+
+
+def get_user_ids_to_precompute(db: Session, active_since: datetime, limit: int) -> list[int]:
+    """Users who generated a plan since 'active_since' and have no precomputed plan waiting"""
+    waiting = select(MealPlan.user_id).where(MealPlan.is_precomputed.is_(True))
+    return list(db.scalars(
+        select(MealPlan.user_id)
+        .where(MealPlan.is_precomputed.is_(False), MealPlan.created_at >= active_since, MealPlan.user_id.notin_(waiting))
+        .distinct()
+        .order_by(MealPlan.user_id)
+        .limit(limit)
+    ).all())
+
+def save_precomputed_meal_plans(db: Session, plans: list[tuple[int, str, dict[int, dict[int, Recipe]]]]) -> int:
+    """Stores (user_id, preferences fingerprint, plan) tuples as precomputed plans in one transaction"""
+    now = datetime.utcnow()
+    meal_plans = [
+        MealPlan(user_id=user_id, is_precomputed=True, preferences_fingerprint=fingerprint, created_at=now)
+        for user_id, fingerprint, _ in plans
+    ]
+    db.add_all(meal_plans)
+    db.flush()
+    db.add_all([item for meal_plan, (_, _, plan) in zip(meal_plans, plans) for item in _build_meal_items(meal_plan.id, plan)])
+    db.commit()
+    return len(meal_plans)
+
+def claim_precomputed_meal_plan(db: Session, user_id: int, fingerprint: str, created_after: datetime) -> int | None:
+    """
+    Turns the user's precomputed plan into their current one, if it was computed after 'created_after'
+    for the same preferences. Returns its id, None if there is none to use
+    """
+    meal_plan_id = db.scalar(
+        select(MealPlan.id)
+        .where(
+            MealPlan.user_id == user_id,
+            MealPlan.is_precomputed.is_(True),
+            MealPlan.preferences_fingerprint == fingerprint,
+            MealPlan.created_at > created_after,
+        )
+        .order_by(MealPlan.id.desc())
+        .limit(1)
+    )
+    if meal_plan_id is None:
+        return None
+    claimed = db.execute(
+        update(MealPlan)
+        .where(MealPlan.id == meal_plan_id, MealPlan.is_precomputed.is_(True))
+        .values(is_precomputed=False, preferences_fingerprint=None, created_at=func.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return meal_plan_id if claimed else None
+
+def delete_stale_precomputed_meal_plans(db: Session, created_before: datetime) -> int:
+    stale = select(MealPlan.id).where(MealPlan.is_precomputed.is_(True), MealPlan.created_at <= created_before)
+    stale_ids = list(db.scalars(stale).all())
+    if not stale_ids:
+        return 0
+    db.execute(delete(MealItem).where(MealItem.meal_plan_id.in_(stale_ids)))
+    db.execute(delete(MealPlan).where(MealPlan.id.in_(stale_ids)))
+    db.commit()
+    return len(stale_ids)
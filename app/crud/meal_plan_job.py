@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.errors import ErrorCode
+from app.models.meal_plan_job import MealPlanJob, MealPlanJobStatus
+
+ACTIVE_STATUSES = (MealPlanJobStatus.pending, MealPlanJobStatus.running)
+
+
+def get_meal_plan_job(db: Session, job_id: int) -> MealPlanJob | None:
+    return db.get(MealPlanJob, job_id)
+
+def get_active_meal_plan_job(db: Session, user_id: int) -> MealPlanJob | None:
+    return db.scalar(
+        select(MealPlanJob)
+        .where(MealPlanJob.user_id == user_id, MealPlanJob.status.in_(ACTIVE_STATUSES))
+        .order_by(MealPlanJob.id.desc())
+        .limit(1)
+    )
+
+def create_meal_plan_job(db: Session, user_id: int) -> MealPlanJob:
+    """
+    Queues a job for the user. Raises IntegrityError if the insert is rejected, e.g. because the user
+    already has an active job (the unique active_user_id); the session is rolled back first.
+    """
+    job = MealPlanJob(user_id=user_id, status=MealPlanJobStatus.pending, attempts=0, active_user_id=user_id)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    db.refresh(job)
+    return job
+
+
+def _claimable(now: datetime, max_attempts: int):
+    expired_lease = and_(MealPlanJob.status == MealPlanJobStatus.running, MealPlanJob.locked_until < now)
+    return and_(or_(MealPlanJob.status == MealPlanJobStatus.pending, expired_lease), MealPlanJob.attempts < max_attempts)
+
+def claim_next_meal_plan_job(db: Session, lease_seconds: int, max_attempts: int) -> MealPlanJob | None:
+    """
+    Takes the oldest pending job, or a running one whose worker let its lease expire, and leases it.
+    The conditional UPDATE makes the claim atomic, so instances polling the same table never run a job twice.
+    """
+    now = datetime.utcnow()
+    while True:
+        job_id = db.scalar(select(MealPlanJob.id).where(_claimable(now, max_attempts)).order_by(MealPlanJob.id).limit(1))
+        if job_id is None:
+            db.commit()
+            return None
+        claimed = db.execute(
+            update(MealPlanJob)
+            .where(MealPlanJob.id == job_id, _claimable(now, max_attempts))
+            .values(
+                status=MealPlanJobStatus.running,
+                attempts=MealPlanJob.attempts + 1,
+                locked_until=now + timedelta(seconds=lease_seconds),
+                started_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(MealPlanJob, job_id)
+
+def renew_meal_plan_job_lease(db: Session, job_id: int, lease_seconds: int) -> bool:
+    """Extends the lease of a running job. False if the job is no longer running"""
+    renewed = db.execute(
+        update(MealPlanJob)
+        .where(MealPlanJob.id == job_id, MealPlanJob.status == MealPlanJobStatus.running)
+        .values(locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return bool(renewed)
+
+def fail_abandoned_meal_plan_jobs(db: Session, max_attempts: int) -> int:
+    """Jobs whose workers died on every attempt are failed instead of being retried forever"""
+    now = datetime.utcnow()
+    failed = db.execute(
+        update(MealPlanJob)
+        .where(MealPlanJob.status == MealPlanJobStatus.running, MealPlanJob.locked_until < now, MealPlanJob.attempts >= max_attempts)
+        .values(status=MealPlanJobStatus.failed, error_code=ErrorCode.MEAL_PLAN_GENERATION_FAILED, error_message="The job was interrupted", finished_at=now, locked_until=None, active_user_id=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return failed
+
+def _finish_meal_plan_job(db: Session, job_id: int, **values):
+    db.execute(
+        update(MealPlanJob)
+        .where(MealPlanJob.id == job_id, MealPlanJob.status == MealPlanJobStatus.running)
+        .values(finished_at=datetime.utcnow(), locked_until=None, active_user_id=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def complete_meal_plan_job(db: Session, job_id: int, meal_plan_id: int, generation_status: str):
+    _finish_meal_plan_job(db, job_id, status=MealPlanJobStatus.succeeded, meal_plan_id=meal_plan_id, generation_status=generation_status)
+
+def fail_meal_plan_job(db: Session, job_id: int, error_code: str, error_message: str):
+    _finish_meal_plan_job(db, job_id, status=MealPlanJobStatus.failed, error_code=error_code, error_message=error_message[:255])
@@ -1,8 +1,9 @@
 import logging
 import random
-from sqlalchemy import desc, func, or_
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import Select, and_, desc, false, func, or_, select
+from sqlalchemy.orm import Session, aliased, load_only, selectinload
 from app.core.meal_plan_config import MealPlanConfig
+from app.core.recipe_flags import CUISINE_BITS, DISH_TYPE_BITS, any_of_mask, excluded_allergen_flags, required_diet_flags
 from app.crud.cuisine_region import get_or_create_cuisine_region
 from app.crud.dish_type import get_or_create_dish_type
 from app.crud.ingredient import get_or_create_spoonacular_ingredient
@@ -16,18 +17,45 @@ from app.models.recipes_ingredient import RecipesIngredient
 from app.models.recipes_nutrient import RecipesNutrient
 from app.models.user_preferences import UserPreferences
 
+from app.services.allergens import ingredient_allergen_flags, tag_ingredients
 from app.services.diet_types import get_or_create_diet_objects, normalize_diets
+from app.utils.cursor import InvalidCursorError
 from app.utils.translator import translate_analyzed_instructions, translate_text
 
 logger = logging.getLogger(__name__)
 
+# Columns the list views read (RecipeShort, meal plan slots): everything but the heavy summaries,
+# instructions and flags stays unloaded
+RECIPE_LIST_COLUMNS = (
+    Recipe.id, Recipe.spoonacular_id, Recipe.title, Recipe.title_es, Recipe.image_url,
+    Recipe.ready_min, Recipe.calories, Recipe.servings,
+)
+# The ranking columns too: MySQL requires the ORDER BY columns of a SELECT DISTINCT in the select list
+SUGGESTION_COLUMNS = RECIPE_LIST_COLUMNS + (Recipe.health_score, Recipe.spoonacular_score)
+
+# Relationship each RecipeDetailResponse list field is built from
+RECIPE_DETAIL_RELATIONS = {
+    "cuisines": selectinload(Recipe.cuisines),
+    "dish_types": selectinload(Recipe.dish_types),
+    "diet_types": selectinload(Recipe.diet_types),
+    "ingredients": selectinload(Recipe.recipes_ingredients).joinedload(RecipesIngredient.ingredient),
+    "nutrients": selectinload(Recipe.recipes_nutrients).joinedload(RecipesNutrient.nutrient),
+}
+RECIPE_DETAIL_OPTIONS = tuple(RECIPE_DETAIL_RELATIONS.values())
+# Spanish column read along with each translated detail field
+RECIPE_DETAIL_TRANSLATIONS = {
+    "title": Recipe.title_es,
+    "summary": Recipe.summary_es,
+    "analyzed_instructions": Recipe.analyzed_instructions_es,
+}
+
 def get_recipe_by_id(db: Session, recipe_id: int) -> Recipe | None:
     return db.query(Recipe).filter(Recipe.id == recipe_id).first()
 
 def get_recipes_by_creator_id(db: Session, creator_id: int) -> list[Recipe]:
     return (
         db.query(Recipe)
-        .options(selectinload(Recipe.dish_types))
+        .options(load_only(*RECIPE_LIST_COLUMNS), selectinload(Recipe.dish_types))
         .filter(Recipe.creator_id == creator_id)
         .all()
     )
@@ -36,16 +64,24 @@ def get_recipe_details(db: Session, recipe_id: int) -> Recipe | None:
     return (
         db.query(Recipe)
         .filter(Recipe.id == recipe_id)
-        .options(
-           selectinload(Recipe.cuisines),
-            selectinload(Recipe.dish_types),
-            selectinload(Recipe.diet_types),
-            selectinload(Recipe.recipes_ingredients).joinedload(RecipesIngredient.ingredient),
-            selectinload(Recipe.recipes_nutrients).joinedload(RecipesNutrient.nutrient)
-        )
+        .options(*RECIPE_DETAIL_OPTIONS)
         .first()
     )
 
+def get_recipes_details(db: Session, recipe_ids: list[int], fields: set[str] | None = None) -> list[Recipe]:
+    """
+    Recipes with what their detail 'fields' need (all of them by default): one query for the recipes
+    and one per relationship, however many ids there are. Unrequested columns stay unloaded.
+    """
+    query = select(Recipe).where(Recipe.id.in_(recipe_ids))
+    if fields is None:
+        return list(db.scalars(query.options(*RECIPE_DETAIL_OPTIONS)))
+
+    columns = [getattr(Recipe, field) for field in fields if field not in RECIPE_DETAIL_RELATIONS]
+    columns += [RECIPE_DETAIL_TRANSLATIONS[field] for field in fields if field in RECIPE_DETAIL_TRANSLATIONS]
+    relations = [RECIPE_DETAIL_RELATIONS[field] for field in fields if field in RECIPE_DETAIL_RELATIONS]
+    return list(db.scalars(query.options(load_only(Recipe.id, *columns), *relations)))
+
 def get_recipe_suggestions_from_db(
     db: Session,
     exclude_recipe_ids: set[int],
@@ -54,22 +90,142 @@ def get_recipe_suggestions_from_db(
     limit: int, 
     min_calories: float | None,
     max_calories: float | None,
-    offset: int = 0
+    offset: int = 0,
+    load_dish_types: bool = False
 ):
-    query = db.query(Recipe).filter(
+    query = _build_recipe_suggestions_query(exclude_recipe_ids, preferences, db_dish_types, min_calories, max_calories)
+    if load_dish_types:
+        query = query.options(selectinload(Recipe.dish_types))
+    page = list(db.scalars(query.offset(offset).limit(limit)).all())
+    random.shuffle(page)
+
+    return page
+
+def _ranked_after(recipe_id: int):
+    """
+    Recipes ranked after the given one: health and Spoonacular scores descending with NULLs last
+    (how MySQL and SQLite sort them), then id. The scores are read from that recipe's row instead
+    of the client, so the FLOAT columns are compared with themselves and never with a rounded value.
+    """
+    anchor = aliased(Recipe)
+    anchor_health = select(anchor.health_score).where(anchor.id == recipe_id).scalar_subquery()
+    anchor_score = select(anchor.spoonacular_score).where(anchor.id == recipe_id).scalar_subquery()
+
+    def lower(column, value):
+        return and_(value.isnot(None), or_(column < value, column.is_(None)))
+
+    def same(column, value):
+        return or_(column == value, and_(column.is_(None), value.is_(None)))
+
+    return or_(
+        lower(Recipe.health_score, anchor_health),
+        and_(
+            same(Recipe.health_score, anchor_health),
+            or_(
+                lower(Recipe.spoonacular_score, anchor_score),
+                and_(same(Recipe.spoonacular_score, anchor_score), Recipe.id > recipe_id),
+            ),
+        ),
+    )
+
+def get_recipe_suggestions_page(
+    db: Session,
+    exclude_recipe_ids: set[int],
+    preferences: UserPreferences,
+    db_dish_types: list[str],
+    limit: int,
+    after_recipe_id: int | None,
+    seed: int,
+    load_dish_types: bool = False
+) -> tuple[list[Recipe], int | None]:
+    """
+    Keyset page of the ranked suggestions that follow 'after_recipe_id' (the first page if None),
+    shuffled with 'seed', and the id to continue from (None on the last page).
+    Pages never overlap and cost the same at any depth.
+    Raises InvalidCursorError if the 'after_recipe_id' recipe was deleted, since its scores are the keyset.
+    """
+    query = _build_recipe_suggestions_query(exclude_recipe_ids, preferences, db_dish_types, None, None)
+    if after_recipe_id is not None:
+        if db.scalar(select(Recipe.id).where(Recipe.id == after_recipe_id)) is None:
+            raise InvalidCursorError(f"The recipe {after_recipe_id} the cursor continues from no longer exists")
+        query = query.where(_ranked_after(after_recipe_id))
+    if load_dish_types:
+        query = query.options(selectinload(Recipe.dish_types))
+    page = list(db.scalars(query.limit(limit + 1)).all())
+
+    next_recipe_id = page[limit - 1].id if len(page) > limit else None
+    page = page[:limit]
+    random.Random(seed + (after_recipe_id or 0)).shuffle(page)
+
+    return page, next_recipe_id
+
+def _allergen_filter(preferences: UserPreferences):
+    """Where clause excluding the recipes tagged with the user's intolerances, None if there is nothing to exclude"""
+    excluded = excluded_allergen_flags(preferences)
+    if excluded is None:
+        return false()
+    if not excluded:
+        return None
+    return (Recipe.allergen_flags.isnot(None)) & (Recipe.allergen_flags.bitwise_and(excluded) == 0)
+
+def _build_recipe_suggestions_query(
+    exclude_recipe_ids: set[int],
+    preferences: UserPreferences,
+    db_dish_types: list[str],
+    min_calories: float | None,
+    max_calories: float | None,
+) -> Select:
+    """Builds the ranked query of imported recipes compatible with the user preferences"""
+    required_diets = required_diet_flags(preferences)
+    dish_type_mask = any_of_mask(db_dish_types, DISH_TYPE_BITS)
+    cuisine_mask = any_of_mask((cuisine.name for cuisine in preferences.cuisines), CUISINE_BITS) if preferences.cuisines else 0
+    if required_diets is None or dish_type_mask is None or cuisine_mask is None:
+        return _build_recipe_suggestions_query_with_joins(exclude_recipe_ids, preferences, db_dish_types, min_calories, max_calories)
+
+    query = select(Recipe).options(load_only(*SUGGESTION_COLUMNS)).where(
+        Recipe.id.notin_(exclude_recipe_ids),
+        Recipe.spoonacular_id.isnot(None),
+        Recipe.creator_id.is_(None),
+        Recipe.dish_type_flags.bitwise_and(dish_type_mask) != 0,
+    )
+    if min_calories is not None and max_calories is not None:
+        query = query.where(Recipe.calories.between(min_calories, max_calories))
+    if required_diets:
+        query = query.where(Recipe.diet_flags.bitwise_and(required_diets) == required_diets)
+    if cuisine_mask:
+        query = query.where(or_(Recipe.cuisine_flags == 0, Recipe.cuisine_flags.bitwise_and(cuisine_mask) != 0))
+    allergen_filter = _allergen_filter(preferences)
+    if allergen_filter is not None:
+        query = query.where(allergen_filter)
+
+    return query.order_by(
+        desc(Recipe.health_score),
+        desc(Recipe.spoonacular_score),
+        Recipe.id.asc()
+    )
+
+def _build_recipe_suggestions_query_with_joins(
+    exclude_recipe_ids: set[int],
+    preferences: UserPreferences,
+    db_dish_types: list[str],
+    min_calories: float | None,
+    max_calories: float | None,
+) -> Select:
+    """Same query through the association tables, for diets, dish types or cuisines without a bit in the flags"""
+    query = select(Recipe).options(load_only(*SUGGESTION_COLUMNS)).where(
         Recipe.id.notin_(exclude_recipe_ids),
         Recipe.spoonacular_id.isnot(None),
         Recipe.creator_id.is_(None),
     )
 
     if min_calories is not None and max_calories is not None:
-        query = query.filter(Recipe.calories.between(min_calories, max_calories))
+        query = query.where(Recipe.calories.between(min_calories, max_calories))
 
-    query = query.join(RecipesDishType).join(DishType).filter(DishType.name.in_(db_dish_types))
+    query = query.join(RecipesDishType).join(DishType).where(DishType.name.in_(db_dish_types))
 
     if preferences.diet_type_id and preferences.diet_type_id != MealPlanConfig.BALANCE_DIET_ID:
         if preferences.diet_type_id == MealPlanConfig.VEGETARIAN_DIET_ID:
-            query = query.join(RecipesDietType, isouter=True).filter(
+            query = query.join(RecipesDietType, isouter=True).where(
                 or_(
                     RecipesDietType.diet_type_id == preferences.diet_type_id,
                     Recipe.vegetarian == True,
@@ -77,48 +233,51 @@ def get_recipe_suggestions_from_db(
                 )
             )
         elif preferences.diet_type_id == MealPlanConfig.VEGAN_DIET_ID:
-            query = query.join(RecipesDietType, isouter=True).filter(
+            query = query.join(RecipesDietType, isouter=True).where(
                 or_(
                     RecipesDietType.diet_type_id == preferences.diet_type_id,
                     Recipe.vegan == True
                 )
             )
         elif preferences.diet_type_id == MealPlanConfig.GLUTEN_FREE_DIET_ID:
-            query = query.join(RecipesDietType, isouter=True).filter(
+            query = query.join(RecipesDietType, isouter=True).where(
                 or_(
                     RecipesDietType.diet_type_id == preferences.diet_type_id,
                     Recipe.gluten_free == True
                 )
             )
         elif preferences.diet_type_id == MealPlanConfig.DAIRY_FREE_DIET_ID:
-            query = query.join(RecipesDietType, isouter=True).filter(
+            query = query.join(RecipesDietType, isouter=True).where(
                 or_(
                     RecipesDietType.diet_type_id == preferences.diet_type_id,
                     Recipe.dairy_free == True
                 )
             )
         elif preferences.diet_type_id == MealPlanConfig.LOW_FODMAP_DIET_ID:
-            query = query.join(RecipesDietType, isouter=True).filter(
+            query = query.join(RecipesDietType, isouter=True).where(
                 or_(
                     RecipesDietType.diet_type_id == preferences.diet_type_id,
                     Recipe.low_fodmap == True
                 )
             )
         else:
-            query = query.join(RecipesDietType).filter(RecipesDietType.diet_type_id == preferences.diet_type_id)
+            query = query.join(RecipesDietType).where(RecipesDietType.diet_type_id == preferences.diet_type_id)
 
     # Filter by intolerances
     if preferences.intolerances:
         for intolerance_obj in preferences.intolerances:
             intolerance_name = intolerance_obj.name.lower()
             if 'gluten' in intolerance_name:
-                query = query.filter(Recipe.gluten_free == True)
+                query = query.where(Recipe.gluten_free == True)
             if 'dairy' in intolerance_name:
-                query = query.filter(Recipe.dairy_free == True)
+                query = query.where(Recipe.dairy_free == True)
+        allergen_filter = _allergen_filter(preferences)
+        if allergen_filter is not None:
+            query = query.where(allergen_filter)
 
     if preferences.cuisines:
         cuisine_ids = [cuisine.id for cuisine in preferences.cuisines]
-        query = query.outerjoin(Recipe.cuisines).filter(
+        query = query.outerjoin(Recipe.cuisines).where(
             or_(
                 CuisineRegion.id.in_(cuisine_ids),
                 CuisineRegion.id.is_(None)
@@ -126,16 +285,11 @@ def get_recipe_suggestions_from_db(
         )
 
     query = query.distinct()
-    ranked_query = query.order_by(
+    return query.order_by(
         desc(Recipe.health_score),
         desc(Recipe.spoonacular_score),
         Recipe.id.asc()
     )
-
-    page = ranked_query.offset(offset).limit(limit).all()
-    random.shuffle(page)
-
-    return page
     
 
 def _create_recipe_nutrients(db: Session, recipe_id: int, nutrients_data: list) -> list[RecipesNutrient]:
@@ -184,9 +338,36 @@ def _create_recipe_ingredients(db: Session, recipe_id: int, ingredients_data: li
             processed_ingredient_ids.add(db_ingredient.id)
     return recipe_ingredients
 
-def get_or_create_spoonacular_recipe(db: Session, recipe_data: dict):
+def get_recipes_by_spoonacular_ids(db: Session, spoonacular_ids: list[int]) -> dict[int, Recipe]:
+    """Loads in one query the already imported recipes among the given Spoonacular ids, with their diets"""
+    if not spoonacular_ids:
+        return {}
+    recipes = db.scalars(
+        select(Recipe)
+        .where(Recipe.spoonacular_id.in_(spoonacular_ids))
+        .options(selectinload(Recipe.diet_types))
+    ).all()
+    return {recipe.spoonacular_id: recipe for recipe in recipes}
+
+def get_recipes_with_dish_types(db: Session, recipe_ids: list[int]) -> list[Recipe]:
+    """Loads the recipes with their dish types in two queries, keeping the order of recipe_ids"""
+    if not recipe_ids:
+        return []
+    recipes = db.scalars(
+        select(Recipe).where(Recipe.id.in_(recipe_ids)).options(load_only(*RECIPE_LIST_COLUMNS), selectinload(Recipe.dish_types))
+    ).all()
+    recipes_by_id = {recipe.id: recipe for recipe in recipes}
+    return [recipes_by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes_by_id]
 
-    recipe = db.query(Recipe).filter_by(spoonacular_id=recipe_data["id"]).first()
+def get_or_create_spoonacular_recipe(db: Session, recipe_data: dict, existing_recipes: dict[int, Recipe] | None = None):
+    """
+    Returns the stored recipe for the Spoonacular data, importing it if needed.
+    'existing_recipes' (from get_recipes_by_spoonacular_ids) replaces the per-recipe lookup when importing a batch.
+    """
+    if existing_recipes is not None:
+        recipe = existing_recipes.get(recipe_data["id"])
+    else:
+        recipe = db.query(Recipe).filter_by(spoonacular_id=recipe_data["id"]).first()
     if recipe:
         return recipe, False
     
@@ -257,10 +438,17 @@ def get_or_create_spoonacular_recipe(db: Session, recipe_data: dict):
 
     all_associations = []
     all_associations.extend(_create_recipe_nutrients(db, new_recipe.id, recipe_data.get("nutrition", {}).get("nutrients", [])))
-    all_associations.extend(_create_recipe_ingredients(db, new_recipe.id, recipe_data.get("extendedIngredients")))
+    recipe_ingredients = _create_recipe_ingredients(db, new_recipe.id, recipe_data.get("extendedIngredients"))
+    all_associations.extend(recipe_ingredients)
 
     if all_associations:
         db.add_all(all_associations)
-               
+
+    ingredient_ids = [recipe_ingredient.ingredient_id for recipe_ingredient in recipe_ingredients]
+    tag_ingredients(db, ingredient_ids)
+    new_recipe.allergen_flags = ingredient_allergen_flags(db, ingredient_ids)
+
+    if existing_recipes is not None:
+        existing_recipes[new_recipe.spoonacular_id] = new_recipe
     return new_recipe, True
 
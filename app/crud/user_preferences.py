@@ -1,3 +1,4 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session, selectinload
 from app.models import UserPreferences
 
@@ -26,4 +27,16 @@ def get_user_preferences_details(db: Session, user_id: int) -> UserPreferences |
 
     return preferences
 
-
+def get_users_preferences_details(db: Session, user_ids: list[int]) -> list[UserPreferences]:
+    """get_user_preferences_details for many users, in four queries"""
+    if not user_ids:
+        return []
+    return list(db.scalars(
+        select(UserPreferences)
+        .where(UserPreferences.user_id.in_(user_ids))
+        .options(
+            selectinload(UserPreferences.diet_type),
+            selectinload(UserPreferences.cuisines),
+            selectinload(UserPreferences.intolerances)
+        )
+    ).all())
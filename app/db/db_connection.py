@@ -1,6 +1,12 @@
+import logging
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import URL, create_engine, make_url, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.core.metrics import instrument_pool
+from app.core.request_metrics import instrument_sqlalchemy
+from app.db.pool import TimedQueuePool, pool_status
+
+logger = logging.getLogger(__name__)
 
 # Creation of the database engine
 engine = None
@@ -9,6 +15,20 @@ SessionLocal = None
 # Base class for declarative models
 Base = declarative_base()
 
+def _pool_options(settings, db_url: str | URL | None) -> dict:
+    """Pool configuration from the settings. SQLite keeps the pool chosen by SQLAlchemy"""
+    if db_url is not None and make_url(db_url).get_backend_name() == "sqlite":
+        return {"pool_pre_ping": settings.db_pool_pre_ping}
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
 def init_db():
     global engine, SessionLocal
     from app.core.config import get_settings
@@ -38,13 +58,42 @@ def init_db():
             "mysql+pymysql://",
             creator=getconn,
             echo=False,
-            pool_recycle=1800 
+            **_pool_options(settings, None)
         )
     else:
         db_url = settings.database_url
-        engine = create_engine(db_url, echo=False)
+        engine = create_engine(db_url, echo=False, **_pool_options(settings, db_url))
     
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    instrument_sqlalchemy()
+    instrument_pool(engine.pool, "sync")
+
+
+def warmup_db_pool(connections: int):
+    """Opens connections at startup so the first requests don't pay connect + TLS + auth"""
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        logger.warning("Could not warm up the database pool.", exc_info=True)
+    finally:
+        for connection in opened:
+            connection.close()
+    logger.info(f"Database pool warmed up with {len(opened)} connections.")
+
+
+def get_pool_status() -> dict:
+    return {
+        "sync": pool_status(engine.pool) if engine is not None else None,
+    }
+
+
+def close_db():
+    if engine is not None:
+        engine.dispose()
 
 
 def get_db():
@@ -61,4 +110,4 @@ def get_sync_session():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
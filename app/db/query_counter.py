@@ -0,0 +1,58 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((?:[^()]*)\)", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapses whitespace and IN lists so the same query with different parameters compares equal"""
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryCounter:
+    """SQL statements executed on any engine while the counter is active"""
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = 3) -> dict[str, int]:
+        """Statements executed at least 'threshold' times: the signature of an N+1 query"""
+        counts = Counter(normalize_statement(statement) for statement in self.statements)
+        return {statement: n for statement, n in counts.items() if n >= threshold}
+
+    def report(self) -> str:
+        return "\n".join(f"{i}. {normalize_statement(statement)}" for i, statement in enumerate(self.statements, 1))
+
+    def assert_max(self, budget: int):
+        assert self.count <= budget, f"Expected at most {budget} queries, got {self.count}:\n{self.report()}"
+
+    def assert_no_n_plus_one(self, threshold: int = 3):
+        repeated = self.repeated(threshold)
+        assert not repeated, "Possible N+1 queries:\n" + "\n".join(f"{n}x {s}" for s, n in repeated.items())
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the SQL statements executed inside the block, e.g.
+
+        with count_queries() as queries:
+            client.get("/meal_plans/me")
+        queries.assert_max(3)
+    """
+    counter = QueryCounter()
+    event.listen(Engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", counter._record)
@@ -2,11 +2,14 @@ from app.models.badge import Badge
 from app.models.cuisine_region import CuisineRegion
 from app.models.diet_type import DietType
 from app.models.dish_type import DishType
+from app.models.idempotency_key import IdempotencyKey
 from app.models.ingredient import Ingredient
+from app.models.ingredient_allergen import IngredientAllergen
 from app.models.ingredients_product import IngredientsProduct
 from app.models.intolerance import Intolerance
 from app.models.meal_item import MealItem
 from app.models.meal_plan import MealPlan
+from app.models.meal_plan_job import MealPlanJob, MealPlanJobStatus
 from app.models.nutrient import Nutrient
 from app.models.product import Product
 from app.models.products_badge import ProductsBadge
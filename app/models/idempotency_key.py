@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey, TIMESTAMP, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+
+from app.db.db_connection import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)
+    # Method and path the key was first used with: reusing it for another request is a client bug
+    endpoint = Column(String(100), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False, default=func.now())
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+
+    user = relationship("User", back_populates="idempotency_keys")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+    )
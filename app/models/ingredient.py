@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Column, Integer, String
+from sqlalchemy import JSON, Boolean, Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db.db_connection import Base
@@ -14,6 +14,8 @@ class Ingredient(Base):
     aisle = Column(String(100), nullable=True)
     possible_units_en = Column(JSON, nullable=True)
     possible_units_es = Column(JSON, nullable=True)
+    # Whether the keyword rules already wrote its ingredient_allergens rows
+    allergens_tagged = Column(Boolean, nullable=False, default=False, server_default="0")
     
     ingredients_products = relationship("IngredientsProduct", back_populates="ingredient")
     recipes_ingredients = relationship("RecipesIngredient", back_populates="ingredient")
\ No newline at end of file
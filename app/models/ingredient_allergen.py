@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, ForeignKey
+
+from app.db.db_connection import Base
+
+class IngredientAllergen(Base):
+    """Intolerances an ingredient is not safe for, derived from its name and curated by hand"""
+    __tablename__ = 'ingredient_allergens'
+    
+    ingredient_id = Column(Integer, ForeignKey('ingredients.id', ondelete="CASCADE"), primary_key=True)
+    intolerance_id = Column(Integer, ForeignKey('intolerances.id', ondelete="CASCADE"), primary_key=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, TIMESTAMP, func
+from sqlalchemy import Boolean, Column, Index, Integer, ForeignKey, String, TIMESTAMP, false, func
 from sqlalchemy.orm import relationship
 from app.db.db_connection import Base
 
@@ -9,6 +9,13 @@ class MealPlan(Base):
     user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    # Generated ahead of time by /tasks/precompute-meal-plans: hidden until the user asks for a new plan
+    is_precomputed = Column(Boolean, nullable=False, default=False, server_default=false())
+    preferences_fingerprint = Column(String(64), nullable=True)
 
     user = relationship("User", back_populates="meal_plans")
-    meal_items = relationship("MealItem", back_populates="meal_plan", cascade="all, delete-orphan",  passive_deletes=True)
\ No newline at end of file
+    meal_items = relationship("MealItem", back_populates="meal_plan", cascade="all, delete-orphan",  passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_meal_plans_is_precomputed_created_at", "is_precomputed", "created_at"),
+    )
@@ -0,0 +1,40 @@
+import enum
+from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey, Enum, Index, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+
+from app.db.db_connection import Base
+
+class MealPlanJobStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class MealPlanJob(Base):
+    __tablename__ = 'meal_plan_jobs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(MealPlanJobStatus), nullable=False, default=MealPlanJobStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Set while a worker runs the job: past it, the worker is presumed dead and the job is claimed again
+    locked_until = Column(TIMESTAMP, nullable=True)
+    # The user id while the job is pending or running, NULL afterwards: the unique index allows one active job per user
+    active_user_id = Column(Integer, nullable=True)
+
+    meal_plan_id = Column(Integer, ForeignKey("meal_plans.id", ondelete="SET NULL"), nullable=True)
+    generation_status = Column(String(30), nullable=True)
+    error_code = Column(String(64), nullable=True)
+    error_message = Column(String(255), nullable=True)
+
+    created_at = Column(TIMESTAMP, default=func.now())
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+
+    user = relationship("User", back_populates="meal_plan_jobs")
+
+    __table_args__ = (
+        Index("ix_meal_plan_jobs_status_locked_until", "status", "locked_until"),
+        Index("ix_meal_plan_jobs_user_id", "user_id"),
+        UniqueConstraint("active_user_id", name="uq_meal_plan_jobs_active_user_id"),
+    )
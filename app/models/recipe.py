@@ -1,6 +1,8 @@
-from sqlalchemy import JSON, TIMESTAMP, Column, ForeignKey, Integer, String, Boolean, Float, Text, func
-from sqlalchemy.orm import relationship
+from itertools import chain
+from sqlalchemy import JSON, TIMESTAMP, BigInteger, Column, ForeignKey, Index, Integer, String, Boolean, Float, Text, event, func, inspect
+from sqlalchemy.orm import Session, relationship
 
+from app.core.recipe_flags import BOOLEAN_DIETS, set_recipe_flags
 from app.db.db_connection import Base
 
 class Recipe(Base):
@@ -35,6 +37,13 @@ class Recipe(Base):
     cooking_min = Column(Integer, nullable=True)
     calories = Column(Float, nullable=True)
 
+    # Bitmasks of app.core.recipe_flags, kept up to date on flush
+    diet_flags = Column(BigInteger, nullable=False, default=0, server_default="0")
+    dish_type_flags = Column(BigInteger, nullable=False, default=0, server_default="0")
+    cuisine_flags = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Allergens of its ingredients (app.services.allergens), NULL until tagged
+    allergen_flags = Column(BigInteger, nullable=True)
+
     analyzed_instructions = Column(JSON, nullable=True)
     analyzed_instructions_es = Column(JSON, nullable=True)
     created_at = Column(TIMESTAMP, default=func.now())
@@ -47,4 +56,26 @@ class Recipe(Base):
     recipes_nutrients = relationship("RecipesNutrient", back_populates="recipe", cascade="all, delete-orphan", passive_deletes=True)
     recipes_ingredients = relationship("RecipesIngredient", back_populates="recipe", cascade="all, delete-orphan",passive_deletes=True)
     meal_items = relationship("MealItem", back_populates="recipe", cascade="all, delete-orphan", passive_deletes=True)
-    creator = relationship("User", back_populates="created_recipes")
\ No newline at end of file
+    creator = relationship("User", back_populates="created_recipes")
+
+    __table_args__ = (
+        # Suggestions are ranked by the scores: scanning in that order with the filters read
+        # from the index stops as soon as the page is full
+        Index(
+            "ix_recipes_suggestions",
+            "health_score", "spoonacular_score", "dish_type_flags", "diet_flags", "cuisine_flags", "calories",
+        ),
+    )
+
+
+_FLAG_SOURCES = (*BOOLEAN_DIETS, "diet_types", "dish_types", "cuisines")
+
+
+@event.listens_for(Session, "before_flush")
+def _refresh_recipe_flags(session, flush_context, instances):
+    for obj in chain(session.new, session.dirty):
+        if not isinstance(obj, Recipe):
+            continue
+        state = inspect(obj)
+        if state.pending or any(state.attrs[name].history.has_changes() for name in _FLAG_SOURCES):
+            set_recipe_flags(obj)
@@ -30,4 +30,6 @@ class User(Base):
     password_reset_codes = relationship("PasswordResetCode", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     created_recipes = relationship("Recipe", back_populates="creator", cascade="all, delete-orphan", passive_deletes=True)
-    feedback = relationship("Feedback", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
+    feedback = relationship("Feedback", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    meal_plan_jobs = relationship("MealPlanJob", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    idempotency_keys = relationship("IdempotencyKey", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from app.schemas.meal_plan import MealPlanResponse
+from app.schemas.shopping_list import ShoppingListSummary
+from app.schemas.user import UserResponse
+from app.schemas.user_preferences import UserPreferencesResponse
+
+
+class HomeResponse(BaseModel):
+    user: UserResponse
+    preferences: UserPreferencesResponse | None = None
+    meal_plan: MealPlanResponse | None = None
+    shopping_list: ShoppingListSummary | None = None
@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic import BaseModel, ConfigDict, Field
 
 from app.schemas.recipe import RecipeShort
@@ -24,6 +25,16 @@ class GeneratedMealResponse(BaseModel):
     meal_plan: MealPlanResponse
     status: str
 
+class MealPlanJobError(BaseModel):
+    code: str
+    message: str
+
+class MealPlanJobResponse(BaseModel):
+    job_id: int
+    status: Literal["pending", "running", "succeeded", "failed"]
+    result: GeneratedMealResponse | None = None
+    error: MealPlanJobError | None = None
+
 class MealItemCreate(BaseModel):
     meal_plan_id: int
     recipe_id: int
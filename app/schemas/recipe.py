@@ -5,6 +5,8 @@ from app.schemas.ingredient import IngredientShort
 from app.schemas.nutrient import NutrientDetail
 from app.schemas.user_preferences import CuisineResponse, DietResponse
 
+# A week of meal slots with room to spare
+MAX_BATCH_RECIPES = 50
 
 
 class RecipeShort(BaseModel):
@@ -121,6 +123,15 @@ class RecipesListResponse(BaseModel):
     recipes: list[RecipeShort]
     model_config = ConfigDict(from_attributes=True)
 
+class RecipeDetailsBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_RECIPES)
+    fields: list[str] | None = None
+
+class RecipeDetailsBatchResponse(BaseModel):
+    """RecipeDetailResponse objects, trimmed to the requested fields"""
+    recipes: list[dict[str, Any]]
+    missing_ids: list[int]
+
 class RecipeId(BaseModel):
     new_recipe_id: int
 
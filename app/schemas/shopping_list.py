@@ -19,4 +19,8 @@ class Aisle(BaseModel):
 
 class ShoppingListResponse(BaseModel):
     aisles: list[Aisle]
-    cost: float
\ No newline at end of file
+    cost: float
+
+class ShoppingListSummary(BaseModel):
+    item_count: int
+    aisles: list[str]
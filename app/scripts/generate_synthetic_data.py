@@ -0,0 +1,469 @@
+"""
+Fills a database with a synthetic but realistic catalogue (recipes, ingredients, dish types,
+diets, cuisines) and users with preferences and meal plans, to benchmark the app at production scale.
+
+The output only depends on the seed and the sizes, and rows are written with bulk Core inserts,
+so a million rows take seconds on SQLite and well under a minute on MySQL.
+
+Every generated user can log in with SYNTHETIC_PASSWORD.
+
+Usage:
+    python -m app.scripts.generate_synthetic_data --database-url sqlite:///bench.db --create-schema \\
+        --recipes 200000 --ingredients 3000 --users 100000 --seed 42
+"""
+import argparse
+import bisect
+import itertools
+import logging
+import random
+import time
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from app.core import recipe_flags
+from app.core.meal_plan_config import MealPlanConfig
+from app.core.security import hash_password
+from app.db.db_connection import Base
+from app.models import (
+    CuisineRegion,
+    DietType,
+    DishType,
+    Ingredient,
+    Intolerance,
+    MealItem,
+    MealPlan,
+    Recipe,
+    RecipesCuisine,
+    RecipesDietType,
+    RecipesDishType,
+    RecipesIngredient,
+    User,
+    UserPreferences,
+    UserPreferencesIntolerance,
+)
+from app.services.allergens import tag_ingredients, tag_recipes
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_PASSWORD = "synthetic-password"
+# example.com: the ".test" TLD fails the EmailStr validation of the login response
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.example.com"
+
+# Spoonacular diet names in the order they were created in production, so the ids
+# match MealPlanConfig (balance=1, vegetarian=2, vegan=3, gluten free=4, dairy free=5, low fodmap=12)
+DIET_NAMES = [
+    "balance", "vegetarian", "vegan", "gluten free", "dairy free", "ketogenic",
+    "lacto ovo vegetarian", "pescatarian", "paleo", "primal", "whole30", "low fodmap",
+]
+
+# Main dish type of a recipe -> (share of the catalogue, median calories per serving)
+DISH_TYPE_PROFILES = {
+    "main course": (0.34, 620),
+    "breakfast": (0.16, 420),
+    "side dish": (0.10, 250),
+    "dessert": (0.10, 380),
+    "salad": (0.08, 330),
+    "soup": (0.08, 300),
+    "snack": (0.06, 220),
+    "appetizer": (0.04, 240),
+    "beverage": (0.02, 150),
+    "fingerfood": (0.02, 200),
+}
+EXTRA_DISH_TYPES = {"main course": ["lunch", "dinner"], "breakfast": ["brunch", "morning meal"]}
+
+CUISINES = [
+    "Italian", "Mexican", "American", "Mediterranean", "Asian", "Indian", "French", "Chinese",
+    "Spanish", "Greek", "Thai", "Japanese", "Middle Eastern", "Southern", "Latin American",
+    "Korean", "Vietnamese", "German", "British", "Caribbean", "African", "Nordic",
+]
+
+INTOLERANCE_NAMES = [
+    "dairy", "egg", "gluten", "grain", "peanut", "seafood", "sesame", "shellfish", "soy", "sulfite", "tree nut", "wheat",
+]
+
+AISLES = [
+    "Produce", "Spices and Seasonings", "Baking", "Milk, Eggs, Other Dairy", "Meat", "Canned and Jarred",
+    "Pasta and Rice", "Oil, Vinegar, Salad Dressing", "Cheese", "Seafood", "Frozen", "Condiments", "Nuts",
+]
+INGREDIENT_WORDS = [
+    "tomato", "onion", "garlic", "chicken", "rice", "pepper", "carrot", "lemon", "basil", "bean",
+    "potato", "spinach", "mushroom", "salmon", "egg", "flour", "butter", "yogurt", "almond", "oat",
+]
+UNITS = ["g", "ml", "cup", "tbsp", "tsp", "piece", "pinch"]
+
+# Text and JSON of the size Spoonacular returns (~1 KB summary, ~2 KB instructions per language),
+# shared by every recipe so they do not change the random stream
+SUMMARY = ("This dish is a <b>synthetic</b> recipe whose summary is as long as a typical Spoonacular one. " * 10).strip()
+SUMMARY_ES = ("Este plato es una receta <b>sintética</b> con un resumen tan largo como uno típico de Spoonacular. " * 10).strip()
+ANALYZED_INSTRUCTIONS = [{"name": "", "steps": [
+    {"number": n, "step": "Mix the ingredients in a large bowl, season to taste and cook over medium heat until golden and tender.",
+     "ingredients": [{"id": 0, "name": "ingredient", "localizedName": "ingredient", "image": ""}],
+     "equipment": [{"id": 0, "name": "bowl", "localizedName": "bowl", "image": ""}]}
+    for n in range(1, 9)
+]}]
+ANALYZED_INSTRUCTIONS_ES = [{"name": "", "steps": [
+    {**step, "step": "Mezcla los ingredientes en un bol grande, sazona al gusto y cocina a fuego medio hasta que estén dorados."}
+    for step in ANALYZED_INSTRUCTIONS[0]["steps"]
+]}]
+
+# User diet -> share of users
+USER_DIET_SHARES = {
+    MealPlanConfig.BALANCE_DIET_ID: 0.60,
+    MealPlanConfig.VEGETARIAN_DIET_ID: 0.15,
+    MealPlanConfig.VEGAN_DIET_ID: 0.08,
+    MealPlanConfig.GLUTEN_FREE_DIET_ID: 0.07,
+    MealPlanConfig.DAIRY_FREE_DIET_ID: 0.05,
+    MealPlanConfig.LOW_FODMAP_DIET_ID: 0.05,
+}
+
+
+class WeightedSampler:
+    """Fast repeated sampling from a fixed weighted population"""
+    def __init__(self, population: list, weights: list[float]):
+        self.population = population
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.total = self.cum_weights[-1]
+
+    def sample(self, rng: random.Random):
+        return self.population[bisect.bisect(self.cum_weights, rng.random() * self.total)]
+
+    def sample_distinct(self, rng: random.Random, k: int) -> set:
+        chosen = set()
+        while len(chosen) < min(k, len(self.population)):
+            chosen.add(self.sample(rng))
+        return chosen
+
+
+def zipf_weights(n: int, exponent: float = 1.1) -> list[float]:
+    """Popularity of the n-th most used item: a few ingredients (salt, oil...) appear everywhere"""
+    return [1 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+class SyntheticDataGenerator:
+    def __init__(self, connection: Connection, seed: int = 42, batch_size: int = 10_000):
+        self.connection = connection
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.row_counts: dict[str, int] = {}
+
+    def _next_id(self, model) -> int:
+        return (self.connection.scalar(select(func.max(model.id))) or 0) + 1
+
+    def _bulk_insert(self, model, rows):
+        """Inserts the rows (an iterable of dicts) in batches with executemany"""
+        table = model.__table__
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.connection.execute(insert(table), batch)
+                self.row_counts[table.name] = self.row_counts.get(table.name, 0) + len(batch)
+                batch = []
+        if batch:
+            self.connection.execute(insert(table), batch)
+            self.row_counts[table.name] = self.row_counts.get(table.name, 0) + len(batch)
+
+    def _get_or_create_names(self, model, names: list[str]) -> dict[str, int]:
+        existing = {name: id for id, name in self.connection.execute(select(model.id, model.name))}
+        next_id = self._next_id(model)
+        missing = [name for name in names if name not in existing]
+        self._bulk_insert(model, ({"id": next_id + i, "name": name} for i, name in enumerate(missing)))
+        existing.update({name: next_id + i for i, name in enumerate(missing)})
+        return existing
+
+    def generate_reference_data(self):
+        self.dish_type_ids = self._get_or_create_names(
+            DishType, list(DISH_TYPE_PROFILES) + [name for extra in EXTRA_DISH_TYPES.values() for name in extra]
+        )
+        self.diet_ids = self._get_or_create_names(DietType, DIET_NAMES)
+        self.cuisine_ids = self._get_or_create_names(CuisineRegion, CUISINES)
+        self.intolerance_ids = self._get_or_create_names(Intolerance, INTOLERANCE_NAMES)
+
+    def generate_ingredients(self, count: int):
+        rng = self.rng
+        first_id = self._next_id(Ingredient)
+        spoonacular_offset = 900_000_000
+        words = INGREDIENT_WORDS
+
+        def rows():
+            for i in range(count):
+                name = f"{words[i % len(words)]} {i // len(words)}" if i >= len(words) else words[i]
+                yield {
+                    "id": first_id + i,
+                    "spoonacular_id": spoonacular_offset + first_id + i,
+                    "name_en": f"synthetic {name}",
+                    "name_es": f"sintético {name}",
+                    "image_filename": f"{name.replace(' ', '-')}.jpg",
+                    "aisle": AISLES[rng.randrange(len(AISLES))],
+                }
+
+        self._bulk_insert(Ingredient, rows())
+        ids = list(range(first_id, first_id + count))
+        self.ingredient_sampler = WeightedSampler(ids, zipf_weights(count))
+
+    def generate_recipes(self, count: int, min_ingredients: int = 5, max_ingredients: int = 15):
+        rng = self.rng
+        first_id = self._next_id(Recipe)
+        spoonacular_offset = 900_000_000
+        main_dish_sampler = WeightedSampler(list(DISH_TYPE_PROFILES), [share for share, _ in DISH_TYPE_PROFILES.values()])
+        cuisine_sampler = WeightedSampler(list(self.cuisine_ids.values()), zipf_weights(len(self.cuisine_ids), 0.8))
+        self.recipes_by_dish_type: dict[str, list[int]] = {name: [] for name in DISH_TYPE_PROFILES}
+        cuisine_names = {cuisine_id: name for name, cuisine_id in self.cuisine_ids.items()}
+
+        recipe_rows, dish_rows, diet_rows, cuisine_rows, ingredient_rows = [], [], [], [], []
+
+        def flush():
+            self._bulk_insert(Recipe, recipe_rows)
+            self._bulk_insert(RecipesDishType, dish_rows)
+            self._bulk_insert(RecipesDietType, diet_rows)
+            self._bulk_insert(RecipesCuisine, cuisine_rows)
+            self._bulk_insert(RecipesIngredient, ingredient_rows)
+            for rows in (recipe_rows, dish_rows, diet_rows, cuisine_rows, ingredient_rows):
+                rows.clear()
+
+        for recipe_id in range(first_id, first_id + count):
+            main_dish = main_dish_sampler.sample(rng)
+            self.recipes_by_dish_type[main_dish].append(recipe_id)
+            median_calories = DISH_TYPE_PROFILES[main_dish][1]
+
+            vegetarian = rng.random() < 0.30
+            vegan = vegetarian and rng.random() < 0.40
+            gluten_free = rng.random() < 0.35
+            dairy_free = vegan or rng.random() < 0.25
+            low_fodmap = rng.random() < 0.05
+            ready_min = rng.choice((10, 15, 20, 25, 30, 45, 60, 90))
+
+            recipe_row = {
+                "id": recipe_id,
+                "spoonacular_id": spoonacular_offset + recipe_id,
+                "title": f"Synthetic {main_dish} {recipe_id}",
+                "title_es": f"Receta sintética {recipe_id}",
+                "image_url": f"https://img.spoonacular.com/recipes/{spoonacular_offset + recipe_id}-556x370.jpg",
+                "image_type": "jpg",
+                "health_score": round(min(100.0, rng.betavariate(2, 5) * 100), 1),
+                "spoonacular_score": round(min(100.0, rng.betavariate(5, 2) * 100), 1),
+                "ready_min": ready_min,
+                "preparation_min": ready_min // 3,
+                "cooking_min": ready_min - ready_min // 3,
+                "servings": rng.choice((1, 2, 2, 4, 4, 4, 6, 8)),
+                "vegetarian": vegetarian,
+                "vegan": vegan,
+                "gluten_free": gluten_free,
+                "dairy_free": dairy_free,
+                "very_healthy": rng.random() < 0.1,
+                "cheap": rng.random() < 0.1,
+                "very_popular": rng.random() < 0.05,
+                "sustainable": rng.random() < 0.05,
+                "low_fodmap": low_fodmap,
+                "calories": round(rng.lognormvariate(0, 0.35) * median_calories, 1),
+                "summary": SUMMARY,
+                "summary_es": SUMMARY_ES,
+                "analyzed_instructions": ANALYZED_INSTRUCTIONS,
+                "analyzed_instructions_es": ANALYZED_INSTRUCTIONS_ES,
+            }
+
+            dish_type_names = {main_dish}
+            for extra in EXTRA_DISH_TYPES.get(main_dish, []):
+                if rng.random() < 0.5:
+                    dish_type_names.add(extra)
+            dish_rows.extend({"recipe_id": recipe_id, "dish_type_id": self.dish_type_ids[name]} for name in dish_type_names)
+
+            diets = set()
+            if vegetarian:
+                diets.update(("vegetarian", "lacto ovo vegetarian"))
+            if vegan:
+                diets.add("vegan")
+            if gluten_free:
+                diets.add("gluten free")
+            if dairy_free:
+                diets.add("dairy free")
+            if low_fodmap:
+                diets.add("low fodmap")
+            if not vegetarian and rng.random() < 0.1:
+                diets.add(rng.choice(("ketogenic", "pescatarian", "paleo", "primal", "whole30")))
+            diet_rows.extend({"recipe_id": recipe_id, "diet_type_id": self.diet_ids[name]} for name in diets)
+
+            cuisines = set()
+            if rng.random() < 0.6:
+                cuisines = cuisine_sampler.sample_distinct(rng, rng.choice((1, 1, 2)))
+                cuisine_rows.extend({"recipe_id": recipe_id, "cuisine_id": cuisine_id} for cuisine_id in cuisines)
+
+            recipe_row["diet_flags"] = recipe_flags.diet_flags(
+                diets, vegetarian=vegetarian, vegan=vegan, gluten_free=gluten_free, dairy_free=dairy_free, low_fodmap=low_fodmap
+            )
+            recipe_row["dish_type_flags"] = recipe_flags.dish_type_flags(dish_type_names)
+            recipe_row["cuisine_flags"] = recipe_flags.cuisine_flags(cuisine_names[cuisine_id] for cuisine_id in cuisines)
+            recipe_rows.append(recipe_row)
+
+            ingredients = self.ingredient_sampler.sample_distinct(rng, rng.randint(min_ingredients, max_ingredients))
+            ingredient_rows.extend(
+                {
+                    "recipe_id": recipe_id,
+                    "ingredient_id": ingredient_id,
+                    "amount": round(rng.uniform(0.25, 500), 2),
+                    "unit": rng.choice(UNITS),
+                }
+                for ingredient_id in ingredients
+            )
+
+            if len(ingredient_rows) >= self.batch_size:
+                flush()
+        flush()
+
+    def generate_users(self, count: int, with_meal_plan_ratio: float = 0.7):
+        rng = self.rng
+        first_user_id = self._next_id(User)
+        first_preferences_id = self._next_id(UserPreferences)
+        first_meal_plan_id = self._next_id(MealPlan)
+        first_meal_item_id = self._next_id(MealItem)
+        hashed_password = hash_password(SYNTHETIC_PASSWORD)
+        diet_sampler = WeightedSampler(list(USER_DIET_SHARES), list(USER_DIET_SHARES.values()))
+        intolerance_sampler = WeightedSampler(list(self.intolerance_ids.values()), zipf_weights(len(self.intolerance_ids)))
+        breakfasts = self.recipes_by_dish_type.get("breakfast", [])
+        mains = self.recipes_by_dish_type.get("main course", [])
+        if count and with_meal_plan_ratio > 0 and not (breakfasts and mains):
+            raise ValueError(
+                "Meal plans need breakfast and main course recipes: generate more recipes "
+                "or set the meal plan ratio to 0."
+            )
+
+        user_rows, preferences_rows, intolerance_rows, meal_plan_rows, meal_item_rows = [], [], [], [], []
+        meal_plan_id = first_meal_plan_id
+        meal_item_id = first_meal_item_id
+
+        def flush():
+            self._bulk_insert(User, user_rows)
+            self._bulk_insert(UserPreferences, preferences_rows)
+            self._bulk_insert(UserPreferencesIntolerance, intolerance_rows)
+            self._bulk_insert(MealPlan, meal_plan_rows)
+            self._bulk_insert(MealItem, meal_item_rows)
+            for rows in (user_rows, preferences_rows, intolerance_rows, meal_plan_rows, meal_item_rows):
+                rows.clear()
+
+        for i in range(count):
+            user_id = first_user_id + i
+            preferences_id = first_preferences_id + i
+            user_rows.append({
+                "id": user_id,
+                "username": f"synthetic_{user_id}",
+                "email": f"user{user_id}@{SYNTHETIC_EMAIL_DOMAIN}",
+                "hashed_password": hashed_password,
+                "name": f"Synthetic {user_id}",
+                "gender": rng.choice(("male", "female")),
+                "age": rng.randint(18, 75),
+                "weight": round(rng.gauss(72, 12), 1),
+                "height": round(rng.gauss(170, 9), 1),
+                "auth_method": "traditional",
+                "is_verified": True,
+            })
+            preferences_rows.append({
+                "id": preferences_id,
+                "user_id": user_id,
+                "diet_type_id": diet_sampler.sample(rng),
+                "calories_goal": round(max(1200.0, rng.gauss(2100, 350))),
+                "max_ready_min": rng.choice((None, 30, 45, 60)),
+                "servings": rng.choice((1, 2, 2, 4)),
+                "sustainable": False,
+                "activity_level": rng.choice(("sedentary", "light", "moderate", "high", "very_high")),
+                "goal": rng.choice(("lose_weight", "maintain_weight", "gain_weight")),
+            })
+            if rng.random() < 0.2:
+                intolerances = intolerance_sampler.sample_distinct(rng, rng.choice((1, 1, 2)))
+                intolerance_rows.extend({"preference_id": preferences_id, "intolerance_id": id} for id in intolerances)
+
+            if rng.random() < with_meal_plan_ratio:
+                meal_plan_rows.append({"id": meal_plan_id, "user_id": user_id})
+                for day in range(MealPlanConfig.DAYS_IN_PLAN):
+                    for slot, meal_type, pool in ((0, "breakfast", breakfasts), (1, "lunch", mains), (2, "dinner", mains)):
+                        meal_item_rows.append({
+                            "id": meal_item_id,
+                            "day": day,
+                            "slot": slot,
+                            "meal_type": meal_type,
+                            "meal_plan_id": meal_plan_id,
+                            "recipe_id": pool[rng.randrange(len(pool))],
+                        })
+                        meal_item_id += 1
+                meal_plan_id += 1
+
+            if len(meal_item_rows) >= self.batch_size:
+                flush()
+        flush()
+
+
+def _fast_sqlite_writes(engine: Engine):
+    """Trades durability for speed while loading throwaway benchmark data"""
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.close()
+
+
+def generate(
+    database_url: str,
+    recipes: int,
+    ingredients: int,
+    users: int,
+    seed: int = 42,
+    batch_size: int = 10_000,
+    create_schema: bool = False,
+    with_meal_plan_ratio: float = 0.7,
+) -> dict[str, int]:
+    """Generates the whole data set in one transaction and returns the inserted row counts per table"""
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        _fast_sqlite_writes(engine)
+    if create_schema:
+        Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        generator = SyntheticDataGenerator(connection, seed=seed, batch_size=batch_size)
+        generator.generate_reference_data()
+        generator.generate_ingredients(ingredients)
+        generator.generate_recipes(recipes)
+        generator.row_counts["ingredient_allergens"] = tag_ingredients(connection)
+        tag_recipes(connection)
+        generator.generate_users(users, with_meal_plan_ratio)
+    engine.dispose()
+
+    total_rows = sum(generator.row_counts.values())
+    elapsed = time.perf_counter() - started
+    logger.info(f"Inserted {total_rows} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):.0f} rows/s)")
+    for table, rows in sorted(generator.row_counts.items()):
+        logger.info(f"  {table}: {rows}")
+    return generator.row_counts
+
+
+def main():
+    from app.core.config import get_settings
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Generates a deterministic synthetic data set for benchmarks.")
+    parser.add_argument("--database-url", default=None, help="Target database (defaults to DATABASE_URL).")
+    parser.add_argument("--recipes", type=int, default=20_000)
+    parser.add_argument("--ingredients", type=int, default=2_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--meal-plan-ratio", type=float, default=0.7, help="Share of users that get a meal plan.")
+    parser.add_argument("--create-schema", action="store_true", help="Create the tables first (for empty databases).")
+    args = parser.parse_args()
+
+    database_url = args.database_url or get_settings().database_url
+    generate(
+        database_url,
+        recipes=args.recipes,
+        ingredients=args.ingredients,
+        users=args.users,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        create_schema=args.create_schema,
+        with_meal_plan_ratio=args.meal_plan_ratio,
+    )
+    logger.info(f"Synthetic users can log in with the password '{SYNTHETIC_PASSWORD}'.")
+
+
+if __name__ == "__main__":
+    main()
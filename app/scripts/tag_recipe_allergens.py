@@ -0,0 +1,41 @@
+"""
+Tags the backlog for the offline intolerance filter: keyword allergens for the untagged ingredients,
+then allergen_flags for the recipes that have none. Run it after the migration that adds them, and
+with --retag after curating ingredient_allergens by hand.
+"""
+import argparse
+import logging
+from sqlalchemy.orm import Session
+from app.db.db_connection import init_db
+from app.services.allergens import tag_ingredients, tag_recipes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def tag_backlog(retag: bool = False):
+    init_db()
+    from app.db.db_connection import SessionLocal
+    db: Session = SessionLocal()
+
+    try:
+        rows = tag_ingredients(db)
+        db.commit()
+        logger.info(f"📌 {rows} ingredient allergens added")
+
+        recipes = tag_recipes(db, retag=retag)
+        db.commit()
+        logger.info(f"✅ {recipes} recipes tagged")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error tagging allergens: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--retag", action="store_true", help="Recompute the flags of every recipe, not only the untagged ones.")
+    args = parser.parse_args()
+    tag_backlog(retag=args.retag)
@@ -0,0 +1,203 @@
+"""
+Offline intolerance tagging.
+
+Ingredients get their ingredient_allergens rows from keyword rules on the English name (once, so rows
+removed by hand are not re-created), and every recipe stores the allergens of its ingredients in
+Recipe.allergen_flags. The suggestion queries then exclude recipes for any Spoonacular intolerance
+without calling the API. Recipes with NULL flags are not tagged yet and are never suggested to users
+with those intolerances.
+
+The functions take a Session or a Connection, so the ingest path, the backlog script
+(app.scripts.tag_recipe_allergens) and the synthetic data generator share them.
+"""
+import logging
+import re
+from collections import defaultdict
+from sqlalchemy import bindparam, insert, select, update
+from app.core.recipe_flags import allergen_flags
+from app.models.ingredient import Ingredient
+from app.models.ingredient_allergen import IngredientAllergen
+from app.models.intolerance import Intolerance
+from app.models.recipe import Recipe
+from app.models.recipes_ingredient import RecipesIngredient
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+_GLUTEN_GRAINS = [
+    "wheat", "flour", "bread", "breadcrumb", "pasta", "spaghetti", "macaroni", "noodle", "couscous",
+    "semolina", "bulgur", "spelt", "farro", "seitan", "tortilla", "pita", "cracker", "crouton", "pastry",
+    "soy sauce", "teriyaki", "barley", "rye", "malt", "beer",
+]
+_SHELLFISH = [
+    "shrimp", "prawn", "crab", "lobster", "crayfish", "crawfish", "clam", "mussel", "oyster", "scallop",
+    "squid", "calamari", "octopus", "langoustine",
+]
+
+# Conservative on purpose: a false positive only hides a recipe, a false negative can hurt someone
+ALLERGEN_KEYWORDS = {
+    "dairy": [
+        "milk", "cheese", "butter", "buttermilk", "cream", "yogurt", "yoghurt", "whey", "casein", "ghee",
+        "kefir", "custard", "parmesan", "mozzarella", "cheddar", "ricotta", "mascarpone", "feta", "brie",
+        "gouda", "gruyere", "pecorino", "burrata", "paneer", "creme fraiche", "half and half", "ice cream",
+    ],
+    "egg": ["egg", "eggs", "egg white", "egg yolk", "mayonnaise", "mayo", "meringue", "aioli"],
+    "gluten": _GLUTEN_GRAINS,
+    "grain": _GLUTEN_GRAINS + [
+        "rice", "oat", "oatmeal", "corn", "cornmeal", "cornstarch", "polenta", "grits", "millet", "sorghum",
+        "cereal", "granola", "quinoa", "amaranth", "buckwheat",
+    ],
+    "peanut": ["peanut", "peanut butter", "peanut oil", "satay"],
+    "seafood": _SHELLFISH + [
+        "fish", "seafood", "salmon", "tuna", "cod", "anchovy", "anchovies", "sardine", "trout", "tilapia",
+        "halibut", "mackerel", "haddock", "snapper", "sea bass", "swordfish", "herring", "caviar", "roe",
+        "fish sauce", "worcestershire",
+    ],
+    "sesame": ["sesame", "tahini", "halva", "hummus", "za'atar"],
+    "shellfish": _SHELLFISH,
+    "soy": ["soy", "soya", "soy sauce", "soybean", "tofu", "tempeh", "edamame", "miso", "tamari", "teriyaki"],
+    "sulfite": [
+        "wine", "sherry", "vermouth", "port", "raisin", "dried apricot", "dried fruit", "sulfite", "molasses",
+        "sauerkraut", "vinegar",
+    ],
+    "tree nut": [
+        "almond", "walnut", "cashew", "pecan", "hazelnut", "pistachio", "macadamia", "brazil nut", "pine nut",
+        "chestnut", "praline", "marzipan", "nutella", "nut", "nuts",
+    ],
+    "wheat": [
+        "wheat", "flour", "bread", "breadcrumb", "pasta", "spaghetti", "macaroni", "noodle", "couscous",
+        "semolina", "bulgur", "spelt", "farro", "seitan", "tortilla", "pita", "cracker", "crouton", "pastry",
+        "soy sauce", "teriyaki",
+    ],
+}
+# Phrases that contain a keyword but not the allergen
+ALLERGEN_EXCEPTIONS = {
+    "dairy": [
+        "coconut milk", "coconut cream", "almond milk", "soy milk", "oat milk", "rice milk", "cashew milk",
+        "peanut butter", "almond butter", "cashew butter", "nut butter", "cocoa butter", "apple butter",
+        "cream of tartar",
+    ],
+    "egg": ["eggplant"],
+    "grain": ["almond flour", "coconut flour"],
+    "gluten": ["rice flour", "almond flour", "coconut flour", "corn tortilla", "rice noodle", "buckwheat"],
+    "wheat": ["rice flour", "almond flour", "coconut flour", "corn tortilla", "rice noodle", "buckwheat"],
+    "tree nut": ["water chestnut"],
+}
+# "gluten-free pasta" and the like
+FREE_FROM = {"dairy": "dairy", "egg": "egg", "gluten": "gluten", "wheat": "wheat|gluten"}
+
+
+def _pattern(keywords: list[str]) -> re.Pattern:
+    alternatives = "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})(?:e?s)?\b")
+
+
+_ALLERGEN_PATTERNS = {name: _pattern(keywords) for name, keywords in ALLERGEN_KEYWORDS.items()}
+_EXCEPTION_PATTERNS = {name: _pattern(phrases) for name, phrases in ALLERGEN_EXCEPTIONS.items()}
+_FREE_FROM_PATTERNS = {name: re.compile(rf"\b(?:{words})[ -]free\b") for name, words in FREE_FROM.items()}
+
+
+def allergens_in(ingredient_name: str) -> set[str]:
+    """Spoonacular intolerances the keyword rules find in an ingredient name"""
+    name = ingredient_name.strip().lower()
+    found = set()
+    for allergen, pattern in _ALLERGEN_PATTERNS.items():
+        if allergen in _FREE_FROM_PATTERNS and _FREE_FROM_PATTERNS[allergen].search(name):
+            continue
+        text = name
+        if allergen in _EXCEPTION_PATTERNS:
+            text = _EXCEPTION_PATTERNS[allergen].sub(" ", text)
+        if pattern.search(text):
+            found.add(allergen)
+    return found
+
+
+def _intolerance_ids(db) -> dict[str, int]:
+    return {name.strip().lower(): intolerance_id for intolerance_id, name in db.execute(select(Intolerance.id, Intolerance.name))}
+
+
+def tag_ingredients(db, ingredient_ids: list[int] | None = None) -> int:
+    """
+    Writes the keyword allergens of the untagged ingredients ('ingredient_ids' or all of them)
+    and marks them as tagged. Returns the number of ingredient_allergens rows inserted.
+    """
+    intolerance_ids = _intolerance_ids(db)
+    inserted = 0
+    last_seen = 0
+    while True:
+        query = select(Ingredient.id, Ingredient.name_en).where(Ingredient.allergens_tagged.is_(False), Ingredient.id > last_seen)
+        if ingredient_ids is not None:
+            if not ingredient_ids:
+                return inserted
+            query = query.where(Ingredient.id.in_(ingredient_ids))
+        rows = db.execute(query.order_by(Ingredient.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            return inserted
+
+        batch_ids = [row.id for row in rows]
+        existing = set(db.execute(
+            select(IngredientAllergen.ingredient_id, IngredientAllergen.intolerance_id)
+            .where(IngredientAllergen.ingredient_id.in_(batch_ids))
+        ).tuples())
+        new_rows = [
+            {"ingredient_id": row.id, "intolerance_id": intolerance_ids[allergen]}
+            for row in rows
+            for allergen in sorted(allergens_in(row.name_en or ""))
+            if allergen in intolerance_ids and (row.id, intolerance_ids[allergen]) not in existing
+        ]
+        if new_rows:
+            db.execute(insert(IngredientAllergen), new_rows)
+            inserted += len(new_rows)
+        db.execute(update(Ingredient).where(Ingredient.id.in_(batch_ids)).values(allergens_tagged=True).execution_options(synchronize_session=False))
+        last_seen = batch_ids[-1]
+
+
+def recipe_allergen_flags(db, recipe_ids: list[int]) -> dict[int, int]:
+    """Allergen bits of the given recipes from their ingredients' ingredient_allergens rows"""
+    names = defaultdict(list)
+    rows = db.execute(
+        select(RecipesIngredient.recipe_id, Intolerance.name)
+        .join(IngredientAllergen, IngredientAllergen.ingredient_id == RecipesIngredient.ingredient_id)
+        .join(Intolerance, Intolerance.id == IngredientAllergen.intolerance_id)
+        .where(RecipesIngredient.recipe_id.in_(recipe_ids))
+    )
+    for recipe_id, name in rows:
+        names[recipe_id].append(name)
+    return {recipe_id: allergen_flags(names[recipe_id]) for recipe_id in recipe_ids}
+
+
+def ingredient_allergen_flags(db, ingredient_ids: list[int]) -> int:
+    """Allergen bits of a set of ingredients, for a recipe that is not flushed yet"""
+    if not ingredient_ids:
+        return 0
+    names = db.scalars(
+        select(Intolerance.name)
+        .join(IngredientAllergen, IngredientAllergen.intolerance_id == Intolerance.id)
+        .where(IngredientAllergen.ingredient_id.in_(ingredient_ids))
+    )
+    return allergen_flags(names)
+
+
+def tag_recipes(db, retag: bool = False) -> int:
+    """
+    Computes allergen_flags for the untagged recipes, or for all of them with 'retag' (after the
+    ingredient_allergens rows were curated). Returns the number of recipes updated.
+    """
+    recipes = Recipe.__table__
+    statement = recipes.update().where(recipes.c.id == bindparam("recipe_id")).values(allergen_flags=bindparam("flags"))
+    updated = 0
+    last_seen = 0
+    while True:
+        query = select(Recipe.id).where(Recipe.id > last_seen)
+        if not retag:
+            query = query.where(Recipe.allergen_flags.is_(None))
+        recipe_ids = db.scalars(query.order_by(Recipe.id).limit(BATCH_SIZE)).all()
+        if not recipe_ids:
+            return updated
+
+        flags = recipe_allergen_flags(db, recipe_ids)
+        db.execute(statement, [{"recipe_id": recipe_id, "flags": flags[recipe_id]} for recipe_id in recipe_ids])
+        updated += len(recipe_ids)
+        last_seen = recipe_ids[-1]
+        logger.info(f"Tagged {updated} recipes")
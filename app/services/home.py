@@ -0,0 +1,30 @@
+import logging
+from sqlalchemy.orm import Session
+from app.crud.meal_plan import get_latest_meal_plan_for_home
+from app.crud.user_preferences import get_user_preferences_details
+from app.models.user import User
+from app.schemas.user import UserResponse
+from app.schemas.user_preferences import UserPreferencesResponse
+from app.services.meal_plan import meal_plan_to_response
+from app.services.shopping_list import summarize_shopping_list
+
+logger = logging.getLogger(__name__)
+
+
+def build_home_payload(db: Session, user: User, lang: str) -> dict:
+    """
+    HomeResponse payload: the profile, preferences, latest meal plan and shopping list summary the app
+    shows on launch. Everything is read in the request's session, and the meal plan is loaded once for
+    both the plan and the shopping list summary.
+    """
+    preferences = get_user_preferences_details(db, user.id)
+    meal_plan = get_latest_meal_plan_for_home(db, user.id)
+    if meal_plan is None:
+        logger.info(f"User ID: {user.id} ({user.username}) has no meal plan yet.")
+
+    return {
+        "user": UserResponse.model_validate(user).model_dump(mode="json"),
+        "preferences": UserPreferencesResponse.model_validate(preferences).model_dump(mode="json") if preferences else None,
+        "meal_plan": meal_plan_to_response(meal_plan, lang) if meal_plan else None,
+        "shopping_list": summarize_shopping_list(meal_plan) if meal_plan else None,
+    }
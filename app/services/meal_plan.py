@@ -1,26 +1,42 @@
 from collections import defaultdict
+from datetime import datetime, timedelta
 import logging
+import random
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from app.core.concurrency import run_blocking
+from app.core.config import get_settings
 from app.core.errors import ErrorCode
-from app.core.meal_plan_config import MEAL_TYPE_SUGGESTION_CONFIG, MealPlanGeneratorError
+from app.core.meal_plan_config import MEAL_TYPE_SUGGESTION_CONFIG, MealPlanGeneratorError, PlanGenerationStatus
+from app.core.metrics import MEAL_PLAN_GENERATIONS
+from app.core.singleflight import SingleFlight
 from app.crud.diet_type import get_or_create_diet_type
-from app.crud.meal_plan import get_meal_plan_for_response, save_meal_plan_to_db
-from app.crud.recipe import get_or_create_spoonacular_recipe, get_recipe_suggestions_from_db
-from app.crud.user_preferences import get_user_preferences_by_user_id
+from app.crud.meal_plan import claim_precomputed_meal_plan, get_meal_plan_for_response, save_meal_plan_to_db
+from app.crud.recipe import (
+    get_or_create_spoonacular_recipe,
+    get_recipe_suggestions_from_db,
+    get_recipe_suggestions_page,
+    get_recipes_by_spoonacular_ids,
+    get_recipes_with_dish_types,
+)
+from app.crud.user_preferences import get_user_preferences_details
 from app.models.meal_item import MealItem
 from app.models.meal_plan import MealPlan
 from app.models.recipe import Recipe
 from app.models.user_preferences import UserPreferences
 from app.services.meal_plan_generator import MealPlanGenerator
+from app.services.recipe_pools import fingerprint_digest
 from app.services.spoonacular import SpoonacularService
 from app.services.user_preferences import user_has_complex_intolerances
 
 
 logger = logging.getLogger(__name__)
 
-async def generate_meal_plan_for_user(db: Session, user_id: int):
-    preferences = get_user_preferences_by_user_id(db, user_id)
+_generation_flights = SingleFlight()
+
+async def generate_meal_plan_for_user(db: Session, user_id: int, budget_seconds: float | None = None):
+    """Generates and saves a meal plan. 'budget_seconds' is the MealPlanGenerator budget for Spoonacular calls"""
+    preferences = await run_blocking(get_user_preferences_details, db, user_id)
     if not preferences:
         raise HTTPException(
             status_code=404,
@@ -31,24 +47,54 @@ async def generate_meal_plan_for_user(db: Session, user_id: int):
         preferences.calories_goal = 2000
     
     spoon_service= SpoonacularService()
-    generator = MealPlanGenerator(preferences, db, spoon_service)
+    generator = MealPlanGenerator(preferences, db, spoon_service, budget_seconds)
+    max_age = timedelta(hours=get_settings().precomputed_meal_plan_max_age_hours)
+    precomputed_id = await run_blocking(
+        claim_precomputed_meal_plan, db, user_id, fingerprint_digest(generator.fingerprint), datetime.utcnow() - max_age
+    )
+    if precomputed_id is not None:
+        MEAL_PLAN_GENERATIONS.labels(outcome=PlanGenerationStatus.FULL_SUCCESS.value).inc()
+        logger.info(f"Using precomputed meal plan {precomputed_id} for user ID {user_id}.")
+        return await run_blocking(get_meal_plan_for_response, db, precomputed_id), PlanGenerationStatus.FULL_SUCCESS
+
     try:
         plan_structure, status = await generator.generate()
     except MealPlanGeneratorError as e:
+        MEAL_PLAN_GENERATIONS.labels(outcome=e.code).inc()
         logger.warning(f"Meal plan generation failed for user ID {user_id} with a generator error: {e}")
         raise HTTPException(
-            status_code=400,
+            status_code=503 if e.code == ErrorCode.MEAL_PLAN_DEADLINE_EXCEEDED else 400,
             detail={"code": e.code, "message": str(e)}
         )
     except Exception as e:
+        MEAL_PLAN_GENERATIONS.labels(outcome=ErrorCode.INTERNAL_SERVER_ERROR).inc()
         logger.error(f"An unexpected error occurred generating meal plan for user ID {user_id}.", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail={"code": ErrorCode.INTERNAL_SERVER_ERROR, "message": "Could not generate meal plan"}
         )
     
-    db_meal_plan = save_meal_plan_to_db(db, user_id, plan_structure)
-    return get_meal_plan_for_response(db, db_meal_plan.id), status
+    MEAL_PLAN_GENERATIONS.labels(outcome=status.value).inc()
+    db_meal_plan = await run_blocking(save_meal_plan_to_db, db, user_id, plan_structure)
+    return await run_blocking(get_meal_plan_for_response, db, db_meal_plan.id), status
+
+
+async def generate_meal_plan_once(db: Session, user_id: int, budget_seconds: float | None = None) -> tuple[int, PlanGenerationStatus]:
+    """
+    generate_meal_plan_for_user, deduplicated per user: a double tap or a client retry while the
+    generation runs joins it instead of calling Spoonacular and saving another plan. Returns the
+    meal plan id and status. The generation runs in its own session (same engine as 'db') so it
+    outlives the request that started it.
+    """
+    async def generate():
+        flight_db = Session(bind=db.get_bind(), autoflush=False)
+        try:
+            meal_plan, status = await generate_meal_plan_for_user(flight_db, user_id, budget_seconds)
+            return meal_plan.id, status
+        finally:
+            await run_blocking(flight_db.close)
+
+    return await _generation_flights.do(user_id, generate)
 
 
 async def fetch_spoon_recipes(
@@ -82,11 +128,20 @@ async def fetch_spoon_recipes(
         logger.warning(f"Spoonacular error in suggestions: {api_result['error']}")
         return []
 
+    recipes = await run_blocking(_store_spoon_results, db, api_result.get("results", []), diet_used, limit)
+    logger.info(f"[Spoonacular] offset={offset} -> {len(recipes)} recipes stored")
+
+    return recipes
+
+
+def _store_spoon_results(db: Session, results: list[dict], diet_used: str | None, limit: int) -> list[Recipe]:
+    """Persists the recipes returned by Spoonacular (blocking: DB writes and translations)"""
     recipes: list[Recipe] = []
     added_ids = set()
+    existing_recipes = get_recipes_by_spoonacular_ids(db, [recipe["id"] for recipe in results])
 
-    for recipe in api_result.get("results", []):
-        db_recipe, _ = get_or_create_spoonacular_recipe(db, recipe)
+    for recipe in results:
+        db_recipe, _ = get_or_create_spoonacular_recipe(db, recipe, existing_recipes)
 
         if not db_recipe:
             continue
@@ -110,38 +165,52 @@ async def fetch_spoon_recipes(
             break
     
     db.commit() 
-    logger.info(f"[Spoonacular] offset={offset} -> {len(recipes)} recipes stored")
-
     return recipes
 
 
 async def get_meal_replacement_suggestions(
         db: Session, preferences: UserPreferences,
         meal_item: MealItem | None, meal_type: str,
-        limit: int = 5, offset: int = 0
-    ) -> list[Recipe]:
-    """Generates a list of recipe suggestions to replace a specific meal item"""
+        limit: int = 5, offset: int = 0, cursor: dict | None = None
+    ) -> tuple[list[Recipe], dict | None]:
+    """
+    Generates a page of recipe suggestions to replace a specific meal item, and the cursor of the next page
+    (None on the last one). Database pages are keyset pages after cursor["after"]; Spoonacular pages use cursor["offset"].
+    Without a cursor the legacy 'offset' is honoured.
+    """
 
     config = MEAL_TYPE_SUGGESTION_CONFIG.get(meal_type, MEAL_TYPE_SUGGESTION_CONFIG["snack"])
     db_dish_types_to_search = config["db_dish_types"]
     spoonacular_type_to_search = config["spoonacular_type"]
     
     recipe_suggestions = {}
+    seed = cursor["seed"] if cursor and "seed" in cursor else random.getrandbits(31)
+    next_cursor = None
 
     logger.debug(f"Searching suggestions for user {preferences.user_id}. Meal type: {meal_type}, Diet ID: {preferences.diet_type_id}")
+    exclude_ids = {meal_item.recipe_id} if meal_item else set()
+    spoon_results = []
   
     if not user_has_complex_intolerances(preferences):
-        
-        exclude_ids = {meal_item.recipe_id} if meal_item else {}
-        db_suggestions = get_recipe_suggestions_from_db(
-            db, exclude_ids, preferences, db_dish_types_to_search, limit, None, None, offset
-        )
+        after_recipe_id = cursor.get("after") if cursor else None
+        if cursor or offset == 0:
+            db_suggestions, next_recipe_id = await run_blocking(
+                get_recipe_suggestions_page,
+                db, exclude_ids, preferences, db_dish_types_to_search, limit, after_recipe_id, seed, load_dish_types=True
+            )
+            if next_recipe_id is not None:
+                next_cursor = {"seed": seed, "after": next_recipe_id}
+        else:
+            db_suggestions = await run_blocking(
+                get_recipe_suggestions_from_db,
+                db, exclude_ids, preferences, db_dish_types_to_search, limit, None, None, offset, load_dish_types=True
+            )
         for recipe in db_suggestions:
             recipe_suggestions[recipe.id] = recipe
-        logger.info(f"[DB] offset={offset} -> {len(db_suggestions)} recetas")
+        logger.info(f"[DB] offset={offset} after={after_recipe_id} -> {len(db_suggestions)} recetas")
 
         # ✅ Si no hay suficientes pero solo en la primera página → completamos con API
-        if offset == 0 and len(recipe_suggestions) < limit:
+        if offset == 0 and after_recipe_id is None and len(recipe_suggestions) < limit:
             spoon_needed = limit - len(recipe_suggestions)
             logger.info(f"Not enough DB suggestions.. Fetching {spoon_needed} from Spoonacular")
             spoon_results = await fetch_spoon_recipes(
@@ -154,17 +223,26 @@ async def get_meal_replacement_suggestions(
     else:
         logger.info("User has complex intolerances. Fetching all suggestions from Spoonacular API.")
 
+        spoon_offset = cursor.get("offset", 0) if cursor else offset
         spoon_results = await fetch_spoon_recipes(
-            db, preferences, spoonacular_type_to_search, limit, offset
+            db, preferences, spoonacular_type_to_search, limit, spoon_offset
         )
+        if len(spoon_results) >= limit:
+            next_cursor = {"seed": seed, "offset": spoon_offset + limit}
 
         for r in spoon_results:
             if r.id not in exclude_ids:
                 recipe_suggestions[r.id] = r
 
-    return list(recipe_suggestions.values())[:limit]
+    suggestion_ids = list(recipe_suggestions)[:limit]
+    if spoon_results:
+        # Storing the API results committed the session and expired every loaded recipe:
+        # reload them with their dish types instead of lazy loading each one while serializing
+        return await run_blocking(get_recipes_with_dish_types, db, suggestion_ids), next_cursor
+    return [recipe_suggestions[recipe_id] for recipe_id in suggestion_ids], next_cursor
 
 def meal_plan_to_response(meal_plan: MealPlan, lang: str) -> dict:
+    """MealPlanResponse payload as plain JSON types, ready for ORJSONResponse without validating it again"""
 
     items_by_day = defaultdict(list)
     for item in meal_plan.meal_items:
@@ -187,7 +265,8 @@ def meal_plan_to_response(meal_plan: MealPlan, lang: str) -> dict:
                 "image_url": item.recipe.image_url,
                 "ready_min": item.recipe.ready_min,
                 "calories": item.recipe.calories,
-                "servings": item.recipe.servings
+                "servings": item.recipe.servings,
+                "dish_types": None,
             }
             slot_meal = {
                 "meal_item_id": item.id,
@@ -1,11 +1,16 @@
+import asyncio
 import logging
 import random
+import time
+from app.core.concurrency import run_blocking
 from app.core.errors import ErrorCode
 from app.core.meal_plan_config import MEAL_TYPE_SUGGESTION_CONFIG, MealPlanConfig, MealPlanGeneratorError, MealSlot, PlanGenerationStatus
 from app.crud.diet_type import get_or_create_diet_type
-from app.crud.recipe import get_or_create_spoonacular_recipe, get_recipe_suggestions_from_db
+from app.core.metrics import RECIPE_POOL_LOOKUPS
+from app.crud.recipe import get_or_create_spoonacular_recipe, get_recipe_suggestions_from_db, get_recipes_by_spoonacular_ids, get_recipes_with_dish_types
 from app.models.recipe import Recipe
 from app.models.user_preferences import UserPreferences
+from app.services.recipe_pools import discard_recipe_pool, get_recipe_pool, preference_fingerprint, store_recipe_pool
 from app.services.spoonacular import SpoonacularService
 from sqlalchemy.orm import Session
 
@@ -15,13 +20,22 @@ from app.services.user_preferences import user_has_complex_intolerances
 logger = logging.getLogger(__name__)    
 
 class MealPlanGenerator:
-    def __init__(self, preferences: UserPreferences, db: Session, spoon_service: SpoonacularService):
+    def __init__(self, preferences: UserPreferences, db: Session, spoon_service: SpoonacularService, budget_seconds: float | None = None):
+        """
+        'budget_seconds' bounds the time generate() spends waiting for Spoonacular: once it is spent no more
+        API calls are made and the plan is assembled from the recipes found so far (PARTIAL_SUCCESS).
+        None waits for every attempt, as many as the fallbacks and retries need
+        """
         self.preferences = preferences
         self.db = db
         self.spoon_service = spoon_service
         self.base_search_params = self.prepare_base_params(preferences)
         self.calories_targets = self.get_calories_by_meal(preferences.calories_goal)
         self.days_in_plan = MealPlanConfig.DAYS_IN_PLAN
+        self.fingerprint = preference_fingerprint(self.base_search_params, preferences.calories_goal)
+        self.budget_seconds = budget_seconds
+        self.deadline: float | None = None
+        self.deadline_exceeded = False
 
         logger.debug(f"MealPlanGenerator initialized for user {self.preferences.user_id} with params: {self.base_search_params}")
 
@@ -89,6 +103,13 @@ class MealPlanGenerator:
             
         return final_plan
 
+    def _remaining_budget(self) -> float | None:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def _stop_api_calls(self, meal_slot: MealSlot):
+        self.deadline_exceeded = True
+        logger.warning(f"Generation budget of {self.budget_seconds}s spent while fetching {meal_slot.name}. No more Spoonacular calls for user {self.preferences.user_id}.")
+
     async def _fetch_from_api_with_fallback(
         self,
         meal_slot: MealSlot,
@@ -115,51 +136,89 @@ class MealPlanGenerator:
 
             diet_used_in_query = current_search_params.get("diet")
 
-            api_result = await self.spoon_service.search_recipes(
-                type=MealPlanConfig.MEAL_TYPES_SPOONACULAR[meal_slot],
-                diet=diet_used_in_query,
-                intolerances=current_search_params.get("intolerances"),
-                cuisine=current_search_params.get("cuisines"),
-                min_calories=min_calories if min_calories is not None else None,
-                max_calories=max_calories if max_calories is not None else None,
-                number=limit * 3,
-                sort="random"
-            )
+            remaining = self._remaining_budget()
+            if remaining is not None and remaining <= 0:
+                self._stop_api_calls(meal_slot)
+                break
+            try:
+                # The request (with its retries and backoff) is cancelled when the budget runs out
+                api_result = await asyncio.wait_for(self.spoon_service.search_recipes(
+                    type=MealPlanConfig.MEAL_TYPES_SPOONACULAR[meal_slot],
+                    diet=diet_used_in_query,
+                    intolerances=current_search_params.get("intolerances"),
+                    cuisine=current_search_params.get("cuisines"),
+                    min_calories=min_calories if min_calories is not None else None,
+                    max_calories=max_calories if max_calories is not None else None,
+                    number=limit * 3,
+                    sort="random"
+                ), remaining)
+            except asyncio.TimeoutError:
+                self._stop_api_calls(meal_slot)
+                break
 
             if not api_result.get("error"):
-                for recipe_data in api_result.get("results", []):
-                    db_recipe, was_created = get_or_create_spoonacular_recipe(self.db, recipe_data)
-
-                    if db_recipe and diet_used_in_query:
-                        is_diet_already_associated = any(
-                            dt.name.lower() == diet_used_in_query.lower() 
-                            for dt in db_recipe.diet_types
-                        )
-                        
-                        if not is_diet_already_associated:
-                            diet_obj = get_or_create_diet_type(self.db, diet_used_in_query)
-                            if diet_obj:
-                                db_recipe.diet_types.append(diet_obj)
-                    
-                    if db_recipe and db_recipe.id not in exclude_recipe_ids and db_recipe.id not in found_recipes:
-                        found_recipes[db_recipe.id] = db_recipe
-                        if len(found_recipes) >= limit:
-                            logger.info(f"API fetch for {meal_slot.name} succeeded on attempt {attempt}. Found {len(found_recipes)} recipes.")
-                            break
+                await run_blocking(
+                    self._store_api_results,
+                    api_result.get("results", []), diet_used_in_query, exclude_recipe_ids, found_recipes, limit
+                )
+                if len(found_recipes) >= limit:
+                    logger.info(f"API fetch for {meal_slot.name} succeeded on attempt {attempt}. Found {len(found_recipes)} recipes.")
             if len(found_recipes) >= limit:
                 logger.info(f"Fallback attempt {attempt} for {meal_slot.name} was successful. Found enough recipes.")
                 break 
 
-        self.db.commit()
+        await run_blocking(self.db.commit)
         return list(found_recipes.values())
+
+    def _store_api_results(
+        self,
+        results: list[dict],
+        diet_used_in_query: str | None,
+        exclude_recipe_ids: set[int],
+        found_recipes: dict[int, Recipe],
+        limit: int
+    ) -> None:
+        """
+        Persists the API results into found_recipes. Blocking (DB writes and translations), run it in the executor.
+        Once the generation budget is spent only recipes already stored are taken: importing one translates it
+        """
+        existing_recipes = get_recipes_by_spoonacular_ids(self.db, [recipe_data["id"] for recipe_data in results])
+        for recipe_data in results:
+            if recipe_data["id"] not in existing_recipes and self.deadline is not None and time.monotonic() >= self.deadline:
+                if not self.deadline_exceeded:
+                    self.deadline_exceeded = True
+                    logger.warning(f"Generation budget of {self.budget_seconds}s spent while importing recipes. No more imports for user {self.preferences.user_id}.")
+                continue
+            db_recipe, was_created = get_or_create_spoonacular_recipe(self.db, recipe_data, existing_recipes)
+
+            if db_recipe and diet_used_in_query:
+                is_diet_already_associated = any(
+                    dt.name.lower() == diet_used_in_query.lower() 
+                    for dt in db_recipe.diet_types
+                )
+                
+                if not is_diet_already_associated:
+                    diet_obj = get_or_create_diet_type(self.db, diet_used_in_query)
+                    if diet_obj:
+                        db_recipe.diet_types.append(diet_obj)
+            
+            if db_recipe and db_recipe.id not in exclude_recipe_ids and db_recipe.id not in found_recipes:
+                found_recipes[db_recipe.id] = db_recipe
+                if len(found_recipes) >= limit:
+                    break
     
     async def _find_recipes_for_slot(
         self, 
         meal_slot: MealSlot, 
         limit: int, 
-        exclude_recipe_ids: set[int]
+        exclude_recipe_ids: set[int],
+        pool_size: int | None = None,
+        spare_recipes: list[Recipe] | None = None
     ) -> list[Recipe]:
-        """Searches for recipes for a specific meal slot, first in the database and then in Spoonacular if needed"""
+        """
+        Searches for recipes for a specific meal slot: up to 'pool_size' candidates in the database, then, while there
+        are fewer than 'limit', recipes taken out of 'spare_recipes' and finally Spoonacular (only up to 'limit')
+        """
 
         target_calories = self.calories_targets.get(meal_slot)
         calorie_range = max(150, target_calories * 0.25)
@@ -168,19 +227,26 @@ class MealPlanGenerator:
         
         found_recipes = {}
         if not user_has_complex_intolerances(self.preferences):
-            logger.info(f"Searching DB for {limit} recipes for {meal_slot.name}.")
+            logger.info(f"Searching DB for {pool_size or limit} recipes for {meal_slot.name}.")
 
             config = MEAL_TYPE_SUGGESTION_CONFIG.get(meal_slot.name.lower(), MEAL_TYPE_SUGGESTION_CONFIG["main course"])
             db_dish_types_to_search = config["db_dish_types"]
 
-            db_suggestions = get_recipe_suggestions_from_db(
-                self.db, exclude_recipe_ids, self.preferences, db_dish_types_to_search, limit, min_calories, max_calories
+            db_suggestions = await run_blocking(
+                get_recipe_suggestions_from_db,
+                self.db, exclude_recipe_ids, self.preferences, db_dish_types_to_search, pool_size or limit, min_calories, max_calories
             )
             for recipe in db_suggestions:
                 found_recipes[recipe.id] = recipe
             logger.info(f"Found {len(found_recipes)} recipes in DB for {meal_slot.name}.")
 
-        if len(found_recipes) < limit:
+        while spare_recipes and len(found_recipes) < limit:
+            recipe = spare_recipes.pop()
+            found_recipes[recipe.id] = recipe
+
+        if len(found_recipes) < limit and self.deadline_exceeded:
+            logger.info(f"Skipping Spoonacular for {meal_slot.name}: the generation budget is spent.")
+        elif len(found_recipes) < limit:
             recipes_needed_from_api = limit - len(found_recipes)
             logger.info(f"Not enough recipes in DB for {meal_slot.name}. Fetching {recipes_needed_from_api} more from Spoonacular.")
             current_exclude_ids = set(found_recipes.keys())
@@ -193,18 +259,68 @@ class MealPlanGenerator:
 
 
 
-    async def generate(self) -> tuple[dict, PlanGenerationStatus]:
+    async def _search_recipes_by_slot(self) -> dict[MealSlot, list[Recipe]]:
+        """
+        Candidate pools of up to RECIPE_POOL_SIZE_FACTOR times the plan days per slot, so plans sampled from
+        a shared pool differ. Lunch and dinner candidates don't overlap: dinner searches without the lunch
+        candidates and, when that leaves it short, takes the lunch candidates beyond the plan days first
+        """
+        pool_size = self.days_in_plan * MealPlanConfig.RECIPE_POOL_SIZE_FACTOR
         recipes_by_meal_slot = {}
         recipe_ids_to_exclude = set()
         for meal_slot in MealSlot:
             required_recipes = self.days_in_plan
-            
-            fetched_recipes = await self._find_recipes_for_slot(meal_slot, required_recipes, recipe_ids_to_exclude)
+            spare_lunches = None
+            if meal_slot is MealSlot.DINNER:
+                spare_lunches = recipes_by_meal_slot[MealSlot.LUNCH][required_recipes:]
+
+            fetched_recipes = await self._find_recipes_for_slot(meal_slot, required_recipes, recipe_ids_to_exclude, pool_size, spare_lunches)
             if meal_slot is MealSlot.LUNCH:
                 for recipe in fetched_recipes:
                     recipe_ids_to_exclude.add(recipe.id)
+            if spare_lunches is not None:
+                recipes_by_meal_slot[MealSlot.LUNCH] = recipes_by_meal_slot[MealSlot.LUNCH][:required_recipes] + spare_lunches
 
             recipes_by_meal_slot[meal_slot] = fetched_recipes
+        return recipes_by_meal_slot
+
+    async def _recipes_from_pool(self, fingerprint: tuple) -> dict[MealSlot, list[Recipe]] | None:
+        """The recipes of the shared pool for these preferences, None if there is no usable pool"""
+        pool = get_recipe_pool(fingerprint)
+        if pool is None:
+            return None
+        recipes = await run_blocking(get_recipes_with_dish_types, self.db, [recipe_id for recipe_ids in pool.values() for recipe_id in recipe_ids])
+        recipes_by_id = {recipe.id: recipe for recipe in recipes}
+        recipes_by_meal_slot = {
+            meal_slot: [recipes_by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes_by_id]
+            for meal_slot, recipe_ids in pool.items()
+        }
+        if any(len(recipes) < self.days_in_plan for recipes in recipes_by_meal_slot.values()):
+            # Too many recipes were deleted since the pool was built
+            discard_recipe_pool(fingerprint)
+            return None
+        return recipes_by_meal_slot
+
+    async def generate(self) -> tuple[dict, PlanGenerationStatus]:
+        if self.budget_seconds is not None:
+            self.deadline = time.monotonic() + self.budget_seconds
+        recipes_by_meal_slot = await self._recipes_from_pool(self.fingerprint)
+        if recipes_by_meal_slot is not None:
+            RECIPE_POOL_LOOKUPS.labels(result="hit").inc()
+            logger.info(f"Using the shared recipe pool for user {self.preferences.user_id}.")
+        else:
+            RECIPE_POOL_LOOKUPS.labels(result="miss").inc()
+            recipes_by_meal_slot = await self._search_recipes_by_slot()
+            # Only complete pools are shared, so partial plans keep retrying the searches
+            if all(len(recipes) >= self.days_in_plan for recipes in recipes_by_meal_slot.values()):
+                store_recipe_pool(self.fingerprint, {
+                    meal_slot: [recipe.id for recipe in recipes] for meal_slot, recipes in recipes_by_meal_slot.items()
+                })
+
+        # Each plan is its own sample of the candidate pools
+        recipes_by_meal_slot = {
+            meal_slot: random.sample(recipes, min(len(recipes), self.days_in_plan)) for meal_slot, recipes in recipes_by_meal_slot.items()
+        }
 
         num_lunches = len(recipes_by_meal_slot.get(MealSlot.LUNCH, []))
         num_dinners = len(recipes_by_meal_slot.get(MealSlot.DINNER, []))
@@ -212,6 +328,11 @@ class MealPlanGenerator:
 
         effective_plan_days = min(num_lunches, num_dinners)
         if effective_plan_days < MealPlanConfig.MINIMUM_VIABLE_DAYS  or num_breakfasts < 2:
+            if self.deadline_exceeded:
+                raise MealPlanGeneratorError(
+                    "Recipe search took too long to build a plan. Please try again.",
+                    code=ErrorCode.MEAL_PLAN_DEADLINE_EXCEEDED
+                )
             raise MealPlanGeneratorError(
                 "Could not find enough recipe variety for a viable plan. Please adjust your preferences.",
                 code=ErrorCode.PREFERENCES_TOO_STRICT
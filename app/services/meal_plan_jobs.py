@@ -0,0 +1,229 @@
+"""
+Meal plan generation jobs.
+
+POST /meal_plans/generate with 'Prefer: respond-async' stores a job in meal_plan_jobs and answers 202
+right away. MealPlanJobWorker, a pool of coroutines started with the app, claims jobs from the table and
+runs generate_meal_plan_once outside of any request, so slow Spoonacular calls no longer hold request
+slots. A synchronous generate request joins the user's pending or running job instead of starting another. Clients follow the job with GET /meal_plans/jobs/{id}?wait=N (long poll) or its /events stream.
+
+Jobs are leased while they run: if an instance dies mid-job, another one claims it again once the lease
+expires, up to meal_plan_job_max_attempts. On Cloud Run the worker needs CPU allocated outside of requests
+(--no-cpu-throttling) to make progress between polls.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.concurrency import run_blocking
+from app.core.config import get_settings
+from app.core.errors import ErrorCode
+from app.crud.meal_plan import get_meal_plan_for_response
+from app.crud.meal_plan_job import (
+    ACTIVE_STATUSES,
+    claim_next_meal_plan_job,
+    complete_meal_plan_job,
+    create_meal_plan_job,
+    fail_abandoned_meal_plan_jobs,
+    fail_meal_plan_job,
+    get_active_meal_plan_job,
+    get_meal_plan_job,
+    renew_meal_plan_job_lease,
+)
+from app.db import db_connection
+from app.models.meal_plan_job import MealPlanJob
+from app.services.meal_plan import generate_meal_plan_once, meal_plan_to_response
+
+logger = logging.getLogger(__name__)
+
+# How often the workers of an instance look for jobs whose worker died on every attempt
+ABANDONED_CHECK_SECONDS = 60.0
+# How often a waiting client re-reads its job, in case another instance runs it
+JOB_RECHECK_SECONDS = 1.0
+
+
+def enqueue_meal_plan_job(db: Session, user_id: int) -> MealPlanJob:
+    """Queues a generation for the user, or returns the one already queued or running"""
+    job = get_active_meal_plan_job(db, user_id)
+    if job is not None:
+        logger.info(f"User ID {user_id} already has meal plan job {job.id} ({job.status.value}).")
+        return job
+    try:
+        job = create_meal_plan_job(db, user_id)
+    except IntegrityError:
+        # A concurrent request queued one first: return that one. Any other rejected insert is re-raised
+        job = get_active_meal_plan_job(db, user_id)
+        if job is None:
+            raise
+        logger.info(f"User ID {user_id} attached to meal plan job {job.id} queued concurrently.")
+        return job
+    logger.info(f"Queued meal plan job {job.id} for user ID {user_id}.")
+    return job
+
+
+def meal_plan_job_snapshot(db: Session, job_id: int, user_id: int, lang: str) -> dict | None:
+    """
+    MealPlanJobResponse payload of one of the user's jobs (None if it is not theirs), with the generated
+    plan once it succeeded. Closes the session afterwards so pollers don't hold a connection while they wait.
+    """
+    try:
+        job = get_meal_plan_job(db, job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        snapshot = {"job_id": job.id, "status": job.status.value, "result": None, "error": None}
+        if job.error_code:
+            snapshot["error"] = {"code": job.error_code, "message": job.error_message or ""}
+        if job.meal_plan_id is not None:
+            meal_plan = get_meal_plan_for_response(db, job.meal_plan_id)
+            if meal_plan is not None:
+                snapshot["result"] = {"meal_plan": meal_plan_to_response(meal_plan, lang), "status": job.generation_status}
+        return snapshot
+    finally:
+        db.close()
+
+
+def is_active(snapshot: dict) -> bool:
+    return snapshot["status"] in {status.value for status in ACTIVE_STATUSES}
+
+
+async def wait_for_meal_plan_job(db: Session, job_id: int, user_id: int, lang: str, timeout: float) -> dict | None:
+    """meal_plan_job_snapshot once the job is no longer pending or running, or after 'timeout' seconds"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    snapshot = await run_blocking(meal_plan_job_snapshot, db, job_id, user_id, lang)
+    while snapshot is not None and is_active(snapshot) and (remaining := deadline - loop.time()) > 0:
+        await meal_plan_job_worker.wait_for_update(job_id, min(remaining, JOB_RECHECK_SECONDS))
+        snapshot = await run_blocking(meal_plan_job_snapshot, db, job_id, user_id, lang)
+    return snapshot
+
+
+async def join_active_meal_plan_job(db: Session, user_id: int, lang: str, timeout: float) -> dict | None:
+    """
+    Waits for the user's pending or running job, so a plain generate request made meanwhile does not start a
+    second generation. Its snapshot (see wait_for_meal_plan_job), None if the user has no active job.
+    """
+    job = await run_blocking(get_active_meal_plan_job, db, user_id)
+    if job is None:
+        return None
+    logger.info(f"Meal plan generation for user ID {user_id} joins meal plan job {job.id} ({job.status.value}).")
+    return await wait_for_meal_plan_job(db, job.id, user_id, lang, timeout)
+
+
+class MealPlanJobWorker:
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        # One event per job somebody is waiting on, dropped when the last waiter leaves
+        self._waiters: weakref.WeakValueDictionary[int, asyncio.Event] = weakref.WeakValueDictionary()
+        self._next_abandoned_check = 0.0
+
+    def start(self, workers: int, poll_seconds: float):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(poll_seconds)) for _ in range(workers)]
+        logger.info(f"Started {workers} meal plan job workers.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wakes an idle worker up when a job is queued in this instance"""
+        self._wakeup.set()
+
+    async def wait_for_update(self, job_id: int, timeout: float):
+        """Returns when this instance finishes the job, or after 'timeout' seconds (it may run elsewhere)"""
+        event = self._waiters.get(job_id)
+        if event is None:
+            event = self._waiters[job_id] = asyncio.Event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run_once(self) -> bool:
+        """Claims and runs one job. False when there was nothing to run"""
+        settings = get_settings()
+        session_factory = self._session_factory or db_connection.SessionLocal
+        db = session_factory()
+        try:
+            if time.monotonic() >= self._next_abandoned_check:
+                self._next_abandoned_check = time.monotonic() + ABANDONED_CHECK_SECONDS
+                await run_blocking(fail_abandoned_meal_plan_jobs, db, settings.meal_plan_job_max_attempts)
+            job = await run_blocking(
+                claim_next_meal_plan_job, db, settings.meal_plan_job_lease_seconds, settings.meal_plan_job_max_attempts
+            )
+            if job is None:
+                return False
+            job_id, user_id = job.id, job.user_id
+            finished = asyncio.Event()
+            heartbeat = asyncio.create_task(self._renew_lease(session_factory, job_id, settings.meal_plan_job_lease_seconds, finished))
+            try:
+                await self._run(db, job_id, user_id)
+            finally:
+                # Not cancelled: a renewal in progress finishes with its session before the task ends
+                finished.set()
+                await heartbeat
+                event = self._waiters.get(job_id)
+                if event is not None:
+                    event.set()
+            return True
+        finally:
+            db.close()
+
+    async def _renew_lease(self, session_factory, job_id: int, lease_seconds: int, finished: asyncio.Event):
+        """Keeps the lease of a running job alive until 'finished', so a long generation is not claimed again by another worker"""
+        while True:
+            try:
+                await asyncio.wait_for(finished.wait(), lease_seconds / 3)
+                return
+            except asyncio.TimeoutError:
+                pass
+            db = session_factory()
+            try:
+                if not await run_blocking(renew_meal_plan_job_lease, db, job_id, lease_seconds):
+                    return
+            except Exception:
+                logger.warning(f"Could not renew the lease of meal plan job {job_id}.", exc_info=True)
+            finally:
+                db.close()
+
+    async def _run(self, db: Session, job_id: int, user_id: int):
+        logger.info(f"Running meal plan job {job_id} for user ID {user_id}.")
+        try:
+            # Same singleflight as the synchronous requests, so a generation already running here is joined
+            meal_plan_id, status = await generate_meal_plan_once(db, user_id, get_settings().meal_plan_job_budget_seconds)
+        except HTTPException as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"code": ErrorCode.INTERNAL_SERVER_ERROR, "message": str(e.detail)}
+            logger.warning(f"Meal plan job {job_id} for user ID {user_id} failed: {detail}")
+            await run_blocking(db.rollback)
+            await run_blocking(fail_meal_plan_job, db, job_id, detail["code"], detail["message"])
+        except Exception:
+            logger.error(f"Meal plan job {job_id} for user ID {user_id} failed unexpectedly.", exc_info=True)
+            await run_blocking(db.rollback)
+            await run_blocking(fail_meal_plan_job, db, job_id, ErrorCode.INTERNAL_SERVER_ERROR, "Could not generate meal plan")
+        else:
+            await run_blocking(complete_meal_plan_job, db, job_id, meal_plan_id, status.value)
+            logger.info(f"Meal plan job {job_id} for user ID {user_id} completed with status: {status.value}")
+
+    async def _work(self, poll_seconds: float):
+        while True:
+            self._wakeup.clear()
+            try:
+                ran = await self.run_once()
+            except Exception:
+                logger.error("Meal plan job worker could not claim a job.", exc_info=True)
+                ran = False
+            if not ran:
+                # Also polls, for jobs queued through other instances and leases that expired
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+
+meal_plan_job_worker = MealPlanJobWorker()
@@ -0,0 +1,76 @@
+"""
+Off-peak precomputation of meal plans.
+
+Most users generate their plan at the same time of the week, so generation load comes in bursts.
+/tasks/precompute-meal-plans, run by the scheduler at night, generates a plan in advance for the users
+who generated one lately. Users are grouped by preference fingerprint, so the first generation of each
+group fills the shared recipe pool and the rest of the group draws from it. The plans are stored as
+precomputed (hidden from the user) and swapped in when the user next asks for a plan with the same
+preferences, within precomputed_meal_plan_max_age_hours.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+from sqlalchemy.orm import Session
+from app.core.concurrency import run_blocking
+from app.core.config import get_settings
+from app.core.meal_plan_config import PlanGenerationStatus
+from app.crud.meal_plan import delete_stale_precomputed_meal_plans, get_user_ids_to_precompute, save_precomputed_meal_plans
+from app.crud.user_preferences import get_users_preferences_details
+from app.services.meal_plan_generator import MealPlanGenerator
+from app.services.recipe_pools import fingerprint_digest
+from app.services.spoonacular import SpoonacularService
+
+logger = logging.getLogger(__name__)
+
+# Generated plans are written in transactions of this many plans
+PRECOMPUTE_WRITE_BATCH = 50
+
+
+async def precompute_meal_plans(db: Session, limit: int | None = None) -> dict:
+    settings = get_settings()
+    now = datetime.utcnow()
+    deleted = await run_blocking(
+        delete_stale_precomputed_meal_plans, db, now - timedelta(hours=settings.precomputed_meal_plan_max_age_hours)
+    )
+    user_ids = await run_blocking(
+        get_user_ids_to_precompute, db, now - timedelta(days=settings.precompute_active_days), limit or settings.precompute_batch_size
+    )
+    preferences_list = await run_blocking(get_users_preferences_details, db, user_ids)
+
+    spoon_service = SpoonacularService()
+    groups: dict[tuple, list[MealPlanGenerator]] = defaultdict(list)
+    for preferences in preferences_list:
+        if not preferences.calories_goal or preferences.calories_goal <= 0:
+            # Same default as generate_meal_plan_for_user, so the fingerprints match when the plan is claimed
+            preferences.calories_goal = 2000
+        generator = MealPlanGenerator(preferences, db, spoon_service, settings.meal_plan_precompute_budget_seconds)
+        groups[generator.fingerprint].append(generator)
+    logger.info(f"Precomputing meal plans for {len(preferences_list)} users in {len(groups)} preference groups.")
+
+    pending, precomputed, skipped, failed = [], 0, 0, 0
+    for fingerprint, generators in groups.items():
+        digest = fingerprint_digest(fingerprint)
+        for generator in generators:
+            user_id = generator.preferences.user_id
+            try:
+                plan_structure, status = await generator.generate()
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Could not precompute a meal plan for user ID {user_id}: {e}")
+                await run_blocking(db.rollback)
+                continue
+            if status is not PlanGenerationStatus.FULL_SUCCESS:
+                # Partial plans are left to an on-demand generation, which may find more recipes by then
+                skipped += 1
+                continue
+            pending.append((user_id, digest, plan_structure))
+            if len(pending) >= PRECOMPUTE_WRITE_BATCH:
+                precomputed += await run_blocking(save_precomputed_meal_plans, db, pending)
+                pending = []
+    if pending:
+        precomputed += await run_blocking(save_precomputed_meal_plans, db, pending)
+
+    result = {"users": len(preferences_list), "groups": len(groups), "precomputed": precomputed, "skipped": skipped, "failed": failed, "stale_deleted": deleted}
+    logger.info(f"Meal plan precomputation finished: {result}")
+    return result
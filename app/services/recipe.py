@@ -1,19 +1,28 @@
 import logging
+import threading
+import orjson
+from cachetools import TTLCache
 from fastapi import HTTPException
+from app.core.compression import CompressedPayload
+from app.core.config import get_settings
 from app.core.errors import ErrorCode
 from app.crud.dish_type import get_dish_type_by_name
 from app.crud.ingredient import get_or_create_ingredient_by_name
-from app.crud.recipe import get_recipe_details
+from app.crud.recipe import get_recipe_details, get_recipes_details
 from app.models.recipe import Recipe
 from sqlalchemy.orm import Session
 from app.models.recipes_ingredient import RecipesIngredient
-from app.schemas.recipe import RecipeCreate, RecipeDetailResponse, RecipeIngredientDetail, RecipeShort, RecipeUpdate
-from app.services.ingredient import serialize_ingredient_short
+from app.schemas.recipe import RecipeCreate, RecipeShort, RecipeUpdate
 from app.utils.translator import translate_measures_for_recipe, translate_unit_for_display
 
 
 logger = logging.getLogger(__name__)
 
+# Serialized recipe details with their compressed variants, per (recipe id, language). The TTL bounds
+# how long other workers keep serving a recipe that was edited or deleted through this one
+_recipe_payloads = TTLCache(maxsize=get_settings().recipe_payload_cache_size, ttl=get_settings().recipe_payload_cache_ttl_seconds)
+_recipe_payloads_lock = threading.Lock()
+
 def create_recipe_from_user_input(db: Session, recipe_data: RecipeCreate, user_id: int, lang: str) -> Recipe:
 
     analyzed_instructions_en = None
@@ -153,38 +162,129 @@ def update_recipe_in_db(db: Session, db_recipe: Recipe, recipe_data: RecipeUpdat
             db.add_all(new_recipes_ingredients)
 
     db.commit()
+    invalidate_recipe_detail_payload(db_recipe.id)
     full_recipe = get_recipe_details(db, db_recipe.id)
     
     return full_recipe
 
 
-def serialize_recipe_detail(recipe: Recipe, lang: str) -> RecipeDetailResponse:
-    response_data = RecipeDetailResponse.model_validate(recipe)
+# Scalar fields of RecipeDetailResponse, read straight from the Recipe row
+_RECIPE_DETAIL_COLUMNS = (
+    "id", "spoonacular_id", "title", "image_url", "ready_min", "servings", "summary", "vegetarian", "vegan",
+    "gluten_free", "dairy_free", "very_healthy", "cheap", "very_popular", "sustainable", "low_fodmap",
+    "preparation_min", "cooking_min", "calories", "analyzed_instructions",
+)
+RECIPE_DETAIL_FIELDS = _RECIPE_DETAIL_COLUMNS + ("ingredients", "dish_types", "diet_types", "cuisines", "nutrients")
+
+
+def serialize_recipe_detail(recipe: Recipe, lang: str, fields: set[str] | None = None) -> dict:
+    """
+    Builds the RecipeDetailResponse payload as plain JSON types straight from the ORM rows, without
+    running the pydantic models: the data comes from the database, so it is trusted and can be
+    returned with ORJSONResponse. tests/integration/test_fast_responses.py keeps it in sync with the schema.
+    With 'fields', only those keys are built (and only what they need is read from the recipe).
+    """
+    def wanted(field: str) -> bool:
+        return fields is None or field in fields
+
+    response_data = {column: getattr(recipe, column) for column in _RECIPE_DETAIL_COLUMNS if wanted(column)}
+    if response_data.get("calories") is not None:
+        response_data["calories"] = float(response_data["calories"])
 
     if lang == "es":
-        if recipe.title_es:
-            response_data.title = recipe.title_es
+        if wanted("title") and recipe.title_es:
+            response_data["title"] = recipe.title_es
         
-        if recipe.summary_es:
-            response_data.summary = recipe.summary_es
-
-        if recipe.analyzed_instructions_es:
-            response_data.analyzed_instructions = recipe.analyzed_instructions_es
-
-    processed_ingredients = [
-        RecipeIngredientDetail(
-            original_ingredient_name=ri.original_ingredient_name,
-            amount=ri.amount,
-            unit=translate_unit_for_display(ri.unit, lang),
-            measures_json=translate_measures_for_recipe(ri.measures_json, lang),
-            ingredient=serialize_ingredient_short(ri.ingredient, lang),
-        )
-        for ri in recipe.recipes_ingredients
-    ]
-    response_data.ingredients = processed_ingredients
+        if wanted("summary") and recipe.summary_es:
+            response_data["summary"] = recipe.summary_es
+
+        if wanted("analyzed_instructions") and recipe.analyzed_instructions_es:
+            response_data["analyzed_instructions"] = recipe.analyzed_instructions_es
+
+    if wanted("ingredients"):
+        response_data["ingredients"] = [
+            {
+                "original_ingredient_name": ri.original_ingredient_name,
+                "amount": float(ri.amount),
+                "unit": translate_unit_for_display(ri.unit, lang),
+                "measures_json": translate_measures_for_recipe(ri.measures_json, lang),
+                "ingredient": {
+                    "id": ri.ingredient.id,
+                    "name": ri.ingredient.name_es if lang == "es" else ri.ingredient.name_en,
+                    "image_filename": ri.ingredient.image_filename,
+                    "aisle": ri.ingredient.aisle,
+                },
+            }
+            for ri in recipe.recipes_ingredients
+        ]
+    if wanted("dish_types"):
+        response_data["dish_types"] = [dish_type.name for dish_type in recipe.dish_types]
+    if wanted("diet_types"):
+        response_data["diet_types"] = [diet_type.name for diet_type in recipe.diet_types]
+    if wanted("cuisines"):
+        response_data["cuisines"] = [cuisine.name for cuisine in recipe.cuisines]
+    if wanted("nutrients"):
+        response_data["nutrients"] = [
+            {"name": assoc.nutrient.name, "amount": float(assoc.amount), "unit": assoc.unit, "is_primary": assoc.nutrient.is_primary}
+            for assoc in recipe.recipes_nutrients
+            if assoc.nutrient
+        ]
 
     return response_data
 
+
+def parse_recipe_detail_fields(fields: list[str] | None) -> set[str] | None:
+    """Validated field selection of the batch endpoints (the id is always returned), None for every field"""
+    if not fields:
+        return None
+    selected = {field.strip() for field in fields if field.strip()}
+    unknown = selected - set(RECIPE_DETAIL_FIELDS)
+    if unknown:
+        logger.warning(f"Recipe batch request with unknown fields: {sorted(unknown)}")
+        raise HTTPException(
+            status_code=400,
+            detail={"code": ErrorCode.INVALID_RECIPE_FIELDS, "message": f"Unknown recipe fields: {', '.join(sorted(unknown))}"}
+        )
+    return selected | {"id"}
+
+
+def serialize_recipe_details(db: Session, recipe_ids: list[int], lang: str, fields: set[str] | None = None) -> tuple[list[dict], list[int]]:
+    """Details of many recipes in the requested order, plus the requested ids that do not exist"""
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    recipes = {recipe.id: recipe for recipe in get_recipes_details(db, recipe_ids, fields)}
+    details = [serialize_recipe_detail(recipes[recipe_id], lang, fields) for recipe_id in recipe_ids if recipe_id in recipes]
+    missing_ids = [recipe_id for recipe_id in recipe_ids if recipe_id not in recipes]
+    return details, missing_ids
+
+
+def get_recipe_detail_payload(db: Session, recipe_id: int, lang: str) -> CompressedPayload | None:
+    """Serialized recipe detail from the payload cache, loaded and serialized on a miss. None if the recipe does not exist"""
+    key = (recipe_id, lang)
+    with _recipe_payloads_lock:
+        payload = _recipe_payloads.get(key)
+    if payload is not None:
+        return payload
+
+    recipe = get_recipe_details(db, recipe_id)
+    if recipe is None:
+        return None
+    payload = CompressedPayload(orjson.dumps(serialize_recipe_detail(recipe, lang)))
+    with _recipe_payloads_lock:
+        _recipe_payloads[key] = payload
+    return payload
+
+
+def invalidate_recipe_detail_payload(recipe_id: int):
+    with _recipe_payloads_lock:
+        for lang in ("en", "es"):
+            _recipe_payloads.pop((recipe_id, lang), None)
+
+
+def clear_recipe_detail_payloads():
+    with _recipe_payloads_lock:
+        _recipe_payloads.clear()
+
+
 def serialize_recipe_short_list(recipes: list[Recipe], lang: str) -> list[RecipeShort]:
     if not recipes:
         return []
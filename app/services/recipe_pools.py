@@ -0,0 +1,52 @@
+"""
+Candidate recipe pools shared by users with the same preferences.
+
+Meal plan generation searches the DB (and often Spoonacular) for every slot, although many users have
+the same diet, intolerances, cuisines and a similar calorie goal. The recipes a generation finds are
+kept per preference fingerprint, so the next generation with that fingerprint loads them by id and only
+shuffles them. Pools expire after recipe_pool_ttl_seconds and the next generation searches them again.
+"""
+import hashlib
+import threading
+from cachetools import TTLCache
+from app.core.config import get_settings
+from app.core.meal_plan_config import MealSlot
+
+# Calorie goals within the same bucket share pools: the slot search ranges are ±25% (150 kcal minimum) wide
+CALORIE_BUCKET_SIZE = 100
+
+_recipe_pools = TTLCache(maxsize=get_settings().recipe_pool_cache_size, ttl=get_settings().recipe_pool_ttl_seconds)
+_recipe_pools_lock = threading.Lock()
+
+
+def _normalized(names: str | None) -> str | None:
+    return ",".join(sorted(set(names.split(",")))) if names else None
+
+def preference_fingerprint(base_search_params: dict, calories_goal: float) -> tuple:
+    """Key of the pool for MealPlanGenerator.prepare_base_params and a calorie goal. Order of intolerances and cuisines does not matter"""
+    return (
+        base_search_params.get("diet"),
+        _normalized(base_search_params.get("intolerances")),
+        _normalized(base_search_params.get("cuisines")),
+        round(calories_goal / CALORIE_BUCKET_SIZE),
+    )
+
+def fingerprint_digest(fingerprint: tuple) -> str:
+    """Fixed length form of a fingerprint, to store it with precomputed meal plans"""
+    return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+def get_recipe_pool(fingerprint: tuple) -> dict[MealSlot, list[int]] | None:
+    with _recipe_pools_lock:
+        return _recipe_pools.get(fingerprint)
+
+def store_recipe_pool(fingerprint: tuple, recipe_ids_by_slot: dict[MealSlot, list[int]]):
+    with _recipe_pools_lock:
+        _recipe_pools[fingerprint] = {slot: list(recipe_ids) for slot, recipe_ids in recipe_ids_by_slot.items()}
+
+def discard_recipe_pool(fingerprint: tuple):
+    with _recipe_pools_lock:
+        _recipe_pools.pop(fingerprint, None)
+
+def clear_recipe_pools():
+    with _recipe_pools_lock:
+        _recipe_pools.clear()
@@ -29,6 +29,13 @@ def aggregate_ingredients_from_meal_plan(meal_plan: MealPlan, servings: int | No
     return aggregated_ingredients
 
 
+def summarize_shopping_list(meal_plan: MealPlan) -> dict:
+    """Item count and aisles of the meal plan's shopping list, from our own rows (no Spoonacular call)"""
+    aggregated = aggregate_ingredients_from_meal_plan(meal_plan)
+    aisles = {data["ingredient"].aisle or "Generic" for data in aggregated.values()}
+    return {"item_count": len(aggregated), "aisles": sorted(aisles)}
+
+
 def partition_shopping_list_items(
     aggregated: dict, language: str
 ) -> tuple[list[str], dict[str, Ingredient], list[ShoppingListItem]]:
@@ -1,9 +1,12 @@
 import asyncio
 import logging
+import time
 from typing import Any
 from fastapi import HTTPException
 import httpx
 from app.core.config import get_settings
+from app.core.metrics import record_spoonacular_response
+from app.core.request_metrics import track
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +14,13 @@ class SpoonacularService:
     """
     Service to interact with Spoonacular API
     """
+    # Tests and benchmarks replace it with a local stub of the API (e.g. httpx.ASGITransport)
+    transport: httpx.AsyncBaseTransport | None = None
+
     def __init__(self):
-        self.api_key = get_settings().spoonacular_api_key
-        self.base_url = "https://spoonacular-recipe-food-nutrition-v1.p.rapidapi.com"
+        settings = get_settings()
+        self.api_key = settings.spoonacular_api_key
+        self.base_url = settings.spoonacular_base_url.rstrip("/")
         self.headers = {
             "X-RapidAPI-Key": self.api_key,
             "X-RapidAPI-Host": "spoonacular-recipe-food-nutrition-v1.p.rapidapi.com"
@@ -26,56 +33,60 @@ class SpoonacularService:
         """ Makes an HTTP request to the Spoonacular API with automatic retries on rate limits."""
         url = f"{self.base_url}/{endpoint}"
         
-        async with httpx.AsyncClient(timeout=self.timeout, headers=self.headers) as client:
-            for attempt in range(self.max_retries):
-                try:
-                    logger.debug(f"Calling Spoonacular API ({method}). Endpoint: {endpoint}. Attempt: {attempt + 1}/{self.max_retries}")
+        with track("spoonacular"):
+            async with httpx.AsyncClient(timeout=self.timeout, headers=self.headers, transport=self.transport) as client:
+                for attempt in range(self.max_retries):
+                    try:
+                        logger.debug(f"Calling Spoonacular API ({method}). Endpoint: {endpoint}. Attempt: {attempt + 1}/{self.max_retries}")
                     
-                    if method.upper() == "GET":
-                        response = await client.get(url, params=params)
-                    elif method.upper() == "POST":
-                        response = await client.post(url, json=payload)
-                    else:
-                        logger.error(f"Invalid HTTP method '{method}' passed to _request_with_retry.")
-                        raise ValueError("Invalid HTTP method specified")
+                        attempt_started = time.perf_counter()
+                        if method.upper() == "GET":
+                            response = await client.get(url, params=params)
+                        elif method.upper() == "POST":
+                            response = await client.post(url, json=payload)
+                        else:
+                            logger.error(f"Invalid HTTP method '{method}' passed to _request_with_retry.")
+                            raise ValueError("Invalid HTTP method specified")
+                        record_spoonacular_response(endpoint, response.status_code, time.perf_counter() - attempt_started, response.headers)
 
-                    response.raise_for_status()
+                        response.raise_for_status()
                     
-                    remaining_results = response.headers.get("X-Ratelimit-Results-Remaining", "N/A")
-                    remaining_tiny_requests = response.headers.get("X-Ratelimit-Tinyrequests-Remaining", "N/A")
-                    remaining_requests = response.headers.get("X-Ratelimit-Requests-Remaining", "N/A")
-                    logger.info(f"Spoonacular call to '{endpoint}' successful. Rate limit Results remaining: {remaining_results}, Tiny requests remaining: {remaining_tiny_requests}, Requests remaining: {remaining_requests}")
-                    return response.json()
+                        remaining_results = response.headers.get("X-Ratelimit-Results-Remaining", "N/A")
+                        remaining_tiny_requests = response.headers.get("X-Ratelimit-Tinyrequests-Remaining", "N/A")
+                        remaining_requests = response.headers.get("X-Ratelimit-Requests-Remaining", "N/A")
+                        logger.info(f"Spoonacular call to '{endpoint}' successful. Rate limit Results remaining: {remaining_results}, Tiny requests remaining: {remaining_tiny_requests}, Requests remaining: {remaining_requests}")
+                        return response.json()
 
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code == 429 and attempt < self.max_retries - 1:
-                        delay = self.base_delay * (2 ** attempt)
-                        logger.warning(f"Rate limit exceeded on endpoint '{endpoint}'. Retrying in {delay:.2f} seconds...")
-                        await asyncio.sleep(delay)
-                        continue
+                    except httpx.HTTPStatusError as e:
+                        if e.response.status_code == 429 and attempt < self.max_retries - 1:
+                            delay = self.base_delay * (2 ** attempt)
+                            logger.warning(f"Rate limit exceeded on endpoint '{endpoint}'. Retrying in {delay:.2f} seconds...")
+                            await asyncio.sleep(delay)
+                            continue
 
-                    error_detail = e.response.text
-                    logger.error(
-                        f"Spoonacular API HTTP error on endpoint '{endpoint}'. Status: {e.response.status_code}. Details: {error_detail}",
-                        exc_info=True
-                    )
-                    raise HTTPException(
-                        status_code=e.response.status_code, 
-                        detail=f"Error from Spoonacular API: {error_detail}"
-                    )
+                        error_detail = e.response.text
+                        logger.error(
+                            f"Spoonacular API HTTP error on endpoint '{endpoint}'. Status: {e.response.status_code}. Details: {error_detail}",
+                            exc_info=True
+                        )
+                        raise HTTPException(
+                            status_code=e.response.status_code, 
+                            detail=f"Error from Spoonacular API: {error_detail}"
+                        )
                 
-                except httpx.RequestError as e:
-                    logger.error(
-                        f"Network error calling Spoonacular API endpoint '{endpoint}'. Details: {e}",
-                        exc_info=True
-                    )
-                    raise HTTPException(
-                        status_code=503, # Service Unavailable
-                        detail=f"Service unavailable: could not connect to Spoonacular. Details: {str(e)}"
-                    )
+                    except httpx.RequestError as e:
+                        record_spoonacular_response(endpoint, "network_error", time.perf_counter() - attempt_started)
+                        logger.error(
+                            f"Network error calling Spoonacular API endpoint '{endpoint}'. Details: {e}",
+                            exc_info=True
+                        )
+                        raise HTTPException(
+                            status_code=503, # Service Unavailable
+                            detail=f"Service unavailable: could not connect to Spoonacular. Details: {str(e)}"
+                        )
         
-        logger.error(f"Spoonacular API did not respond from endpoint '{endpoint}' after {self.max_retries} retries.")
-        raise HTTPException(status_code=504, detail="Spoonacular API did not respond after multiple retries.")
+            logger.error(f"Spoonacular API did not respond from endpoint '{endpoint}' after {self.max_retries} retries.")
+            raise HTTPException(status_code=504, detail="Spoonacular API did not respond after multiple retries.")
 
     async def search_recipes(
         self,
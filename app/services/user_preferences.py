@@ -1,6 +1,7 @@
 import logging
 from sqlalchemy.orm import Session
 from app.core.errors import ErrorCode
+from app.core.recipe_flags import excluded_allergen_flags
 from app.models import User, UserPreferences
 from fastapi import HTTPException
 from app.crud.diet_type import get_diet_type_by_id
@@ -117,11 +118,7 @@ def update_intolerance_preferences(db: Session, user: User, intolerance_ids: lis
     return preferences
 
 def user_has_complex_intolerances(preferences: UserPreferences) -> bool:
-    """ Check if the user has intolerances that do not appear as boolean attributes in recipes (gluten_free, dairy_free)"""
-    simple_intolerances = {"gluten", "dairy"}
-    for intolerance in preferences.intolerances:
-        if intolerance.name.lower() not in simple_intolerances:
-            return True
-    return False
+    """ Check if the user has intolerances the database can't filter: neither a recipe boolean (gluten_free, dairy_free) nor an allergen bit"""
+    return excluded_allergen_flags(preferences) is None
 
     
\ No newline at end of file
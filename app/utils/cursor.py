@@ -0,0 +1,26 @@
+import base64
+import binascii
+import json
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or points to a position that no longer exists"""
+
+
+def encode_cursor(payload: dict[str, int]) -> str:
+    """Opaque, URL safe pagination cursor"""
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, int]:
+    """Inverse of encode_cursor. Raises InvalidCursorError if the cursor was not produced by it"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+    if not isinstance(payload, dict) or not all(
+        isinstance(value, int) and not isinstance(value, bool) and value >= 0 for value in payload.values()
+    ):
+        raise InvalidCursorError("Malformed cursor")
+    return payload
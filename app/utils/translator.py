@@ -1,7 +1,10 @@
 import copy
+from functools import lru_cache
 import logging
 from google.cloud import translate_v2 as translate
 from app.core.config import get_settings
+from app.core.metrics import TRANSLATION_REQUESTS
+from app.core.request_metrics import track
 import google.auth
 
 UNIT_TRANSLATOR = {
@@ -109,23 +112,32 @@ REVERSED_UNIT_EXCEPTIONS = {v: k for k, v in UNIT_TRANSLATOR.items()}
 
 logger = logging.getLogger(__name__)
 #credentials = get_settings().google_translation_credentials
-credentials, project = google.auth.default()
-translate_client = translate.Client(credentials=credentials)
+
+@lru_cache
+def get_translate_client() -> translate.Client:
+    """Created on first use, so importing this module doesn't need Google credentials"""
+    credentials, project = google.auth.default()
+    return translate.Client(credentials=credentials)
 
 def translate_text(text_or_list: str | list[str], target_language='es'):
     
     if not text_or_list or (isinstance(text_or_list, list) and not any(text_or_list)):
         return text_or_list
+    if not get_settings().translate_enabled:
+        return text_or_list
     
     try:
-        result = translate_client.translate(
-            text_or_list,
-            target_language=target_language,
-            source_language='en'
-        )
+        with track("translate"):
+            result = get_translate_client().translate(
+                text_or_list,
+                target_language=target_language,
+                source_language='en'
+            )
     except Exception as e:
+        TRANSLATION_REQUESTS.labels(outcome="error").inc()
         print(f"Error in the translation: {e}")
         return text_or_list
+    TRANSLATION_REQUESTS.labels(outcome="success").inc()
     
     if isinstance(text_or_list, list):
         return [item['translatedText'] for item in result]
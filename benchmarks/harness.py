@@ -0,0 +1,138 @@
+"""Measurement, storage and comparison of benchmark results"""
+import json
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+from app.db.query_counter import count_queries
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    mean_ms: float
+    min_ms: float
+    max_ms: float
+    queries_per_call: float
+    alloc_peak_kib: float
+    alloc_blocks_per_call: float
+    cpu_ms_per_call: float = 0.0
+    extra: dict = field(default_factory=dict)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def measure(
+    name: str,
+    call: Callable[[int], Awaitable[object]],
+    iterations: int = 50,
+    warmup: int = 3,
+    alloc_iterations: int = 5,
+) -> BenchmarkResult:
+    """
+    Runs 'call(i)' iterations times and collects latency percentiles, CPU time (of the whole process,
+    worker threads included) and SQL statements per call.
+    Allocations are measured in a separate, shorter pass because tracemalloc slows everything down.
+    """
+    for i in range(warmup):
+        await call(i)
+
+    durations = []
+    cpu_started = time.process_time()
+    with count_queries() as queries:
+        for i in range(iterations):
+            started = time.perf_counter()
+            await call(i)
+            durations.append((time.perf_counter() - started) * 1000)
+    cpu_ms = (time.process_time() - cpu_started) * 1000
+
+    peaks, blocks = [], []
+    for i in range(alloc_iterations):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        await call(i)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        peaks.append(peak / 1024)
+        blocks.append(sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0))
+
+    durations.sort()
+    return BenchmarkResult(
+        name=name,
+        iterations=iterations,
+        p50_ms=round(percentile(durations, 50), 3),
+        p90_ms=round(percentile(durations, 90), 3),
+        p99_ms=round(percentile(durations, 99), 3),
+        mean_ms=round(statistics.fmean(durations), 3),
+        min_ms=round(durations[0], 3),
+        max_ms=round(durations[-1], 3),
+        queries_per_call=round(queries.count / iterations, 2),
+        alloc_peak_kib=round(statistics.fmean(peaks), 1) if peaks else 0.0,
+        alloc_blocks_per_call=round(statistics.fmean(blocks), 1) if blocks else 0.0,
+        cpu_ms_per_call=round(cpu_ms / iterations, 3),
+    )
+
+
+def save_results(path: str, results: list[BenchmarkResult], metadata: dict):
+    document = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "metadata": metadata,
+        "results": [asdict(result) for result in results],
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+
+def load_results(path: str) -> dict[str, dict]:
+    with open(path) as f:
+        return {result["name"]: result for result in json.load(f)["results"]}
+
+
+def compare_results(baseline: dict[str, dict], current: dict[str, dict], threshold: float = 0.10) -> tuple[list[str], list[str]]:
+    """
+    Returns the report lines and the regressions: latency (p50 or p90) worse than the baseline by more
+    than 'threshold', or any increase in queries per call.
+    """
+    lines, regressions = [], []
+    header = f"{'benchmark':<32}{'p50 ms':>18}{'p90 ms':>18}{'cpu ms':>18}{'queries':>14}{'peak KiB':>18}"
+    lines.append(header)
+    lines.append("-" * len(header))
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            lines.append(f"{name:<32} only in {'current' if name in current else 'baseline'}")
+            continue
+        old, new = baseline[name], current[name]
+
+        def change(key):
+            return (new[key] - old[key]) / old[key] if old[key] else 0.0
+
+        lines.append(
+            f"{name:<32}"
+            f"{old['p50_ms']:>8.2f} → {new['p50_ms']:<7.2f}"
+            f"{old['p90_ms']:>8.2f} → {new['p90_ms']:<7.2f}"
+            f"{old.get('cpu_ms_per_call', 0.0):>8.2f} → {new.get('cpu_ms_per_call', 0.0):<7.2f}"
+            f"{old['queries_per_call']:>6.1f} → {new['queries_per_call']:<5.1f}"
+            f"{old['alloc_peak_kib']:>8.0f} → {new['alloc_peak_kib']:<7.0f}"
+        )
+        for key in ("p50_ms", "p90_ms"):
+            if change(key) > threshold:
+                regressions.append(f"{name}: {key} {old[key]:.2f} → {new[key]:.2f} (+{change(key):.0%})")
+        if new["queries_per_call"] > old["queries_per_call"]:
+            regressions.append(f"{name}: queries per call {old['queries_per_call']} → {new['queries_per_call']}")
+    return lines, regressions
@@ -0,0 +1,217 @@
+"""
+Benchmarks of the hot paths: meal plan generation, meal suggestions, meal plan and recipe
+serialization and the meal plan, recipe detail, week recipes batch and shopping list endpoints.
+
+They run against a seeded database (a synthetic SQLite one is generated unless --database-url
+is given) with Spoonacular replaced by the local stub and translation disabled, and report
+latency percentiles, CPU time and SQL statements per call and allocations.
+
+Usage:
+    python -m benchmarks.hot_paths run --output results.json
+    python -m benchmarks.hot_paths run --database-url mysql+pymysql://... --iterations 200 --output after.json
+    python -m benchmarks.hot_paths compare before.json after.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from benchmarks.harness import compare_results, load_results, measure, save_results
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+
+
+def prepare_environment(database_url: str):
+    """Must run before importing the app: settings and the engine are created at import time"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["TRANSLATE_ENABLED"] = "false"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["SERVER_TIMING_ENABLED"] = "false"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("SPOONACULAR_API_KEY", "benchmark-key")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def seed_database(database_url: str, recipes: int, ingredients: int, users: int, seed: int):
+    from app.scripts.generate_synthetic_data import generate
+
+    generate(database_url, recipes=recipes, ingredients=ingredients, users=users, seed=seed, create_schema=True)
+
+
+async def run_benchmarks(iterations: int, seed: int, stub_latency_ms: float) -> tuple[list, dict]:
+    import httpx
+    from fastapi.responses import ORJSONResponse
+    from sqlalchemy import select
+    from app.api.main import app
+    from app.core.auth import create_access_token
+    from app.crud.meal_plan import get_meal_plan_for_response
+    from app.crud.recipe import get_recipe_details
+    from app.crud.user_preferences import get_user_preferences_details
+    from app.db import db_connection
+    from app.models.ingredient import Ingredient
+    from app.models.meal_plan import MealPlan
+    from app.models.recipe import Recipe
+    from app.services.meal_plan import get_meal_replacement_suggestions, meal_plan_to_response
+    from app.services.meal_plan_generator import MealPlanGenerator
+    from app.services.recipe import serialize_recipe_detail
+    from app.services.recipe_pools import clear_recipe_pools
+    from app.services.spoonacular import SpoonacularService
+    from benchmarks.spoonacular_stub import stub_transport
+
+    rng = random.Random(seed)
+    with db_connection.SessionLocal() as db:
+        plans = db.execute(select(MealPlan.id, MealPlan.user_id).order_by(MealPlan.id).limit(5000)).all()
+        recipe_ids = db.scalars(select(Recipe.id).order_by(Recipe.id).limit(20000)).all()
+        ingredients = db.execute(select(Ingredient.name_en, Ingredient.spoonacular_id).where(Ingredient.spoonacular_id.is_not(None))).all()
+    if not plans or not recipe_ids:
+        raise SystemExit("The database has no meal plans or recipes: seed it first")
+
+    plans = rng.sample(plans, min(len(plans), iterations * 4))
+    recipe_ids = rng.sample(recipe_ids, min(len(recipe_ids), iterations * 4))
+    SpoonacularService.transport = stub_transport(
+        latency_ms=stub_latency_ms,
+        ingredient_ids=[spoonacular_id for _, spoonacular_id in ingredients][:500] or None,
+        ingredient_ids_by_name={name.lower(): spoonacular_id for name, spoonacular_id in ingredients},
+    )
+
+    async def generate_meal_plan(i: int):
+        # Every generation searches, as when no user with the same preferences generated a plan lately
+        clear_recipe_pools()
+        await generate_meal_plan_pooled(i)
+
+    async def generate_meal_plan_pooled(i: int):
+        with db_connection.SessionLocal() as db:
+            preferences = get_user_preferences_details(db, plans[i % len(plans)].user_id)
+            preferences.calories_goal = preferences.calories_goal or 2000
+            await MealPlanGenerator(preferences, db, SpoonacularService()).generate()
+
+    async def suggestions(i: int):
+        with db_connection.SessionLocal() as db:
+            preferences = get_user_preferences_details(db, plans[i % len(plans)].user_id)
+            await get_meal_replacement_suggestions(db, preferences, None, MEAL_TYPES[i % len(MEAL_TYPES)], limit=10)
+
+    async def meal_plan_response(i: int):
+        with db_connection.SessionLocal() as db:
+            meal_plan_to_response(get_meal_plan_for_response(db, plans[i % len(plans)].id), "en")
+
+    async def recipe_detail(i: int):
+        with db_connection.SessionLocal() as db:
+            serialize_recipe_detail(get_recipe_details(db, recipe_ids[i % len(recipe_ids)]), "en")
+
+    # Serialization and JSON encoding alone, on rows loaded up front: the CPU the response pipeline adds
+    encode_session = db_connection.SessionLocal()
+    loaded_plans = [get_meal_plan_for_response(encode_session, plan.id) for plan in plans[:50]]
+    loaded_recipes = [get_recipe_details(encode_session, recipe_id) for recipe_id in recipe_ids[:50]]
+
+    async def meal_plan_encode(i: int):
+        ORJSONResponse(meal_plan_to_response(loaded_plans[i % len(loaded_plans)], "es")).body
+
+    async def recipe_detail_encode(i: int):
+        ORJSONResponse(serialize_recipe_detail(loaded_recipes[i % len(loaded_recipes)], "es")).body
+
+    tokens = {plan.user_id: create_access_token({"sub": str(plan.user_id)}) for plan in plans}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def shopping_list(i: int):
+            user_id = plans[i % len(plans)].user_id
+            response = await client.get("/shopping_lists/me", headers={"Authorization": f"Bearer {tokens[user_id]}"})
+            response.raise_for_status()
+
+        async def meal_plan_endpoint(i: int):
+            user_id = plans[i % len(plans)].user_id
+            response = await client.get("/meal_plans/me", headers={"Authorization": f"Bearer {tokens[user_id]}", "Accept-Language": "es"})
+            response.raise_for_status()
+
+        async def recipe_detail_endpoint(i: int):
+            user_id = plans[i % len(plans)].user_id
+            response = await client.get(f"/recipes/{recipe_ids[i % len(recipe_ids)]}", headers={"Authorization": f"Bearer {tokens[user_id]}"})
+            response.raise_for_status()
+
+        async def week_recipes_endpoint(i: int):
+            # The recipes of a full week (7 days x 3 meals) in one call
+            user_id = plans[i % len(plans)].user_id
+            week = [recipe_ids[(i * 21 + k) % len(recipe_ids)] for k in range(21)]
+            response = await client.get("/recipes", params={"ids": ",".join(map(str, week))}, headers={"Authorization": f"Bearer {tokens[user_id]}"})
+            response.raise_for_status()
+
+        results = []
+        for name, call in [
+            ("meal_plan_generate", generate_meal_plan),
+            ("meal_plan_generate_pooled", generate_meal_plan_pooled),
+            ("meal_suggestions", suggestions),
+            ("meal_plan_to_response", meal_plan_response),
+            ("serialize_recipe_detail", recipe_detail),
+            ("meal_plan_encode", meal_plan_encode),
+            ("recipe_detail_encode", recipe_detail_encode),
+            ("shopping_list_endpoint", shopping_list),
+            ("meal_plan_endpoint", meal_plan_endpoint),
+            ("recipe_detail_endpoint", recipe_detail_endpoint),
+            ("week_recipes_endpoint", week_recipes_endpoint),
+        ]:
+            result = await measure(name, call, iterations=iterations)
+            print(f"{name:<28} p50 {result.p50_ms:8.2f} ms  p90 {result.p90_ms:8.2f} ms  p99 {result.p99_ms:8.2f} ms  "
+                  f"cpu {result.cpu_ms_per_call:7.2f} ms  {result.queries_per_call:6.1f} queries  {result.alloc_peak_kib:8.0f} KiB peak",
+                  file=sys.stderr)
+            results.append(result)
+
+    encode_session.close()
+    return results, {"plans_sampled": len(plans), "recipes_sampled": len(recipe_ids)}
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        prepare_environment(database_url)
+        if not args.database_url:
+            seed_database(database_url, args.recipes, args.ingredients, args.users, args.seed)
+        results, metadata = asyncio.run(run_benchmarks(args.iterations, args.seed, args.stub_latency_ms))
+
+    metadata.update({
+        "database": database_url.split("://")[0],
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "stub_latency_ms": args.stub_latency_ms,
+        "synthetic_sizes": None if args.database_url else {"recipes": args.recipes, "ingredients": args.ingredients, "users": args.users},
+    })
+    save_results(args.output, results, metadata)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+def compare(args) -> int:
+    lines, regressions = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(f"  {regression}" for regression in regressions))
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and write the results as JSON")
+    run_parser.add_argument("--output", default="benchmark-results.json")
+    run_parser.add_argument("--database-url", help="Seeded database to use instead of a fresh synthetic SQLite one")
+    run_parser.add_argument("--iterations", type=int, default=50)
+    run_parser.add_argument("--recipes", type=int, default=20_000)
+    run_parser.add_argument("--ingredients", type=int, default=1_000)
+    run_parser.add_argument("--users", type=int, default=2_000)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated Spoonacular network latency")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files and fail on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed latency increase (0.10 = 10%%)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
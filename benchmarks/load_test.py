@@ -0,0 +1,314 @@
+"""
+HTTP load test of the API with a traffic mix modelled on the mobile app, to size gunicorn
+workers and DB pools.
+
+It starts the Spoonacular stub and the app (gunicorn with uvicorn workers) as local processes,
+logs in synthetic users and runs virtual users that pick weighted scenarios in a loop, ramping
+the concurrency stage by stage. Throughput, error rate and latency percentiles are reported per
+stage and endpoint.
+
+The database must contain synthetic users (see app/scripts/generate_synthetic_data.py); a fresh
+SQLite one is generated unless --database-url is given. SQLite serializes writes, so use MySQL
+when sizing the pools for production.
+
+Usage:
+    python -m benchmarks.load_test --stages 10:30,50:60,100:60 --workers 4 --output load.json
+    python -m benchmarks.load_test --database-url mysql+pymysql://... --mix meal_plan=50,recipe=50
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --database-url ...  # already running app
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import httpx
+from sqlalchemy import create_engine, select
+from benchmarks.harness import percentile
+
+DEFAULT_MIX = {
+    "login": 2,
+    "meal_plan": 30,
+    "recipe": 20,
+    "suggestions": 15,
+    "change_meal": 10,
+    "shopping_list": 15,
+    "generate": 3,
+}
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    seconds: float
+    status: int | None
+
+
+@dataclass
+class VirtualUser:
+    user_id: int
+    login: str
+    token: str | None = None
+    meal_item_ids: list[int] = field(default_factory=list)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}'. Valid ones: {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def parse_stages(value: str) -> list[tuple[int, float]]:
+    """'10:30,50:60' -> 10 concurrent users for 30 s, then 50 for 60 s"""
+    stages = []
+    for part in value.split(","):
+        concurrency, _, seconds = part.partition(":")
+        stages.append((int(concurrency), float(seconds or 30)))
+    return stages
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, users: list[VirtualUser], recipe_ids: list[int],
+                 mix: dict[str, float], password: str, think_seconds: float, seed: int):
+        self.client = client
+        self.users = users
+        self.recipe_ids = recipe_ids
+        self.scenarios = list(mix)
+        self.weights = list(mix.values())
+        self.password = password
+        self.think_seconds = think_seconds
+        self.rng = random.Random(seed)
+        self.samples: list[Sample] = []
+
+    async def _call(self, endpoint: str, method: str, url: str, user: VirtualUser | None = None, **kwargs) -> httpx.Response | None:
+        headers = {"Authorization": f"Bearer {user.token}"} if user and user.token else {}
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.samples.append(Sample(endpoint, time.perf_counter() - started, None))
+            return None
+        self.samples.append(Sample(endpoint, time.perf_counter() - started, response.status_code))
+        return response
+
+    async def login(self, user: VirtualUser):
+        response = await self._call("POST /login", "POST", "/login", data={"username": user.login, "password": self.password})
+        if response is not None and response.status_code == 200:
+            user.token = response.json()["tokens"]["access_token"]
+
+    async def meal_plan(self, user: VirtualUser):
+        response = await self._call("GET /meal_plans/me", "GET", "/meal_plans/me", user)
+        if response is not None and response.status_code == 200:
+            user.meal_item_ids = [
+                meal["meal_item_id"] for day in response.json()["days"] for meal in day["meals"] if meal["meal_item_id"]
+            ]
+
+    async def recipe(self, user: VirtualUser):
+        await self._call("GET /recipes/{id}", "GET", f"/recipes/{self.rng.choice(self.recipe_ids)}", user)
+
+    async def suggestions(self, user: VirtualUser):
+        if not user.meal_item_ids:
+            return await self.meal_plan(user)
+        await self._call("GET /meal_plans/suggestions", "GET", "/meal_plans/suggestions", user,
+                         params={"meal_item_id": self.rng.choice(user.meal_item_ids), "limit": 10})
+
+    async def change_meal(self, user: VirtualUser):
+        if not user.meal_item_ids:
+            return await self.meal_plan(user)
+        await self._call("PATCH /meal_plans/meal_items/{id}", "PATCH", f"/meal_plans/meal_items/{self.rng.choice(user.meal_item_ids)}",
+                         user, json={"new_recipe_id": self.rng.choice(self.recipe_ids)})
+
+    async def shopping_list(self, user: VirtualUser):
+        await self._call("GET /shopping_lists/me", "GET", "/shopping_lists/me", user)
+
+    async def generate(self, user: VirtualUser):
+        response = await self._call("POST /meal_plans/generate", "POST", "/meal_plans/generate", user)
+        if response is not None and response.status_code == 200:
+            user.meal_item_ids = []
+
+    async def virtual_user(self, user: VirtualUser, deadline: float):
+        if not user.token:
+            await self.login(user)
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(self.scenarios, self.weights)[0]
+            await getattr(self, scenario)(user)
+            if self.think_seconds:
+                await asyncio.sleep(self.rng.expovariate(1 / self.think_seconds))
+
+    async def run_stage(self, concurrency: int, seconds: float) -> list[Sample]:
+        self.samples = []
+        deadline = time.perf_counter() + seconds
+        users = [self.users[i % len(self.users)] for i in range(concurrency)]
+        await asyncio.gather(*(self.virtual_user(user, deadline) for user in users))
+        return self.samples
+
+
+def summarize(samples: list[Sample], seconds: float) -> dict[str, dict]:
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+    by_endpoint["ALL"] = samples
+
+    summary = {}
+    for endpoint, endpoint_samples in sorted(by_endpoint.items()):
+        durations = sorted(sample.seconds * 1000 for sample in endpoint_samples)
+        errors = sum(1 for sample in endpoint_samples if sample.status is None or sample.status >= 400)
+        summary[endpoint] = {
+            "requests": len(endpoint_samples),
+            "rps": round(len(endpoint_samples) / seconds, 2),
+            "error_rate": round(errors / len(endpoint_samples), 4) if endpoint_samples else 0.0,
+            "p50_ms": round(percentile(durations, 50), 2),
+            "p90_ms": round(percentile(durations, 90), 2),
+            "p99_ms": round(percentile(durations, 99), 2),
+            "mean_ms": round(statistics.fmean(durations), 2) if durations else 0.0,
+        }
+    return summary
+
+
+def print_stage(concurrency: int, seconds: float, summary: dict[str, dict]):
+    print(f"\n== {concurrency} concurrent users, {seconds:.0f} s ==")
+    print(f"{'endpoint':<36}{'requests':>9}{'rps':>9}{'errors':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}")
+    for endpoint, stats in summary.items():
+        print(f"{endpoint:<36}{stats['requests']:>9}{stats['rps']:>9.1f}{stats['error_rate']:>8.1%}"
+              f"{stats['p50_ms']:>9.1f}{stats['p90_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+
+
+def load_test_data(database_url: str, users: int, seed: int) -> tuple[list[VirtualUser], list[int]]:
+    from app.models import MealPlan, Recipe, User
+
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(User.id, User.email).join(MealPlan, MealPlan.user_id == User.id).distinct().order_by(User.id).limit(users * 10)
+        ).all()
+        recipe_ids = connection.scalars(select(Recipe.id).where(Recipe.spoonacular_id.is_not(None)).limit(50_000)).all()
+    engine.dispose()
+    if not rows or not recipe_ids:
+        raise SystemExit("The database has no users with a meal plan: seed it with app.scripts.generate_synthetic_data")
+
+    rows = random.Random(seed).sample(rows, min(len(rows), users))
+    return [VirtualUser(user_id=user_id, login=email) for user_id, email in rows], list(recipe_ids)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Process serving {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+@contextmanager
+def serve(args_list: list[str], url: str, env: dict):
+    process = subprocess.Popen([sys.executable, "-m", *args_list], env=env)
+    try:
+        _wait_until_up(url, process)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@contextmanager
+def local_servers(database_url: str, workers: int, stub_latency_ms: float):
+    """Starts the Spoonacular stub and the app on free local ports and yields the app URL"""
+    stub_port, app_port = _free_port(), _free_port()
+    env = {
+        **os.environ,
+        "STUB_DATABASE_URL": database_url,
+        "STUB_LATENCY_MS": str(stub_latency_ms),
+        "DATABASE_URL": database_url,
+        "SPOONACULAR_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "SPOONACULAR_API_KEY": os.environ.get("SPOONACULAR_API_KEY", "load-test"),
+        "TRANSLATE_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "JWT_SECRET_KEY": os.environ.get("JWT_SECRET_KEY", "load-test-secret"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    }
+    stub = ["uvicorn", "benchmarks.spoonacular_stub:create_stub_app_from_env", "--factory",
+            "--port", str(stub_port), "--log-level", "warning"]
+    app = ["gunicorn", "app.api.main:app", "--worker-class", "uvicorn.workers.UvicornWorker",
+           "--workers", str(workers), "--bind", f"127.0.0.1:{app_port}", "--log-level", "warning"]
+    with serve(stub, f"http://127.0.0.1:{stub_port}/docs", env), serve(app, f"http://127.0.0.1:{app_port}/", env):
+        yield f"http://127.0.0.1:{app_port}"
+
+
+async def run_load_test(base_url: str, users: list[VirtualUser], recipe_ids: list[int], args) -> list[dict]:
+    limits = httpx.Limits(max_connections=max(concurrency for concurrency, _ in args.stages))
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        load_test = LoadTest(client, users, recipe_ids, args.mix, args.password, args.think_ms / 1000, args.seed)
+        stages = []
+        for concurrency, seconds in args.stages:
+            summary = summarize(await load_test.run_stage(concurrency, seconds), seconds)
+            print_stage(concurrency, seconds, summary)
+            stages.append({"concurrency": concurrency, "seconds": seconds, "endpoints": summary})
+        return stages
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.scripts.generate_synthetic_data import SYNTHETIC_PASSWORD, generate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Seeded database (default: a fresh synthetic SQLite one)")
+    parser.add_argument("--base-url", help="Test an already running app instead of starting one")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers of the app")
+    parser.add_argument("--stages", type=parse_stages, default=parse_stages("5:15,20:30,50:30"), help="concurrency:seconds,...")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="scenario=weight,... Scenarios: " + ", ".join(DEFAULT_MIX))
+    parser.add_argument("--users", type=int, default=200, help="Distinct users to log in as")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between the requests of a virtual user")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0, help="Simulated Spoonacular latency")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--password", default=SYNTHETIC_PASSWORD)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the per stage results as JSON")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url
+        if not database_url:
+            database_url = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+            generate(database_url, recipes=20_000, ingredients=1_000, users=max(args.users * 2, 500), seed=args.seed, create_schema=True)
+
+        users, recipe_ids = load_test_data(database_url, args.users, args.seed)
+        if args.base_url:
+            stages = asyncio.run(run_load_test(args.base_url, users, recipe_ids, args))
+        else:
+            with local_servers(database_url, args.workers, args.stub_latency_ms) as base_url:
+                stages = asyncio.run(run_load_test(base_url, users, recipe_ids, args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"workers": args.workers, "mix": args.mix, "stages": stages}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Measures how much time logging adds to the request path.
+
+Each simulated request emits what the shopping list endpoint logs, with the same f-string messages
+as the app: the two middleware lines, a few INFO lines in the route and one DEBUG line per item.
+It is run twice, and only the logging setup differs between the runs:
+
+- sync: the previous setup. Root at DEBUG, records formatted and written by a StreamHandler
+  on the calling thread.
+- queued: the current setup. Root at INFO, so the DEBUG lines are dropped at the level check,
+  and records handed to a QueueHandler; the listener thread serializes them to JSON and writes them.
+
+The f-strings are built on the calling thread in both runs, dropped DEBUG lines included.
+
+Usage: python -m benchmarks.logging_overhead [--requests 2000] [--items 30]
+"""
+import argparse
+import logging
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+from app.core.logging_config import DeferredFormattingQueueHandler, JsonFormatter, RequestIdFilter
+
+
+def _shopping_list_request(logger: logging.Logger, user_id: int, items: list[dict]):
+    logger.info("Incoming request: GET /shopping_lists/me")
+    logger.info(f"User ID: {user_id} (user{user_id}) requested their shopping list in language 'es'.")
+    for item in items:
+        logger.debug(f"Processing Spoonacular Shopping list item '{item['name']}' id {item['id']} for user ID {user_id} (user{user_id})")
+    logger.info(f"Successfully generated shopping list for user ID {user_id} (user{user_id}) with {len(items)} aisles.")
+    logger.info("Request finished: GET /shopping_lists/me - Status 200")
+
+
+def _time_requests(request, logger: logging.Logger, requests: int, items: list[dict]) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        request(logger, i, items)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+def run(requests: int = 2000, items: int = 30) -> dict:
+    """Returns the logging cost per request, in microseconds, of both setups"""
+    request_items = [{"name": f"ingredient {i}", "id": 1000 + i} for i in range(items)]
+    results = {}
+
+    with tempfile.TemporaryFile("w") as output:
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(logging.Formatter("%(levelname)s: %(asctime)s - %(name)s - %(message)s"))
+        logger = logging.getLogger("benchmarks.logging.sync")
+        logger.handlers, logger.propagate = [handler], False
+        logger.setLevel(logging.DEBUG)
+        results["sync_us_per_request"] = _time_requests(_shopping_list_request, logger, requests, request_items)
+
+    with tempfile.TemporaryFile("w") as output:
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(JsonFormatter())
+        queue_handler = DeferredFormattingQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(RequestIdFilter())
+        listener = QueueListener(queue_handler.queue, handler)
+        listener.start()
+        logger = logging.getLogger("benchmarks.logging.queued")
+        logger.handlers, logger.propagate = [queue_handler], False
+        logger.setLevel(logging.INFO)
+        results["queued_us_per_request"] = _time_requests(_shopping_list_request, logger, requests, request_items)
+        listener.stop()
+
+    results["saved_us_per_request"] = results["sync_us_per_request"] - results["queued_us_per_request"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=30)
+    args = parser.parse_args()
+
+    results = run(args.requests, args.items)
+    print(f"sync logging:   {results['sync_us_per_request']:8.1f} us/request")
+    print(f"queued logging: {results['queued_us_per_request']:8.1f} us/request")
+    print(f"saved:          {results['saved_us_per_request']:8.1f} us/request")
@@ -0,0 +1,168 @@
+"""
+Local stand-in for the Spoonacular API, for benchmarks and load tests.
+
+Responses are deterministic (the same search returns the same recipes) and shaped like the
+real ones for the endpoints the app calls. An optional delay simulates the network.
+Use it in-process with `stub_transport()` or serve `create_stub_app()` with uvicorn.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import re
+import httpx
+from fastapi import FastAPI, Request
+from sqlalchemy import create_engine, text
+
+FIRST_STUB_RECIPE_ID = 800_000_000
+SYNTHETIC_INGREDIENT_ID_OFFSET = 900_000_000
+
+_SHOPPING_ITEM = re.compile(r"^(?P<amount>[\d.]+)\s+(?:(?P<unit>\S+)\s+)?(?P<name>.+)$")
+
+
+def _rng_for(*parts) -> random.Random:
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def fake_recipe(recipe_id: int, dish_type: str, diet: str | None, ingredient_ids: list[int]) -> dict:
+    rng = _rng_for("recipe", recipe_id)
+    ready = rng.choice((15, 20, 30, 45, 60))
+    diets = [diet] if diet else []
+    ingredients = rng.sample(ingredient_ids, k=min(len(ingredient_ids), rng.randint(5, 12)))
+    return {
+        "id": recipe_id,
+        "title": f"Stub {dish_type} {recipe_id}",
+        "image": f"https://img.spoonacular.com/recipes/{recipe_id}-556x370.jpg",
+        "imageType": "jpg",
+        "readyInMinutes": ready,
+        "preparationMinutes": ready // 3,
+        "cookingMinutes": ready - ready // 3,
+        "servings": rng.choice((2, 4)),
+        "summary": f"A stub {dish_type} recipe.",
+        "vegetarian": diet in ("vegetarian", "vegan"),
+        "vegan": diet == "vegan",
+        "glutenFree": diet == "gluten free" or rng.random() < 0.3,
+        "dairyFree": diet in ("dairy free", "vegan") or rng.random() < 0.3,
+        "veryHealthy": False,
+        "cheap": False,
+        "veryPopular": False,
+        "sustainable": False,
+        "lowFodmap": diet == "low fodmap",
+        "healthScore": rng.randint(1, 100),
+        "spoonacularScore": rng.uniform(1, 100),
+        "dishTypes": [dish_type],
+        "cuisines": [],
+        "diets": diets,
+        "nutrition": {"nutrients": [
+            {"name": "Calories", "amount": round(rng.uniform(200, 900), 1), "unit": "kcal"},
+            {"name": "Protein", "amount": round(rng.uniform(5, 50), 1), "unit": "g"},
+        ]},
+        "extendedIngredients": [
+            {
+                "id": ingredient_id,
+                "name": f"stub ingredient {ingredient_id}",
+                "nameClean": f"stub ingredient {ingredient_id}",
+                "original": f"100 g stub ingredient {ingredient_id}",
+                "amount": 100,
+                "unit": "g",
+                "measures": {"metric": {"amount": 100, "unitShort": "g"}},
+            }
+            for ingredient_id in ingredients
+        ],
+        "analyzedInstructions": [],
+    }
+
+
+def create_stub_app(
+    latency_ms: float = 0.0,
+    ingredient_ids: list[int] | None = None,
+    ingredient_ids_by_name: dict[str, int] | None = None,
+) -> FastAPI:
+    """
+    ingredient_ids: Spoonacular ids used in the generated recipes (by default the synthetic ones).
+    ingredient_ids_by_name: English name -> Spoonacular id, to resolve the shopping list items.
+    """
+    app = FastAPI()
+    ingredient_ids = ingredient_ids or [SYNTHETIC_INGREDIENT_ID_OFFSET + i for i in range(1, 501)]
+    ingredient_ids_by_name = ingredient_ids_by_name or {}
+    app.state.calls = 0
+
+    @app.middleware("http")
+    async def simulate_network(request: Request, call_next):
+        app.state.calls += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        response = await call_next(request)
+        response.headers["X-Ratelimit-Requests-Remaining"] = "1000"
+        return response
+
+    @app.get("/recipes/complexSearch")
+    async def complex_search(type: str = "main course", diet: str | None = None, number: int = 10, offset: int = 0):
+        rng = _rng_for("search", type, diet, offset)
+        first_id = FIRST_STUB_RECIPE_ID + rng.randrange(1_000_000) * 10
+        results = [fake_recipe(first_id + i, type, diet, ingredient_ids) for i in range(number)]
+        return {"results": results, "offset": offset, "number": number, "totalResults": 1000}
+
+    @app.get("/recipes/informationBulk")
+    async def information_bulk(ids: str):
+        return [fake_recipe(int(recipe_id), "main course", None, ingredient_ids) for recipe_id in ids.split(",") if recipe_id]
+
+    @app.get("/food/ingredients/{ingredient_id}/information")
+    async def ingredient_information(ingredient_id: int):
+        return {"id": ingredient_id, "name": f"stub ingredient {ingredient_id}", "image": None, "aisle": "Produce", "possibleUnits": ["g"]}
+
+    @app.post("/mealplanner/shopping-list/compute")
+    async def compute_shopping_list(payload: dict):
+        items = []
+        for i, line in enumerate(payload.get("items", [])):
+            match = _SHOPPING_ITEM.match(line)
+            if not match:
+                continue
+            name = match["name"]
+            amount = float(match["amount"])
+            unit = match["unit"] or ""
+            items.append({
+                "id": i,
+                "name": name,
+                "ingredientId": ingredient_ids_by_name.get(name, ingredient_ids[i % len(ingredient_ids)]),
+                "measures": {
+                    "metric": {"amount": amount, "unit": unit},
+                    "us": {"amount": amount, "unit": unit},
+                },
+                "pantryItem": False,
+                "aisle": "Produce",
+                "cost": 1.0,
+            })
+        return {"aisles": [{"aisle": "Produce", "items": items}], "cost": float(len(items))}
+
+    return app
+
+
+def create_stub_app_from_env() -> FastAPI:
+    """
+    Factory for serving the stub in its own process:
+
+        STUB_LATENCY_MS=80 STUB_DATABASE_URL=sqlite:///bench.db \\
+            uvicorn benchmarks.spoonacular_stub:create_stub_app_from_env --factory --port 8100
+
+    With STUB_DATABASE_URL the recipes and shopping lists use the ingredients of that database.
+    """
+    ingredients = []
+    if os.environ.get("STUB_DATABASE_URL"):
+        engine = create_engine(os.environ["STUB_DATABASE_URL"])
+        with engine.connect() as connection:
+            ingredients = connection.execute(
+                text("SELECT name_en, spoonacular_id FROM ingredients WHERE spoonacular_id IS NOT NULL")
+            ).all()
+        engine.dispose()
+    return create_stub_app(
+        latency_ms=float(os.environ.get("STUB_LATENCY_MS", 0)),
+        ingredient_ids=[spoonacular_id for _, spoonacular_id in ingredients][:500] or None,
+        ingredient_ids_by_name={name.lower(): spoonacular_id for name, spoonacular_id in ingredients},
+    )
+
+
+def stub_transport(app: FastAPI | None = None, **options) -> httpx.ASGITransport:
+    """In-process transport for SpoonacularService.transport"""
+    return httpx.ASGITransport(app=app or create_stub_app(**options))
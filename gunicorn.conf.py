@@ -0,0 +1,18 @@
+import os
+import shutil
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    """Starts every deployment with an empty Prometheus multiprocess directory"""
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Only prometheus_client here: importing the app from a signal handler of the master
+    # re-enters the import when several workers exit at once
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,3 +1,3 @@
 #!/bin/bash
 source .venv/bin/activate
-uvicorn app.api.main:app --host 0.0.0.0 --port 13000 --reload --log-level debug
\ No newline at end of file
+LOG_LEVEL=DEBUG LOG_FORMAT=text uvicorn app.api.main:app --host 0.0.0.0 --port 13000 --reload --log-level debug
\ No newline at end of file
@@ -4,6 +4,7 @@ import pytest
 from app.schemas.user import UserResponse
 from app.core.config import Settings
 import app.api.routes.auth
+from app.db.query_counter import count_queries
 
 app.api.routes.auth.limiter.enabled = False  # Disable rate limiting for tests
 
@@ -30,7 +31,23 @@ def mock_settings():
         )
         yield mock_settings
 
+@pytest.fixture(autouse=True)
+def clear_payload_caches():
+    """Every test builds its own database, so cached payloads of the same ids must not leak between them"""
+    from app.services.recipe import clear_recipe_detail_payloads
+    from app.services.recipe_pools import clear_recipe_pools
+    clear_recipe_detail_payloads()
+    clear_recipe_pools()
+    yield
+
+
 @pytest.fixture
 def client():
     from app.api.main import app
     return TestClient(app)
+
+@pytest.fixture
+def query_counter():
+    """Counts the SQL statements run during the test. Use assert_max() / assert_no_n_plus_one() to set budgets"""
+    with count_queries() as counter:
+        yield counter
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import Session
+from app.core import recipe_flags
+from app.core.config import get_settings
+from app.core.meal_plan_config import MEAL_TYPE_SUGGESTION_CONFIG
+from app.crud.recipe import _build_recipe_suggestions_query, _build_recipe_suggestions_query_with_joins, get_or_create_spoonacular_recipe
+from app.models import Ingredient, IngredientAllergen, Intolerance, Recipe, RecipesIngredient, UserPreferences
+from app.scripts.generate_synthetic_data import generate
+from app.services.allergens import allergens_in, recipe_allergen_flags, tag_ingredients, tag_recipes
+from app.services.user_preferences import user_has_complex_intolerances
+
+
+@pytest.fixture(scope="module")
+def synthetic_engine(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('allergens') / 'allergens.db'}"
+    generate(url, recipes=800, ingredients=60, users=5, seed=5, batch_size=500, create_schema=True)
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("whole milk", {"dairy"}),
+    ("coconut milk", set()),
+    ("peanut butter", {"peanut"}),
+    ("large eggs", {"egg"}),
+    ("eggplant", set()),
+    ("gluten-free pasta", {"grain"}),
+    ("soy sauce", {"soy", "gluten", "grain", "wheat"}),
+    ("shrimp", {"shellfish", "seafood"}),
+    ("pine nuts", {"tree nut"}),
+    ("nutmeg", set()),
+    ("water chestnuts", set()),
+])
+def test_keyword_rules(name, expected):
+    assert allergens_in(name) == expected
+
+
+def test_user_has_complex_intolerances_only_for_unknown_intolerances():
+    def preferences(*names):
+        return UserPreferences(intolerances=[Intolerance(name=name) for name in names])
+
+    assert not user_has_complex_intolerances(preferences("gluten", "Dairy"))
+    assert not user_has_complex_intolerances(preferences("Seafood", "tree nut"))
+    assert user_has_complex_intolerances(preferences("egg", "nightshade"))
+
+
+def test_generated_recipes_are_tagged_from_their_ingredients(synthetic_engine):
+    with Session(synthetic_engine) as db:
+        stored = dict(db.execute(select(Recipe.id, Recipe.allergen_flags)).tuples().all())
+        assert None not in stored.values()
+        assert any(stored.values())
+        assert recipe_allergen_flags(db, list(stored)) == stored
+
+
+def test_suggestions_exclude_recipes_with_the_intolerances(synthetic_engine):
+    with Session(synthetic_engine) as db, db.no_autoflush:
+        intolerances = {i.name: i for i in db.scalars(select(Intolerance))}
+        preferences = UserPreferences(intolerances=[intolerances["egg"], intolerances["tree nut"], intolerances["gluten"]])
+        args = (set(), preferences, MEAL_TYPE_SUGGESTION_CONFIG["lunch"]["db_dish_types"], None, None)
+
+        with_flags = db.scalars(_build_recipe_suggestions_query(*args)).all()
+        with_joins = db.scalars(_build_recipe_suggestions_query_with_joins(*args)).all()
+        assert with_flags and [r.id for r in with_flags] == [r.id for r in with_joins]
+
+        unsafe = set(db.scalars(
+            select(RecipesIngredient.recipe_id)
+            .join(IngredientAllergen, IngredientAllergen.ingredient_id == RecipesIngredient.ingredient_id)
+            .where(IngredientAllergen.intolerance_id.in_([intolerances["egg"].id, intolerances["tree nut"].id]))
+        ))
+        assert unsafe and not unsafe & {r.id for r in with_flags}
+        assert all(r.gluten_free for r in with_flags)
+        db.expunge_all()
+
+        preferences = UserPreferences(intolerances=[Intolerance(name="nightshade")])
+        assert db.scalars(_build_recipe_suggestions_query(set(), preferences, ["lunch"], None, None)).all() == []
+
+
+def test_curated_rows_survive_and_retag_updates_recipes(synthetic_engine):
+    egg_bit = recipe_flags.ALLERGEN_BITS["egg"]
+    with Session(synthetic_engine) as db:
+        egg = db.scalar(select(Intolerance).where(Intolerance.name == "egg"))
+        egg_ingredients = select(IngredientAllergen.ingredient_id).where(IngredientAllergen.intolerance_id == egg.id)
+        recipe_ids = db.scalars(select(RecipesIngredient.recipe_id).where(RecipesIngredient.ingredient_id.in_(egg_ingredients))).all()
+        db.execute(delete(IngredientAllergen).where(IngredientAllergen.intolerance_id == egg.id))
+
+        assert tag_ingredients(db) == 0
+        assert tag_recipes(db) == 0
+        assert all(flags & egg_bit for flags in db.scalars(select(Recipe.allergen_flags).where(Recipe.id.in_(recipe_ids))))
+
+        tag_recipes(db, retag=True)
+        assert not any(flags & egg_bit for flags in db.scalars(select(Recipe.allergen_flags).where(Recipe.id.in_(recipe_ids))))
+        db.rollback()
+
+
+def test_imported_recipe_is_tagged(synthetic_engine, monkeypatch):
+    monkeypatch.setattr(get_settings(), "translate_enabled", False)
+    recipe_data = {
+        "id": 77_000_001,
+        "title": "Prawn satay",
+        "dishTypes": ["main course"],
+        "extendedIngredients": [
+            {"id": 77_000_101, "name": "tiger prawns", "amount": 200, "unit": "g"},
+            {"id": 77_000_102, "name": "crunchy peanut butter", "amount": 2, "unit": "tbsp"},
+            {"id": 77_000_103, "name": "lime", "amount": 1, "unit": ""},
+        ],
+    }
+    with Session(synthetic_engine) as db:
+        recipe, created = get_or_create_spoonacular_recipe(db, recipe_data)
+        db.flush()
+
+        assert created
+        assert recipe.allergen_flags == recipe_flags.allergen_flags(["shellfish", "seafood", "peanut"])
+        assert db.scalar(select(Ingredient.allergens_tagged).where(Ingredient.spoonacular_id == 77_000_103))
+        db.rollback()
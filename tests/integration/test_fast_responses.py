@@ -0,0 +1,129 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.api.main import app
+from app.core.auth import create_access_token
+from app.crud.meal_plan import get_meal_plan_for_response
+from app.crud.recipe import get_recipe_details
+from app.db.db_connection import Base, get_db
+from app.models import (
+    CuisineRegion, DietType, DishType, Ingredient, MealItem, MealPlan, Nutrient, Recipe, RecipesIngredient,
+    RecipesNutrient, User, UserPreferences,
+)
+from app.schemas.meal_plan import MealPlanResponse
+from app.schemas.recipe import RecipeDetailResponse, RecipeIngredientDetail
+from app.services.meal_plan import meal_plan_to_response
+from app.services.recipe import invalidate_recipe_detail_payload, serialize_recipe_detail
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fast.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+
+    with factory() as session:
+        ingredient = Ingredient(spoonacular_id=1, name_en="tomato", name_es="tomate", aisle="Produce", image_filename="tomato.jpg")
+        calories = Nutrient(name="Calories", is_primary=True)
+        fat = Nutrient(name="Fat", is_primary=False)
+        recipe = Recipe(
+            spoonacular_id=5, title="Pasta", title_es="Pasta al pomodoro", summary="Quick", summary_es="Rápida",
+            ready_min=10, servings=2, calories=512, vegan=True,
+            analyzed_instructions=[{"name": "", "steps": [{"number": 1, "step": "Boil"}]}],
+            analyzed_instructions_es=[{"name": "", "steps": [{"number": 1, "step": "Hervir"}]}],
+            dish_types=[DishType(name="main course")], diet_types=[DietType(name="vegan")], cuisines=[CuisineRegion(name="Italian")],
+        )
+        own_recipe = Recipe(title="Leftovers", servings=1)
+        session.add_all([ingredient, calories, fat, recipe, own_recipe])
+        session.flush()
+        session.add_all([
+            RecipesIngredient(
+                recipe_id=recipe.id, ingredient_id=ingredient.id, amount=2, unit="cups", original_ingredient_name="2 tomatoes",
+                measures_json={"metric": {"amount": 1.5, "unitShort": "g", "unitLong": "grams"}},
+            ),
+            RecipesNutrient(recipe_id=recipe.id, nutrient_id=calories.id, amount=512, unit="kcal"),
+            RecipesNutrient(recipe_id=recipe.id, nutrient_id=fat.id, amount=1.5, unit="g"),
+        ])
+
+        user = User(email="fast@example.com", username="fast_user", is_verified=True)
+        session.add(user)
+        session.flush()
+        session.add(UserPreferences(user_id=user.id, calories_goal=2000))
+        meal_plan = MealPlan(user_id=user.id)
+        meal_plan.meal_items = [
+            MealItem(day=0, slot=0, meal_type="breakfast", recipe_id=recipe.id),
+            MealItem(day=2, slot=1, meal_type="lunch", recipe_id=own_recipe.id),
+        ]
+        session.add(meal_plan)
+        session.commit()
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("lang", ["en", "es"])
+def test_meal_plan_payload_matches_the_schema(session_factory, lang):
+    with session_factory() as db:
+        meal_plan = get_meal_plan_for_response(db, db.query(MealPlan).one().id)
+        payload = meal_plan_to_response(meal_plan, lang)
+
+    assert MealPlanResponse.model_validate(payload).model_dump(mode="json") == payload
+
+
+def test_recipe_detail_payload_matches_the_schema(session_factory):
+    with session_factory() as db:
+        for recipe_id in db.scalars(select(Recipe.id)).all():
+            recipe = get_recipe_details(db, recipe_id)
+            payload = serialize_recipe_detail(recipe, "en")
+            expected = RecipeDetailResponse.model_validate(recipe).model_dump(mode="json")
+
+            assert {k: v for k, v in payload.items() if k != "ingredients"} == {k: v for k, v in expected.items() if k != "ingredients"}
+            assert len(payload["ingredients"]) == len(recipe.recipes_ingredients)
+            for ingredient in payload["ingredients"]:
+                assert RecipeIngredientDetail.model_validate(ingredient).model_dump(mode="json") == ingredient
+
+
+def test_endpoints_return_the_translated_payload(client, session_factory):
+    with session_factory() as db:
+        user_id = db.query(User).one().id
+        recipe_id = db.query(Recipe).filter_by(spoonacular_id=5).one().id
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}", "Accept-Language": "es"}
+
+    response = client.get(f"/recipes/{recipe_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert body["title"] == "Pasta al pomodoro"
+    assert body["ingredients"][0]["ingredient"]["name"] == "tomate"
+    assert body["analyzed_instructions"][0]["steps"][0]["step"] == "Hervir"
+
+    response = client.get("/meal_plans/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["days"][0]["meals"][0]["recipe"]["title"] == "Pasta al pomodoro"
+
+
+def test_recipe_detail_is_served_from_the_payload_cache(client, session_factory):
+    with session_factory() as db:
+        user_id = db.query(User).one().id
+        recipe = db.query(Recipe).filter_by(spoonacular_id=5).one()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+
+    assert client.get(f"/recipes/{recipe.id}", headers=headers).json()["title"] == "Pasta"
+    with session_factory() as db:
+        db.query(Recipe).filter_by(id=recipe.id).update({"title": "Pasta al forno"})
+        db.commit()
+    assert client.get(f"/recipes/{recipe.id}", headers=headers).json()["title"] == "Pasta"
+
+    invalidate_recipe_detail_payload(recipe.id)
+    response = client.get(f"/recipes/{recipe.id}", headers={**headers, "Accept-Encoding": "br"})
+    assert response.json()["title"] == "Pasta al forno"
+    assert response.headers["vary"] == "Accept-Encoding"
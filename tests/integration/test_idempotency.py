@@ -0,0 +1,85 @@
+import asyncio
+from unittest.mock import patch
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.api.main import app
+from app.core.auth import create_access_token
+from app.core.meal_plan_config import PlanGenerationStatus
+from app.crud.meal_plan import save_meal_plan_to_db
+from app.db.db_connection import Base, get_db
+from app.models import DishType, MealPlan, Recipe, User, UserPreferences
+from app.services.meal_plan import generate_meal_plan_once
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as session:
+        session.add(Recipe(spoonacular_id=1, title="Oats", title_es="Avena", calories=400, dish_types=[DishType(name="breakfast")]))
+        user = User(email="cook@example.com", username="cook", is_verified=True)
+        session.add(user)
+        session.flush()
+        session.add(UserPreferences(user_id=user.id, calories_goal=2000))
+        session.commit()
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def _user_id(session_factory) -> int:
+    with session_factory() as session:
+        return session.query(User).filter_by(username="cook").one().id
+
+
+async def slow_generation(db, user_id, budget_seconds=None):
+    await asyncio.sleep(0.05)
+    recipe = db.query(Recipe).one()
+    return save_meal_plan_to_db(db, user_id, {0: {0: recipe}}), PlanGenerationStatus.FULL_SUCCESS
+
+
+def test_concurrent_generations_for_a_user_share_one_run(session_factory):
+    user_id = _user_id(session_factory)
+
+    async def generate_twice():
+        with session_factory() as first, session_factory() as second:
+            return await asyncio.gather(generate_meal_plan_once(first, user_id), generate_meal_plan_once(second, user_id))
+
+    with patch("app.services.meal_plan.generate_meal_plan_for_user", side_effect=slow_generation) as generate:
+        first, second = asyncio.run(generate_twice())
+
+    assert generate.call_count == 1
+    assert first == second
+    with session_factory() as session:
+        assert session.query(MealPlan).count() == 1
+
+
+def test_idempotency_key_replays_the_first_response(client, session_factory):
+    headers = {
+        "Authorization": f"Bearer {create_access_token(data={'sub': str(_user_id(session_factory))})}",
+        "Idempotency-Key": "0f6b1c5e-retry",
+    }
+
+    with patch("app.services.meal_plan.generate_meal_plan_for_user", side_effect=slow_generation) as generate:
+        first = client.post("/meal_plans/generate", headers=headers)
+        retry = client.post("/meal_plans/generate", headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert generate.call_count == 1
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    with session_factory() as session:
+        assert session.query(MealPlan).count() == 1
+
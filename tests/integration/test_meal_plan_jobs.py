@@ -0,0 +1,191 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app.api.main import app
+from app.core.auth import create_access_token
+from app.core.errors import ErrorCode
+from app.core.meal_plan_config import PlanGenerationStatus
+from app.crud.meal_plan import save_meal_plan_to_db
+from app.crud.meal_plan_job import claim_next_meal_plan_job, complete_meal_plan_job, create_meal_plan_job, fail_abandoned_meal_plan_jobs
+from app.db.db_connection import Base, get_db
+from app.models import DishType, MealPlan, MealPlanJob, MealPlanJobStatus, Recipe, User, UserPreferences
+from app.services.meal_plan_jobs import MealPlanJobWorker, enqueue_meal_plan_job
+
+ASYNC = {"Prefer": "respond-async"}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as session:
+        session.add(Recipe(spoonacular_id=1, title="Oats", title_es="Avena", calories=400, dish_types=[DishType(name="breakfast")]))
+        for name in ("cook", "guest"):
+            user = User(email=f"{name}@example.com", username=name, is_verified=True)
+            session.add(user)
+            session.flush()
+            session.add(UserPreferences(user_id=user.id, calories_goal=2000))
+        session.commit()
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def _headers(session_factory, username: str) -> dict:
+    with session_factory() as session:
+        user = session.query(User).filter_by(username=username).one()
+        return {"Authorization": f"Bearer {create_access_token(data={'sub': str(user.id)})}"}
+
+
+async def fake_generation(db, user_id, budget_seconds=None):
+    recipe = db.query(Recipe).one()
+    meal_plan = save_meal_plan_to_db(db, user_id, {0: {0: recipe}})
+    return meal_plan, PlanGenerationStatus.PARTIAL_SUCCESS
+
+
+def test_job_is_queued_once_and_delivers_the_plan(client, session_factory):
+    headers = _headers(session_factory, "cook")
+    worker = MealPlanJobWorker(session_factory)
+
+    response = client.post("/meal_plans/generate", headers={**headers, **ASYNC})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "pending"
+    assert response.headers["location"] == f"/meal_plans/jobs/{job['job_id']}"
+    assert client.post("/meal_plans/generate", headers={**headers, **ASYNC}).json()["job_id"] == job["job_id"]
+    assert client.get(f"/meal_plans/jobs/{job['job_id']}", headers=headers).json()["status"] == "pending"
+
+    with patch("app.services.meal_plan.generate_meal_plan_for_user", side_effect=fake_generation):
+        assert asyncio.run(worker.run_once())
+    assert not asyncio.run(worker.run_once())
+
+    status = client.get(f"/meal_plans/jobs/{job['job_id']}", headers={**headers, "Accept-Language": "es"}, params={"wait": 5}).json()
+    assert status["status"] == "succeeded" and status["error"] is None
+    assert status["result"]["status"] == "PARTIAL_SUCCESS"
+    assert status["result"]["meal_plan"] == client.get("/meal_plans/me", headers={**headers, "Accept-Language": "es"}).json()
+
+    events = client.get(f"/meal_plans/jobs/{job['job_id']}/events", headers=headers)
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert events.text.startswith("event: succeeded\ndata: {")
+
+    assert client.get(f"/meal_plans/jobs/{job['job_id']}", headers=_headers(session_factory, "guest")).status_code == 404
+
+
+def test_generation_errors_fail_the_job(client, session_factory):
+    headers = _headers(session_factory, "cook")
+    job_id = client.post("/meal_plans/generate", headers={**headers, **ASYNC}).json()["job_id"]
+    error = HTTPException(status_code=400, detail={"code": ErrorCode.PREFERENCES_TOO_STRICT, "message": "Too strict"})
+
+    with patch("app.services.meal_plan.generate_meal_plan_for_user", side_effect=error):
+        asyncio.run(MealPlanJobWorker(session_factory).run_once())
+
+    status = client.get(f"/meal_plans/jobs/{job_id}", headers=headers).json()
+    assert status == {"job_id": job_id, "status": "failed", "result": None, "error": {"code": "PREFERENCES_TOO_STRICT", "message": "Too strict"}}
+    assert client.post("/meal_plans/generate", headers={**headers, **ASYNC}).json()["job_id"] != job_id
+
+
+def test_plain_generate_joins_the_active_job(client, session_factory):
+    headers = _headers(session_factory, "cook")
+    job_id = client.post("/meal_plans/generate", headers={**headers, **ASYNC}).json()["job_id"]
+    worker = threading.Timer(0.2, lambda: asyncio.run(MealPlanJobWorker(session_factory).run_once()))
+
+    with patch("app.services.meal_plan.generate_meal_plan_for_user", side_effect=fake_generation) as generate:
+        worker.start()
+        response = client.post("/meal_plans/generate", headers=headers)
+        worker.join()
+
+    assert response.status_code == 200
+    assert generate.call_count == 1
+    assert response.json() == client.get(f"/meal_plans/jobs/{job_id}", headers=headers).json()["result"]
+    with session_factory() as db:
+        assert db.query(MealPlan).count() == 1
+
+
+def test_expired_leases_are_claimed_again_until_the_attempts_run_out(session_factory):
+    with session_factory() as db:
+        user_id = db.query(User).filter_by(username="cook").one().id
+        job_id = create_meal_plan_job(db, user_id).id
+
+        assert claim_next_meal_plan_job(db, lease_seconds=60, max_attempts=2).id == job_id
+        assert claim_next_meal_plan_job(db, lease_seconds=60, max_attempts=2) is None
+
+        expire = update(MealPlanJob).values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+        db.execute(expire)
+        db.commit()
+        assert claim_next_meal_plan_job(db, lease_seconds=60, max_attempts=2).attempts == 2
+
+        db.execute(expire)
+        db.commit()
+        assert claim_next_meal_plan_job(db, lease_seconds=60, max_attempts=2) is None
+        assert fail_abandoned_meal_plan_jobs(db, max_attempts=2) == 1
+        assert db.get(MealPlanJob, job_id).status == MealPlanJobStatus.failed
+
+
+def test_one_active_job_per_user_is_enforced_by_the_database(session_factory):
+    with session_factory() as db:
+        user_id = db.query(User).filter_by(username="cook").one().id
+        job_id = create_meal_plan_job(db, user_id).id
+        # What a concurrent request that also found no active job would do
+        with pytest.raises(IntegrityError):
+            create_meal_plan_job(db, user_id)
+
+        claim_next_meal_plan_job(db, lease_seconds=60, max_attempts=2)
+        complete_meal_plan_job(db, job_id, None, "FULL_SUCCESS")
+        assert create_meal_plan_job(db, user_id) is not None
+
+
+def test_enqueue_attaches_to_a_concurrent_job_and_reraises_other_conflicts(session_factory):
+    with session_factory() as db:
+        user_id = db.query(User).filter_by(username="cook").one().id
+
+        def queued_concurrently(db, user_id):
+            with session_factory() as other:
+                create_meal_plan_job(other, user_id)
+            return create_meal_plan_job(db, user_id)
+
+        with patch("app.services.meal_plan_jobs.create_meal_plan_job", side_effect=queued_concurrently):
+            job = enqueue_meal_plan_job(db, user_id)
+        assert job.status == MealPlanJobStatus.pending
+
+        foreign_key_error = IntegrityError("INSERT INTO meal_plan_jobs", {}, Exception("FOREIGN KEY constraint failed"))
+        guest_id = db.query(User).filter_by(username="guest").one().id
+        with patch("app.services.meal_plan_jobs.create_meal_plan_job", side_effect=foreign_key_error) as create:
+            with pytest.raises(IntegrityError):
+                enqueue_meal_plan_job(db, guest_id)
+        assert create.call_count == 1
+
+
+def test_running_jobs_keep_their_lease(session_factory):
+    with session_factory() as db:
+        user_id = db.query(User).filter_by(username="cook").one().id
+        job_id = create_meal_plan_job(db, user_id).id
+        claim_next_meal_plan_job(db, lease_seconds=60, max_attempts=2)
+        db.execute(update(MealPlanJob).values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+
+    async def run_longer_than_the_lease():
+        finished = asyncio.Event()
+        heartbeat = asyncio.create_task(MealPlanJobWorker(session_factory)._renew_lease(session_factory, job_id, 0.3, finished))
+        await asyncio.sleep(0.35)
+        finished.set()
+        await heartbeat
+
+    asyncio.run(asyncio.wait_for(run_longer_than_the_lease(), 5))
+    with session_factory() as db:
+        assert claim_next_meal_plan_job(db, lease_seconds=60, max_attempts=2) is None
@@ -0,0 +1,101 @@
+from unittest.mock import patch
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.api.main import app
+from app.api.routes import tasks
+from app.core.auth import create_access_token
+from app.core.meal_plan_config import PlanGenerationStatus
+from app.crud.meal_plan import save_meal_plan_to_db
+from app.db.db_connection import Base, get_db, get_sync_session
+from app.models import DishType, MealPlan, Recipe, User, UserPreferences
+from app.services.meal_plan_generator import MealPlanGenerator
+
+TASK_HEADERS = {"X-Task-Auth-Key": "task-secret"}
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'precompute.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as session:
+        recipe = Recipe(spoonacular_id=1, title="Oats", title_es="Avena", calories=400, dish_types=[DishType(name="breakfast")])
+        session.add(recipe)
+        for name in ("active", "also_active", "inactive"):
+            user = User(email=f"{name}@example.com", username=name, is_verified=True)
+            session.add(user)
+            session.flush()
+            session.add(UserPreferences(user_id=user.id, calories_goal=2000))
+            if name != "inactive":
+                save_meal_plan_to_db(session, user.id, {0: {0: recipe}})
+        session.commit()
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_sync_session] = override_get_db
+    monkeypatch.setattr(tasks.settings, "task_secret_key", "task-secret")
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+async def fake_generate(self):
+    recipe = self.db.query(Recipe).one()
+    return {day: {0: recipe, 1: recipe, 2: recipe} for day in range(5)}, PlanGenerationStatus.FULL_SUCCESS
+
+
+def _headers(session_factory, username: str) -> dict:
+    with session_factory() as session:
+        user = session.query(User).filter_by(username=username).one()
+        return {"Authorization": f"Bearer {create_access_token(data={'sub': str(user.id)})}"}
+
+
+def test_precomputed_plan_is_swapped_in_on_generate(client, session_factory):
+    headers = _headers(session_factory, "active")
+    current_plan = client.get("/meal_plans/me", headers=headers).json()
+
+    with patch.object(MealPlanGenerator, "generate", autospec=True, side_effect=fake_generate) as generate:
+        result = client.post("/tasks/precompute-meal-plans", headers=TASK_HEADERS).json()
+        assert result == {"users": 2, "groups": 1, "precomputed": 2, "skipped": 0, "failed": 0, "stale_deleted": 0}
+        assert generate.call_count == 2
+        # Precomputed plans stay hidden, and users already holding one are not precomputed again
+        assert client.get("/meal_plans/me", headers=headers).json() == current_plan
+        assert client.post("/tasks/precompute-meal-plans", headers=TASK_HEADERS).json()["users"] == 0
+
+        response = client.post("/meal_plans/generate", headers=headers)
+
+    assert response.status_code == 200
+    assert generate.call_count == 2
+    generated = response.json()
+    assert generated["status"] == "FULL_SUCCESS"
+    assert generated["meal_plan"]["id"] != current_plan["id"]
+    assert all(meal["recipe"] for day in generated["meal_plan"]["days"][:5] for meal in day["meals"])
+    assert client.get("/meal_plans/me", headers=headers).json() == generated["meal_plan"]
+    with session_factory() as session:
+        assert session.query(MealPlan).filter(MealPlan.is_precomputed.is_(True)).count() == 1
+
+
+def test_precomputed_plan_is_not_used_after_a_preferences_change(client, session_factory):
+    headers = _headers(session_factory, "also_active")
+    with patch.object(MealPlanGenerator, "generate", autospec=True, side_effect=fake_generate) as generate:
+        client.post("/tasks/precompute-meal-plans", headers=TASK_HEADERS)
+        with session_factory() as session:
+            session.query(UserPreferences).filter(UserPreferences.user.has(username="also_active")).update(
+                {"calories_goal": 2600}, synchronize_session=False
+            )
+            session.commit()
+
+        assert client.post("/meal_plans/generate", headers=headers).status_code == 200
+
+    assert generate.call_count == 3
+
+
+def test_precompute_requires_the_task_key(client, session_factory):
+    assert client.post("/tasks/precompute-meal-plans", headers={"X-Task-Auth-Key": "wrong"}).status_code == 401
@@ -0,0 +1,159 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from app.api.main import app
+from app.core.auth import create_access_token
+from app.crud.meal_plan import get_latest_meal_plan_for_user
+from app.crud.recipe import get_recipe_suggestions_from_db
+from app.crud.user_preferences import get_user_preferences_details
+from app.db.db_connection import Base, get_db
+from app.db.query_counter import count_queries
+from app.models import DishType, Ingredient, MealItem, MealPlan, Recipe, RecipesIngredient, User, UserPreferences
+from app.services.meal_plan import meal_plan_to_response
+from app.services.recipe import serialize_recipe_short_list
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'budgets.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+
+    session = factory()
+    main_course = DishType(name="main course")
+    ingredients = [
+        Ingredient(spoonacular_id=500 + i, name_en=f"ingredient {i}", name_es=f"ingrediente {i}", aisle="Produce")
+        for i in range(6)
+    ]
+    recipes = [
+        Recipe(spoonacular_id=1000 + i, title=f"Recipe {i}", title_es=f"Receta {i}", calories=500, servings=2, dish_types=[main_course])
+        for i in range(15)
+    ]
+    session.add_all([main_course, *ingredients, *recipes])
+    session.flush()
+    for recipe in recipes:
+        session.add(RecipesIngredient(recipe_id=recipe.id, ingredient_id=ingredients[recipe.id % 2].id, amount=100, unit="g"))
+
+    user = User(email="budget@example.com", username="budget_user", is_verified=True)
+    session.add(user)
+    session.flush()
+    session.add(UserPreferences(user_id=user.id, calories_goal=2000))
+    meal_plan = MealPlan(user_id=user.id)
+    meal_plan.meal_items = [
+        MealItem(day=day, slot=slot, meal_type=meal_type, recipe_id=recipes[day * 3 + slot].id)
+        for day in range(5)
+        for slot, meal_type in enumerate(["breakfast", "lunch", "dinner"])
+    ]
+    session.add(meal_plan)
+    session.commit()
+    session.close()
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def auth_headers(session_factory):
+    with session_factory() as session:
+        user = session.query(User).filter_by(username="budget_user").one()
+        return {"Authorization": f"Bearer {create_access_token(data={'sub': str(user.id)})}"}
+
+
+def test_get_my_meal_plan_query_budget(client, auth_headers):
+    with count_queries() as queries:
+        response = client.get("/meal_plans/me", headers=auth_headers)
+
+    assert response.status_code == 200
+    # user + meal plan + meal items joined with their recipes
+    queries.assert_max(3)
+
+
+def test_shopping_list_looks_up_unknown_ingredients_in_one_query(client, auth_headers, query_counter):
+    spoonacular_response = {
+        "aisles": [{
+            "aisle": "Produce",
+            "items": [
+                {"id": i, "ingredientId": 500 + i, "name": f"ingredient {i}", "measures": {"metric": {"amount": 1, "unit": "g"}}, "cost": 1.0}
+                for i in range(2, 6)
+            ],
+        }],
+        "cost": 4.0,
+    }
+
+    with patch("app.api.routes.shopping_lists.SpoonacularService") as spoonacular_class:
+        spoonacular_class.return_value.compute_shopping_list = AsyncMock(return_value=spoonacular_response)
+        response = client.get("/shopping_lists/me", headers=auth_headers)
+
+    assert response.status_code == 200
+    query_counter.assert_no_n_plus_one()
+
+
+def test_suggestions_serialize_without_lazy_loads(session_factory):
+    with session_factory() as session:
+        user = session.query(User).filter_by(username="budget_user").one()
+        preferences = get_user_preferences_details(session, user.id)
+        with count_queries() as queries:
+            recipes = get_recipe_suggestions_from_db(session, set(), preferences, ["main course"], 10, None, None, 0, load_dish_types=True)
+            serialized = serialize_recipe_short_list(recipes, "es")
+
+    assert len(serialized) == 10
+    assert all(recipe.dish_types == ["main course"] for recipe in serialized)
+    # suggestions page + dish types of the whole page
+    queries.assert_max(2)
+
+
+def test_list_views_leave_the_heavy_recipe_columns_unloaded(session_factory):
+    heavy_columns = {"summary", "summary_es", "analyzed_instructions", "analyzed_instructions_es"}
+    with session_factory() as session:
+        user = session.query(User).filter_by(username="budget_user").one()
+        meal_plan = get_latest_meal_plan_for_user(session, user.id)
+        preferences = get_user_preferences_details(session, user.id)
+        suggestions = get_recipe_suggestions_from_db(session, set(), preferences, ["main course"], 5, None, None, 0, load_dish_types=True)
+
+        recipes = [item.recipe for item in meal_plan.meal_items] + suggestions
+        assert all(heavy_columns <= inspect(recipe).unloaded for recipe in recipes)
+        with count_queries() as queries:
+            meal_plan_to_response(meal_plan, "es")
+            serialize_recipe_short_list(suggestions, "en")
+        queries.assert_max(0)
+
+
+def test_home_replaces_the_launch_calls_within_one_budget(client, auth_headers):
+    with count_queries() as queries:
+        response = client.get("/home", headers={**auth_headers, "Accept-Language": "es"})
+
+    assert response.status_code == 200
+    home = response.json()
+    assert home["user"]["username"] == "budget_user"
+    assert home["preferences"]["calories_goal"] == 2000
+    assert home["meal_plan"] == client.get("/meal_plans/me", headers={**auth_headers, "Accept-Language": "es"}).json()
+    assert home["shopping_list"] == {"item_count": 2, "aisles": ["Produce"]}
+    # user + preferences with their diet, cuisines and intolerances + meal plan, items with recipes, ingredients
+    queries.assert_max(8)
+
+
+def test_home_without_a_meal_plan(client, session_factory):
+    with session_factory() as session:
+        user = User(email="new@example.com", username="new_user", is_verified=True)
+        session.add(user)
+        session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user.id)})}"}
+
+    response = client.get("/home", headers=headers)
+
+    assert response.status_code == 200
+    home = response.json()
+    assert home["user"]["username"] == "new_user"
+    assert home["preferences"] is None
+    assert home["meal_plan"] is None
+    assert home["shopping_list"] is None
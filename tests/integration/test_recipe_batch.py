@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.api.main import app
+from app.core.auth import create_access_token
+from app.db.db_connection import Base, get_db
+from app.db.query_counter import count_queries
+from app.models import DishType, Ingredient, Nutrient, Recipe, RecipesIngredient, RecipesNutrient, User
+
+
+@pytest.fixture
+def batch_client(client, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+
+    with factory() as session:
+        main_course = DishType(name="main course")
+        protein = Nutrient(name="Protein", is_primary=True)
+        ingredients = [Ingredient(spoonacular_id=100 + i, name_en=f"ingredient {i}", name_es=f"ingrediente {i}") for i in range(3)]
+        recipes = [
+            Recipe(
+                spoonacular_id=3000 + i, title=f"Recipe {i}", title_es=f"Receta {i}", servings=2, calories=400 + i,
+                analyzed_instructions=[{"steps": [{"number": 1, "step": "Cook"}]}], dish_types=[main_course],
+            )
+            for i in range(8)
+        ]
+        session.add_all([protein, *ingredients, *recipes])
+        session.flush()
+        for recipe in recipes:
+            session.add_all([
+                RecipesIngredient(recipe_id=recipe.id, ingredient_id=ingredient.id, amount=1, unit="cup") for ingredient in ingredients
+            ])
+            session.add(RecipesNutrient(recipe_id=recipe.id, nutrient_id=protein.id, amount=20, unit="g"))
+        user = User(email="batch@example.com", username="batch_user", is_verified=True)
+        session.add(user)
+        session.commit()
+        token = create_access_token(data={"sub": str(user.id)})
+        recipe_ids = [recipe.id for recipe in recipes]
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield client, {"Authorization": f"Bearer {token}"}, recipe_ids
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def test_batch_matches_the_single_recipe_endpoint(batch_client):
+    client, headers, recipe_ids = batch_client
+    requested = [recipe_ids[3], recipe_ids[0], 999_999, recipe_ids[3]]
+
+    response = client.get("/recipes", headers={**headers, "Accept-Language": "es"}, params={"ids": ",".join(map(str, requested))})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [recipe["id"] for recipe in body["recipes"]] == [recipe_ids[3], recipe_ids[0]]
+    assert body["missing_ids"] == [999_999]
+    single = client.get(f"/recipes/{recipe_ids[3]}", headers={**headers, "Accept-Language": "es"}).json()
+    assert body["recipes"][0] == single
+
+
+def test_batch_query_count_does_not_grow_with_the_batch(batch_client):
+    client, headers, recipe_ids = batch_client
+
+    with count_queries() as queries:
+        response = client.post("/recipes/batch", headers=headers, json={"ids": recipe_ids})
+    assert response.status_code == 200 and len(response.json()["recipes"]) == 8
+    # user + recipes + one per relationship
+    queries.assert_max(7)
+
+    with count_queries() as queries:
+        response = client.get("/recipes", headers=headers, params={"ids": ",".join(map(str, recipe_ids)), "fields": "title,calories,dish_types"})
+    assert response.json()["recipes"][0] == {"id": recipe_ids[0], "title": "Recipe 0", "calories": 400.0, "dish_types": ["main course"]}
+    queries.assert_max(3)
+
+
+@pytest.mark.parametrize("params, code", [
+    ({"ids": "1,x"}, "INVALID_RECIPE_IDS"),
+    ({"ids": ""}, "INVALID_RECIPE_IDS"),
+    ({"ids": ",".join(str(i) for i in range(51))}, "INVALID_RECIPE_IDS"),
+    ({"ids": "1", "fields": "title,secret"}, "INVALID_RECIPE_FIELDS"),
+])
+def test_invalid_batches_are_rejected(batch_client, params, code):
+    client, headers, _ = batch_client
+    response = client.get("/recipes", headers=headers, params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == code
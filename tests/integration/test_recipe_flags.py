@@ -0,0 +1,91 @@
+import importlib.util
+import itertools
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+from app.core import recipe_flags
+from app.core.meal_plan_config import MEAL_TYPE_SUGGESTION_CONFIG, MealPlanConfig
+from app.crud.recipe import _build_recipe_suggestions_query, _build_recipe_suggestions_query_with_joins
+from app.models import CuisineRegion, DietType, DishType, Intolerance, Recipe, UserPreferences
+from app.scripts.generate_synthetic_data import generate
+
+MIGRATION = Path(__file__).parents[2] / "alembic" / "versions" / "b7c41e9d2f3a_recipe_filter_flags.py"
+
+
+@pytest.fixture(scope="module")
+def synthetic_engine(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('flags') / 'flags.db'}"
+    generate(url, recipes=1500, ingredients=60, users=5, seed=3, batch_size=500, create_schema=True)
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def _flags(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(Recipe.id, Recipe.diet_flags, Recipe.dish_type_flags, Recipe.cuisine_flags).order_by(Recipe.id)
+        ).all()
+
+
+def test_flags_are_computed_on_flush(synthetic_engine):
+    with Session(synthetic_engine) as db:
+        vegan = db.scalar(select(DietType).where(DietType.name == "vegan"))
+        soup = db.scalar(select(DishType).where(DishType.name == "soup"))
+        recipe = Recipe(spoonacular_id=1, title="Stew", gluten_free=True, diet_types=[vegan], dish_types=[soup],
+                        cuisines=[CuisineRegion(name="Atlantean")])
+        db.add(recipe)
+        db.flush()
+
+        assert recipe.diet_flags == (
+            recipe_flags.DIET_BITS["vegan"] | recipe_flags.DIET_BITS["gluten free"] | recipe_flags.STRICT_GLUTEN_FREE_FLAG
+        )
+        assert recipe.dish_type_flags == recipe_flags.DISH_TYPE_BITS["soup"]
+        assert recipe.cuisine_flags == recipe_flags.OTHER_CUISINE_FLAG
+
+        recipe.dish_types = [db.scalar(select(DishType).where(DishType.name == "salad"))]
+        recipe.vegetarian = True
+        db.flush()
+
+        assert recipe.dish_type_flags == recipe_flags.DISH_TYPE_BITS["salad"]
+        assert recipe.diet_flags & recipe_flags.DIET_BITS["vegetarian"]
+        db.rollback()
+
+
+def test_flag_query_matches_the_join_query(synthetic_engine):
+    with Session(synthetic_engine) as db:
+        diet_types = {diet.id: diet for diet in db.scalars(select(DietType))}
+        intolerances = {i.name: i for i in db.scalars(select(Intolerance))}
+        cuisines = list(db.scalars(select(CuisineRegion).order_by(CuisineRegion.id).limit(3)))
+        diet_ids = [None, MealPlanConfig.BALANCE_DIET_ID, MealPlanConfig.VEGETARIAN_DIET_ID, MealPlanConfig.VEGAN_DIET_ID,
+                    MealPlanConfig.GLUTEN_FREE_DIET_ID, MealPlanConfig.DAIRY_FREE_DIET_ID, MealPlanConfig.LOW_FODMAP_DIET_ID,
+                    next(id for id, diet in diet_types.items() if diet.name == "paleo")]
+        intolerance_sets = [[], [intolerances["gluten"]], [intolerances["dairy"], intolerances["gluten"]]]
+
+        for diet_id, user_intolerances, user_cuisines, meal_type in itertools.product(
+            diet_ids, intolerance_sets, [[], cuisines], ["breakfast", "lunch", "snack"]
+        ):
+            preferences = UserPreferences(diet_type_id=diet_id, diet_type=diet_types.get(diet_id),
+                                          intolerances=user_intolerances, cuisines=user_cuisines)
+            args = ({5, 6}, preferences, MEAL_TYPE_SUGGESTION_CONFIG[meal_type]["db_dish_types"], 100, 700)
+
+            with db.no_autoflush:
+                with_flags = db.scalars(_build_recipe_suggestions_query(*args)).all()
+                with_joins = db.scalars(_build_recipe_suggestions_query_with_joins(*args)).all()
+
+            assert [r.id for r in with_flags] == [r.id for r in with_joins], (diet_id, meal_type)
+            db.expunge_all()
+
+
+def test_migration_backfill_matches_the_flags_computed_on_ingest(synthetic_engine):
+    spec = importlib.util.spec_from_file_location("recipe_filter_flags", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    expected = _flags(synthetic_engine)
+
+    with synthetic_engine.begin() as connection:
+        connection.execute(update(Recipe).values(diet_flags=0, dish_type_flags=0, cuisine_flags=0))
+        migration.backfill_flags(connection)
+
+    assert _flags(synthetic_engine) == expected
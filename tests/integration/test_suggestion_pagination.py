@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session, sessionmaker
+from app.api.main import app
+from app.core.auth import create_access_token
+from app.core.meal_plan_config import MEAL_TYPE_SUGGESTION_CONFIG
+from app.crud.recipe import _build_recipe_suggestions_query, get_recipe_suggestions_page
+from app.db.db_connection import Base, get_db
+from app.models import DishType, Recipe, User, UserPreferences
+from app.scripts.generate_synthetic_data import generate
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+@pytest.fixture(scope="module")
+def synthetic_engine(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('pagination') / 'pagination.db'}"
+    generate(url, recipes=600, ingredients=40, users=3, seed=11, batch_size=500, create_schema=True)
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        # NULL scores and ties, which the keyset has to order like the database does
+        connection.execute(update(Recipe).where(Recipe.id % 7 == 0).values(health_score=None))
+        connection.execute(update(Recipe).where(Recipe.id % 11 == 0).values(spoonacular_score=None))
+        connection.execute(update(Recipe).where(Recipe.id % 5 == 0).values(health_score=50.0, spoonacular_score=50.0))
+    yield engine
+    engine.dispose()
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"seed": 12345, "after": 987})
+    assert decode_cursor(cursor) == {"seed": 12345, "after": 987}
+    for malformed in ["not a cursor!", encode_cursor({"after": -1}), "W10", "eyJhZnRlciI6ICJ4In0"]:
+        with pytest.raises(ValueError):
+            decode_cursor(malformed)
+
+
+def test_keyset_pages_cover_the_ranking_once(synthetic_engine):
+    dish_types = MEAL_TYPE_SUGGESTION_CONFIG["lunch"]["db_dish_types"]
+    with Session(synthetic_engine) as db, db.no_autoflush:
+        preferences = UserPreferences(intolerances=[], cuisines=[])
+        ranked = [recipe.id for recipe in db.scalars(_build_recipe_suggestions_query(set(), preferences, dish_types, None, None))]
+
+        pages, after = [], None
+        while True:
+            page, after = get_recipe_suggestions_page(db, set(), preferences, dish_types, 7, after, seed=42)
+            pages.append([recipe.id for recipe in page])
+            if after is None:
+                break
+
+        walked = [recipe_id for page in pages for recipe_id in page]
+        assert sorted(walked) == sorted(ranked) and len(walked) == len(set(walked))
+        assert [sorted(page) for page in pages] == [sorted(ranked[i:i + 7]) for i in range(0, len(ranked), 7)]
+
+        again, _ = get_recipe_suggestions_page(db, set(), preferences, dish_types, 7, None, seed=42)
+        assert [recipe.id for recipe in again] == pages[0]
+
+
+@pytest.fixture
+def client_headers(client, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'endpoint.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as session:
+        main_course = DishType(name="main course")
+        session.add_all([
+            Recipe(spoonacular_id=2000 + i, title=f"Recipe {i}", health_score=i % 4, calories=500, dish_types=[main_course])
+            for i in range(10)
+        ])
+        user = User(email="pages@example.com", username="pages_user", is_verified=True)
+        session.add(user)
+        session.flush()
+        session.add(UserPreferences(user_id=user.id, calories_goal=2000))
+        session.commit()
+        token = create_access_token(data={"sub": str(user.id)})
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield client, {"Authorization": f"Bearer {token}"}
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def test_suggestions_endpoint_follows_the_next_cursor(client_headers):
+    client, headers = client_headers
+    params = {"day_index": 0, "slot": 0, "meal_type": "lunch", "limit": 4}
+
+    titles, cursor = [], None
+    for _ in range(5):
+        response = client.get("/meal_plans/suggestions", headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        titles.extend(recipe["title"] for recipe in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert sorted(titles) == sorted(f"Recipe {i}" for i in range(10))
+
+    response = client.get("/meal_plans/suggestions", headers=headers, params={**params, "cursor": "garbage!"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == "INVALID_CURSOR"
+
+
+def test_cursor_after_a_deleted_recipe_is_rejected(client_headers):
+    client, headers = client_headers
+    params = {"day_index": 0, "slot": 0, "meal_type": "lunch", "limit": 4}
+    deleted_anchor = encode_cursor({"seed": 1, "after": 999_999})
+
+    response = client.get("/meal_plans/suggestions", headers=headers, params={**params, "cursor": deleted_anchor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == "INVALID_CURSOR"
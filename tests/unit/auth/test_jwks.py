@@ -0,0 +1,150 @@
+import base64
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives import serialization
+from fastapi import HTTPException
+from jose import jwt
+from app.core.auth import APPLE_AUDIENCE, APPLE_ISSUER, verify_apple_token, verify_google_token
+from app.core.errors import ErrorCode
+from app.core.jwks import JWKSCache, parse_max_age
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class LocalJWKS:
+    """ Local stand-in for a provider's JWKS endpoint that counts the fetches """
+    def __init__(self, kids: list[str], cache_control: str = "public, max-age=3600"):
+        self.cache_control = cache_control
+        self.fetches = 0
+        self.private_keys = {}
+        self.public_jwks = []
+        for kid in kids:
+            self.add_key(kid)
+
+    def add_key(self, kid: str):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        numbers = private_key.public_key().public_numbers()
+        self.private_keys[kid] = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        self.public_jwks.append({
+            "kty": "RSA", "kid": kid, "use": "sig", "alg": "RS256",
+            "n": _b64url_uint(numbers.n), "e": _b64url_uint(numbers.e),
+        })
+
+    def sign(self, kid: str, claims: dict) -> str:
+        return jwt.encode(claims, self.private_keys[kid], algorithm="RS256", headers={"kid": kid})
+
+    def transport(self) -> httpx.MockTransport:
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.fetches += 1
+            return httpx.Response(200, json={"keys": self.public_jwks}, headers={"Cache-Control": self.cache_control})
+        return httpx.MockTransport(handler)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        pytest.param("public, max-age=21600, must-revalidate", 21600, id="max_age"),
+        pytest.param("no-cache, max-age=100", None, id="no_cache"),
+        pytest.param(None, None, id="missing"),
+    ]
+)
+def test_parse_max_age(header, expected):
+    assert parse_max_age(header) == expected
+
+
+@pytest.mark.asyncio
+class TestJWKSCache:
+
+    async def test_keys_are_cached_for_max_age(self):
+        provider = LocalJWKS(["k1"], cache_control="public, max-age=600")
+        cache = JWKSCache("https://keys.test/jwks", transport=provider.transport())
+
+        await cache.get_key("k1")
+        await cache.get_key("k1")
+
+        assert provider.fetches == 1
+        assert cache._expires_at - cache._fetched_at == pytest.approx(600)
+
+    async def test_unknown_kid_triggers_refetch(self):
+        provider = LocalJWKS(["k1"])
+        cache = JWKSCache("https://keys.test/jwks", min_refetch_interval=0, transport=provider.transport())
+        await cache.get_key("k1")
+
+        provider.add_key("k2")
+        key = await cache.get_key("k2")
+
+        assert key["kid"] == "k2"
+        assert provider.fetches == 2
+
+    async def test_unknown_kid_refetch_is_throttled(self):
+        provider = LocalJWKS(["k1"])
+        cache = JWKSCache("https://keys.test/jwks", min_refetch_interval=60, transport=provider.transport())
+        await cache.get_key("k1")
+
+        with pytest.raises(ValueError):
+            await cache.get_key("unknown")
+
+        assert provider.fetches == 1
+
+    async def test_expired_keys_are_kept_when_provider_fails(self):
+        provider = LocalJWKS(["k1"])
+        cache = JWKSCache("https://keys.test/jwks", transport=provider.transport())
+        await cache.get_key("k1")
+
+        cache.transport = httpx.MockTransport(lambda request: httpx.Response(503))
+        cache._expires_at = time.monotonic() - 1
+
+        key = await cache.get_key("k1")
+        assert key["kid"] == "k1"
+
+
+@pytest.mark.asyncio
+class TestSocialTokenVerification:
+
+    async def test_verify_apple_token_with_local_jwks(self):
+        provider = LocalJWKS(["apple-key"])
+        token = provider.sign("apple-key", {
+            "iss": APPLE_ISSUER, "aud": APPLE_AUDIENCE, "sub": "apple-sub",
+            "email": "user@example.com", "exp": int(time.time()) + 300,
+        })
+
+        with patch("app.core.auth.apple_jwks", JWKSCache("https://keys.test/apple", transport=provider.transport())):
+            result = await verify_apple_token(f"Bearer {token}")
+            await verify_apple_token(f"Bearer {token}")
+
+        assert result == {"sub": "apple-sub", "email": "user@example.com"}
+        assert provider.fetches == 1
+
+    async def test_verify_google_token_rejects_wrong_issuer(self):
+        provider = LocalJWKS(["google-key"])
+        token = provider.sign("google-key", {
+            "iss": "https://evil.example.com", "aud": "client", "sub": "google-sub",
+            "email": "user@example.com", "exp": int(time.time()) + 300,
+        })
+
+        with patch("app.core.auth.google_jwks", JWKSCache("https://keys.test/google", transport=provider.transport())):
+            with pytest.raises(HTTPException) as exc_info:
+                await verify_google_token(f"Bearer {token}")
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail["code"] == ErrorCode.INVALID_GOOGLE_TOKEN
+
+    async def test_verify_google_token_success(self):
+        provider = LocalJWKS(["google-key"])
+        token = provider.sign("google-key", {
+            "iss": "https://accounts.google.com", "aud": "client", "sub": "google-sub",
+            "email": "user@example.com", "exp": int(time.time()) + 300, "at_hash": "abc",
+        })
+
+        with patch("app.core.auth.google_jwks", JWKSCache("https://keys.test/google", transport=provider.transport())):
+            result = await verify_google_token(f"Bearer {token}")
+
+        assert result == {"sub": "google-sub", "email": "user@example.com"}
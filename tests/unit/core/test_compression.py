@@ -0,0 +1,99 @@
+import gzip
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.compression import CompressedPayload, CompressionMiddleware, negotiate_encoding
+
+DECODERS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda body: zstandard.ZstdDecompressor().decompress(body, max_output_size=1 << 24),
+}
+LARGE = {"steps": [{"number": i, "step": "Stir the sauce until it thickens"} for i in range(200)]}
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip, deflate", "gzip"),
+    ("gzip, br", "br"),
+    ("gzip, br, zstd", "zstd"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("zstd;q=0, br", "br"),
+    ("*", "zstd"),
+    ("*;q=0, gzip", "gzip"),
+    ("gzip;q=bogus", None),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.fixture
+def raw_client():
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=500, thread_threshold=4000)
+
+    @app.get("/large")
+    def large():
+        return LARGE
+
+    @app.get("/small")
+    def small():
+        return {"status": "ok"}
+
+    @app.get("/text")
+    def text():
+        return PlainTextResponse("x" * 2000, media_type="image/svg+xml")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([b"data: 1\n\n" * 100, b"data: 2\n\n" * 100]), media_type="text/event-stream")
+
+    @app.get("/cached")
+    def cached():
+        return CompressedPayload(ORJSONResponse(LARGE).body).response("gzip", 500)
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_large_json_is_compressed(raw_client, encoding):
+    with raw_client.stream("GET", "/large", headers={"Accept-Encoding": encoding}) as response:
+        body = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert DECODERS[encoding](body) == ORJSONResponse(LARGE).body
+
+
+@pytest.mark.parametrize("path, headers", [
+    ("/small", {"Accept-Encoding": "gzip"}),
+    ("/large", {"Accept-Encoding": "identity"}),
+    ("/text", {"Accept-Encoding": "gzip"}),
+    ("/events", {"Accept-Encoding": "gzip"}),
+])
+def test_responses_left_alone(raw_client, path, headers):
+    response = raw_client.get(path, headers=headers)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_precompressed_payload_is_not_compressed_twice(raw_client):
+    with raw_client.stream("GET", "/cached", headers={"Accept-Encoding": "zstd"}) as response:
+        body = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == ORJSONResponse(LARGE).body
+
+
+def test_compressed_payload_reuses_its_variants():
+    payload = CompressedPayload(ORJSONResponse(LARGE).body)
+    first = payload.response("br", 500)
+    assert payload.response("br", 500).body is first.body
+    assert payload.response(None, 500).body == payload.body
+    assert "content-encoding" not in CompressedPayload(b"{}").response("br", 500).headers
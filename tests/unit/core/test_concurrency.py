@@ -0,0 +1,53 @@
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from app.core.concurrency import event_loop_lag, monitor_event_loop_lag, run_blocking
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.mark.asyncio
+class TestRunBlocking:
+
+    async def test_runs_in_worker_thread_with_caller_context(self):
+        request_id.set("req-1")
+
+        def blocking_call(value):
+            return value * 2, request_id.get(), threading.current_thread().name
+
+        result, seen_request_id, thread_name = await run_blocking(blocking_call, 21)
+
+        assert result == 42
+        assert seen_request_id == "req-1"
+        assert thread_name.startswith("blocking-io")
+
+    async def test_does_not_block_the_event_loop(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        await run_blocking(time.sleep, 0.2)
+        ticker_task.cancel()
+
+        assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_monitor_reports_blocked_event_loop():
+    slow_ticks_before = event_loop_lag.slow_ticks
+    monitor = asyncio.create_task(monitor_event_loop_lag(interval=0.01, warning_ms=50))
+    await asyncio.sleep(0.02)
+
+    time.sleep(0.1)  # Blocks the loop on purpose
+    await asyncio.sleep(0.03)
+    monitor.cancel()
+
+    assert event_loop_lag.slow_ticks > slow_ticks_before
+    assert event_loop_lag.max_lag_ms >= 50
@@ -0,0 +1,104 @@
+import json
+import logging
+import queue
+from unittest.mock import patch
+from logging.handlers import QueueListener
+from app.core.logging_config import (
+    DeferredFormattingQueueHandler,
+    JsonFormatter,
+    RequestIdFilter,
+    SamplingFilter,
+    parse_logger_mapping,
+    request_id_var,
+)
+
+
+def _record(name: str = "app.test", level: int = logging.INFO, msg: str = "hello %s", args: tuple = ("world",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_json_formatter_includes_request_id():
+    record = _record()
+    token = request_id_var.set("req-123")
+    RequestIdFilter().filter(record)
+    request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["severity"] == "INFO"
+    assert entry["request_id"] == "req-123"
+
+
+def test_sampling_filter_only_drops_low_severity_records_of_configured_loggers():
+    sampling = SamplingFilter({"app.api.routes": 0.0})
+
+    assert not sampling.filter(_record("app.api.routes.shopping_lists", logging.DEBUG))
+    assert sampling.filter(_record("app.api.routes.shopping_lists", logging.WARNING))
+    assert sampling.filter(_record("app.services", logging.DEBUG))
+
+
+def test_sampling_filter_keeps_a_fraction():
+    sampling = SamplingFilter({"app": 0.5})
+
+    with patch("app.core.logging_config.random.random", side_effect=[0.2, 0.7]):
+        assert sampling.filter(_record())
+        assert not sampling.filter(_record())
+
+
+def test_parse_logger_mapping():
+    assert parse_logger_mapping("app.services=DEBUG, sqlalchemy.engine = WARNING,invalid") == {
+        "app.services": "DEBUG",
+        "sqlalchemy.engine": "WARNING",
+    }
+    assert parse_logger_mapping(None) == {}
+
+
+def test_queue_handler_formats_on_listener_thread():
+    formatted = []
+
+    class CollectingHandler(logging.Handler):
+        def emit(self, record):
+            formatted.append(self.format(record))
+
+    queue_handler = DeferredFormattingQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIdFilter())
+    collector = CollectingHandler()
+    collector.setFormatter(JsonFormatter())
+    listener = QueueListener(queue_handler.queue, collector)
+    listener.start()
+
+    logger = logging.getLogger("tests.logging.queued")
+    logger.handlers, logger.propagate = [queue_handler], False
+    logger.setLevel(logging.INFO)
+    token = request_id_var.set("req-queued")
+    logger.info("item %s", 1)
+    logger.debug("dropped by level")
+    request_id_var.reset(token)
+    listener.stop()
+
+    assert len(formatted) == 1
+    assert json.loads(formatted[0])["request_id"] == "req-queued"
+
+
+def test_queue_handler_renders_message_and_traceback_before_queueing():
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredFormattingQueueHandler(log_queue)
+
+    logger = logging.getLogger("tests.logging.snapshot")
+    logger.handlers, logger.propagate = [queue_handler], False
+    logger.setLevel(logging.INFO)
+    payload = {"status": "pending"}
+    logger.info("payload %s", payload)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    payload["status"] = "changed"
+
+    message_record, error_record = log_queue.get_nowait(), log_queue.get_nowait()
+    assert message_record.getMessage() == "payload {'status': 'pending'}"
+    assert message_record.args is None
+    assert error_record.exc_info is None
+    entry = json.loads(JsonFormatter().format(error_record))
+    assert "ValueError: boom" in entry["exception"]
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+from prometheus_client import REGISTRY
+import app.core.metrics as metrics
+from app.core.metrics import endpoint_label, record_spoonacular_response
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+
+def test_endpoint_label_replaces_ids():
+    assert endpoint_label("food/ingredients/9266/information") == "food/ingredients/{id}/information"
+    assert endpoint_label("recipes/complexSearch") == "recipes/complexSearch"
+
+
+def test_record_spoonacular_response_tracks_status_and_quota():
+    labels = {"endpoint": "recipes/complexSearch", "status": "200"}
+    before = REGISTRY.get_sample_value("spoonacular_requests_total", labels) or 0
+
+    record_spoonacular_response("recipes/complexSearch", 200, 0.3, {"X-Ratelimit-Requests-Remaining": "41"})
+
+    assert REGISTRY.get_sample_value("spoonacular_requests_total", labels) == before + 1
+    assert REGISTRY.get_sample_value("spoonacular_ratelimit_remaining", {"quota": "requests"}) == 41
+
+
+def test_metrics_endpoint_exposes_route_latency(client):
+    client.get("/")
+    with patch("app.api.routes.metrics.settings.metrics_auth_token", "scrape-token"):
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"}' in response.text
+
+
+def test_metrics_endpoint_requires_the_token(client):
+    # Not configured: closed, like the tasks
+    assert client.get("/metrics").status_code == 401
+    with patch("app.api.routes.metrics.settings.metrics_auth_token", "scrape-token"):
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape-token"}).status_code == 200
+
+
+def test_multiprocess_metrics_are_aggregated_across_workers(tmp_path, monkeypatch):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = "from app.core.metrics import MEAL_PLAN_GENERATIONS; MEAL_PLAN_GENERATIONS.labels(outcome='FULL_SUCCESS').inc()"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], cwd=PROJECT_ROOT, env=env, check=True)
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "MULTIPROCESS_MODE", True)
+    content, _ = metrics.render_metrics()
+
+    assert 'meal_plan_generations_total{outcome="FULL_SUCCESS"} 2.0' in content.decode()
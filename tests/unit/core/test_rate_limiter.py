@@ -0,0 +1,55 @@
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import MovingWindowRateLimiter
+from starlette.requests import Request
+from app.core.auth import create_access_token
+from app.core.rate_limiter import get_rate_limit_key
+
+
+def _request(headers: dict | None = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("203.0.113.7", 5000),
+    })
+
+
+def test_key_is_user_id_for_authenticated_requests():
+    token = create_access_token(data={"sub": "42"})
+
+    assert get_rate_limit_key(_request({"Authorization": f"Bearer {token}"})) == "user:42"
+
+
+def test_key_falls_back_to_client_ip():
+    assert get_rate_limit_key(_request()) == "ip:203.0.113.7"
+    assert get_rate_limit_key(_request({"Authorization": "Bearer forged.token.value"})) == "ip:203.0.113.7"
+
+
+def test_sqlite_storage_moving_window_is_shared_between_workers(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'limits.db'}"
+    worker_a = MovingWindowRateLimiter(storage_from_string(uri))
+    worker_b = MovingWindowRateLimiter(storage_from_string(uri))
+    limit = parse("3/minute")
+
+    assert worker_a.hit(limit, "user:1")
+    assert worker_b.hit(limit, "user:1")
+    assert worker_a.hit(limit, "user:1")
+    assert not worker_b.hit(limit, "user:1")
+    assert worker_b.hit(limit, "user:2")
+
+    reset_at, remaining = worker_a.get_window_stats(limit, "user:1")
+    assert remaining == 0
+
+
+def test_sqlite_storage_counters(tmp_path):
+    storage = storage_from_string(f"sqlite:///{tmp_path / 'limits.db'}")
+
+    assert storage.incr("key", 60) == 1
+    assert storage.incr("key", 60, amount=2) == 3
+    assert storage.get("key") == 3
+
+    storage.clear("key")
+    assert storage.get("key") == 0
+    assert storage.check()
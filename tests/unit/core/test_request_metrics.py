@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine, text
+from app.core.request_metrics import RequestMetrics, instrument_sqlalchemy, request_metrics_var, track
+
+
+def test_track_records_only_inside_a_request():
+    with track("spoonacular"):
+        pass
+
+    metrics = RequestMetrics()
+    token = request_metrics_var.set(metrics)
+    with track("spoonacular"):
+        pass
+    with track("spoonacular"):
+        pass
+    request_metrics_var.reset(token)
+
+    assert metrics.count("spoonacular") == 2
+    assert metrics.summary()["spoonacular_count"] == 2
+
+
+def test_sql_statements_are_counted():
+    instrument_sqlalchemy()
+    engine = create_engine("sqlite:///:memory:")
+    metrics = RequestMetrics()
+    token = request_metrics_var.set(metrics)
+    with engine.connect() as connection:
+        for _ in range(3):
+            connection.execute(text("SELECT 1"))
+    request_metrics_var.reset(token)
+    engine.dispose()
+
+    assert metrics.count("db") == 3
+
+
+def test_server_timing_header_format():
+    metrics = RequestMetrics()
+    metrics.record("db", 0.0125)
+    metrics.record("db", 0.0025)
+
+    header = metrics.server_timing()
+
+    assert header.startswith('db;dur=15.00;desc="2 calls", total;dur=')
+
+
+def test_middleware_adds_server_timing_and_request_id(client):
+    response = client.get("/", headers={"X-Request-ID": "req-1"})
+
+    assert response.headers["X-Request-ID"] == "req-1"
+    assert "total;dur=" in response.headers["Server-Timing"]
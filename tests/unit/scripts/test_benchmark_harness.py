@@ -0,0 +1,55 @@
+import pytest
+from app.services.spoonacular import SpoonacularService
+from benchmarks.harness import compare_results, measure, percentile
+from benchmarks.spoonacular_stub import stub_transport
+
+
+def _result(p50=10.0, p90=20.0, queries=3.0):
+    return {"p50_ms": p50, "p90_ms": p90, "queries_per_call": queries, "alloc_peak_kib": 100.0}
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_flags_latency_and_query_regressions():
+    baseline = {"suggestions": _result(), "detail": _result()}
+    current = {"suggestions": _result(p50=10.5), "detail": _result(p90=30.0, queries=4.0)}
+
+    _, regressions = compare_results(baseline, current, threshold=0.10)
+
+    assert len(regressions) == 2
+    assert all(regression.startswith("detail:") for regression in regressions)
+
+
+@pytest.mark.asyncio
+async def test_measure_reports_percentiles_and_allocations():
+    calls = []
+
+    async def call(i):
+        calls.append(i)
+        return [0] * 1000
+
+    result = await measure("noop", call, iterations=10, warmup=1, alloc_iterations=2)
+
+    assert len(calls) == 13
+    assert result.iterations == 10
+    assert result.min_ms <= result.p50_ms <= result.p99_ms <= result.max_ms
+    assert result.queries_per_call == 0
+    assert result.alloc_peak_kib > 0
+
+
+@pytest.mark.asyncio
+async def test_stub_returns_the_same_recipes_for_the_same_search(monkeypatch):
+    monkeypatch.setattr(SpoonacularService, "transport", stub_transport())
+    service = SpoonacularService()
+    service.headers = {}
+
+    first = await service.search_recipes(type="breakfast", diet="vegan", number=3)
+    second = await service.search_recipes(type="breakfast", diet="vegan", number=3)
+
+    assert [r["id"] for r in first["results"]] == [r["id"] for r in second["results"]]
+    assert all(r["vegan"] and r["dishTypes"] == ["breakfast"] for r in first["results"])
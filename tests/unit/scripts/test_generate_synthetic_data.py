@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from app.core.meal_plan_config import MealPlanConfig
+from app.core.security import verify_password
+from app.models import DietType, MealItem, Recipe, RecipesIngredient, User
+from app.scripts.generate_synthetic_data import SYNTHETIC_PASSWORD, generate
+
+
+def _generate(path, seed=7):
+    url = f"sqlite:///{path}"
+    counts = generate(url, recipes=300, ingredients=80, users=40, seed=seed, batch_size=100, create_schema=True)
+    return url, counts
+
+
+def _recipes_snapshot(url):
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        rows = connection.execute(select(Recipe.id, Recipe.calories, Recipe.vegan).order_by(Recipe.id)).all()
+        ingredients = connection.scalar(select(func.sum(RecipesIngredient.ingredient_id)))
+    engine.dispose()
+    return rows, ingredients
+
+
+def test_same_seed_generates_the_same_data(tmp_path):
+    first_url, first_counts = _generate(tmp_path / "first.db")
+    second_url, second_counts = _generate(tmp_path / "second.db")
+    other_url, _ = _generate(tmp_path / "other.db", seed=8)
+
+    assert first_counts == second_counts
+    assert _recipes_snapshot(first_url) == _recipes_snapshot(second_url)
+    assert _recipes_snapshot(first_url) != _recipes_snapshot(other_url)
+
+
+def test_generated_data_matches_the_app_schema(tmp_path):
+    url, counts = _generate(tmp_path / "data.db")
+    engine = create_engine(url)
+
+    with Session(engine) as session:
+        diets = {diet.name: diet.id for diet in session.scalars(select(DietType))}
+        user = session.scalars(select(User)).first()
+        meal_items = session.scalar(select(func.count(MealItem.id)))
+
+    assert counts["recipes"] == 300
+    assert counts["recipes_ingredients"] >= 300 * 5
+    assert diets["vegan"] == MealPlanConfig.VEGAN_DIET_ID
+    assert diets["low fodmap"] == MealPlanConfig.LOW_FODMAP_DIET_ID
+    assert verify_password(SYNTHETIC_PASSWORD, user.hashed_password)
+    assert meal_items == counts["meal_plans"] * MealPlanConfig.DAYS_IN_PLAN * 3
+    engine.dispose()
+
+
+def test_meal_plans_without_breakfasts_or_main_courses_are_rejected(tmp_path):
+    url = f"sqlite:///{tmp_path / 'empty.db'}"
+
+    with pytest.raises(ValueError, match="breakfast and main course"):
+        generate(url, recipes=0, ingredients=10, users=3, create_schema=True)
+
+    counts = generate(
+        f"sqlite:///{tmp_path / 'no_plans.db'}", recipes=0, ingredients=10, users=3,
+        create_schema=True, with_meal_plan_ratio=0,
+    )
+    assert counts["users"] == 3
@@ -0,0 +1,23 @@
+import argparse
+import pytest
+from benchmarks.load_test import Sample, parse_mix, parse_stages, summarize
+
+
+def test_parse_stages_and_mix():
+    assert parse_stages("10:30,50") == [(10, 30.0), (50, 30.0)]
+    assert parse_mix("meal_plan=3,recipe") == {"meal_plan": 3.0, "recipe": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("unknown=1")
+
+
+def test_summarize_reports_throughput_errors_and_percentiles_per_endpoint():
+    samples = [Sample("GET /meal_plans/me", i / 1000, 200) for i in range(1, 11)]
+    samples += [Sample("POST /login", 0.5, 401), Sample("POST /login", 0.5, None)]
+
+    summary = summarize(samples, seconds=2)
+
+    assert summary["GET /meal_plans/me"]["rps"] == 5
+    assert summary["GET /meal_plans/me"]["p90_ms"] == 9
+    assert summary["GET /meal_plans/me"]["error_rate"] == 0
+    assert summary["POST /login"]["error_rate"] == 1
+    assert summary["ALL"]["requests"] == 12
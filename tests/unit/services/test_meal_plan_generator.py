@@ -1,3 +1,5 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
 from app.core.errors import ErrorCode
@@ -90,8 +92,8 @@ class TestMealPlanGenerator:
             
             mock_get_db_recipes.return_value = []
             
-            def get_or_create_side_effect(db, recipe_data):
-                return recipe_factory(recipe_data['id'], recipe_data['title'])
+            def get_or_create_side_effect(db, recipe_data, existing_recipes=None):
+                return recipe_factory(recipe_data['id'], recipe_data['title']), True
             mock_get_or_create.side_effect = get_or_create_side_effect
 
             generator = MealPlanGenerator(mock_user_preferences, mock_db, mock_spoon_service)
@@ -120,4 +122,123 @@ class TestMealPlanGenerator:
 
             assert exc_info.value.code == ErrorCode.PREFERENCES_TOO_STRICT
             mock_get_db_recipes.assert_called()
-            mock_spoon_service.search_recipes.assert_called()
\ No newline at end of file
+            mock_spoon_service.search_recipes.assert_called()
+
+    async def test_generate_samples_the_pool_of_matching_preferences(
+        self, mock_user_preferences, mock_db, mock_spoon_service
+    ):
+        def named(name):
+            item = MagicMock()
+            item.name = name
+            return item
+
+        pool_size = MealPlanConfig.DAYS_IN_PLAN * MealPlanConfig.RECIPE_POOL_SIZE_FACTOR
+        breakfasts = [recipe_factory(i, f"Breakfast {i}") for i in range(1, pool_size + 1)]
+        main_courses = [recipe_factory(i, f"Lunch/Dinner {i}") for i in range(100, 100 + pool_size * 2)]
+        mock_user_preferences.intolerances = [named("Peanut"), named("Dairy")]
+        other_user = MagicMock(spec=UserPreferences)
+        other_user.user_id = 2
+        other_user.calories_goal = 2030.0
+        other_user.diet_type = mock_user_preferences.diet_type
+        other_user.intolerances = [named("dairy"), named("peanut")]
+        other_user.cuisines = []
+
+        def db_side_effect(db, exclude, prefs, types, limit, min_c, max_c):
+            recipes = breakfasts if "breakfast" in types else [r for r in main_courses if r.id not in exclude]
+            return recipes[:limit]
+
+        with patch("app.services.meal_plan_generator.get_recipe_suggestions_from_db", side_effect=db_side_effect) as mock_get_db_recipes, \
+            patch("app.services.meal_plan_generator.get_recipes_with_dish_types", return_value=breakfasts + main_courses) as mock_load, \
+            patch("app.services.meal_plan_generator.user_has_complex_intolerances", return_value=False):
+
+            await MealPlanGenerator(mock_user_preferences, mock_db, mock_spoon_service).generate()
+            sampled_breakfasts = set()
+            for _ in range(10):
+                plan, status = await MealPlanGenerator(other_user, mock_db, mock_spoon_service).generate()
+                assert status == PlanGenerationStatus.FULL_SUCCESS
+                assert all(day[1].id != day[2].id for day in plan.values())
+                sampled_breakfasts |= {day[0].id for day in plan.values()}
+
+            assert mock_get_db_recipes.call_count == 3
+            assert mock_load.call_count == 10
+            # Plans are samples of the whole pool, not the same few recipes reordered
+            assert MealPlanConfig.DAYS_IN_PLAN < len(sampled_breakfasts) <= pool_size
+
+            # Deleted recipes shrink the pool; it is searched again once a slot has too few for a plan
+            mock_load.return_value = breakfasts[-(MealPlanConfig.DAYS_IN_PLAN - 1):] + main_courses
+            await MealPlanGenerator(other_user, mock_db, mock_spoon_service).generate()
+            assert mock_get_db_recipes.call_count == 6
+            mock_spoon_service.search_recipes.assert_not_called()
+
+    async def test_dinner_takes_spare_lunch_candidates_before_calling_the_api(
+        self, mock_user_preferences, mock_db, mock_spoon_service
+    ):
+        breakfasts = [recipe_factory(i, f"Breakfast {i}") for i in range(1, MealPlanConfig.DAYS_IN_PLAN + 1)]
+        main_courses = [recipe_factory(i, f"Lunch/Dinner {i}") for i in range(100, 100 + MealPlanConfig.DAYS_IN_PLAN * 2)]
+
+        def db_side_effect(db, exclude, prefs, types, limit, min_c, max_c):
+            recipes = breakfasts if "breakfast" in types else [r for r in main_courses if r.id not in exclude]
+            return recipes[:limit]
+
+        with patch("app.services.meal_plan_generator.get_recipe_suggestions_from_db", side_effect=db_side_effect), \
+            patch("app.services.meal_plan_generator.user_has_complex_intolerances", return_value=False):
+            plan, status = await MealPlanGenerator(mock_user_preferences, mock_db, mock_spoon_service).generate()
+
+        assert status == PlanGenerationStatus.FULL_SUCCESS
+        assert len({recipe.id for day in plan.values() for recipe in (day[1], day[2])}) == MealPlanConfig.DAYS_IN_PLAN * 2
+        mock_spoon_service.search_recipes.assert_not_called()
+
+    @pytest.mark.parametrize("main_courses, expected_days", [(8, 3), (0, None)])
+    async def test_generate_stops_calling_the_api_when_the_budget_is_spent(
+        self, mock_user_preferences, mock_db, mock_spoon_service, main_courses, expected_days
+    ):
+        breakfasts = [recipe_factory(i, f"Breakfast {i}") for i in range(1, MealPlanConfig.DAYS_IN_PLAN + 1)]
+        mains = [recipe_factory(i, f"Lunch/Dinner {i}") for i in range(10, 10 + main_courses)]
+
+        def db_side_effect(db, exclude, prefs, types, limit, min_c, max_c):
+            return list(breakfasts) if "breakfast" in types else [r for r in mains if r.id not in exclude][:limit]
+
+        async def hanging_search(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        mock_spoon_service.search_recipes.side_effect = hanging_search
+        with patch("app.services.meal_plan_generator.get_recipe_suggestions_from_db", side_effect=db_side_effect), \
+            patch("app.services.meal_plan_generator.user_has_complex_intolerances", return_value=False):
+            generator = MealPlanGenerator(mock_user_preferences, mock_db, mock_spoon_service, budget_seconds=0.05)
+            started = time.monotonic()
+
+            if expected_days is None:
+                with pytest.raises(MealPlanGeneratorError) as exc_info:
+                    await generator.generate()
+                assert exc_info.value.code == ErrorCode.MEAL_PLAN_DEADLINE_EXCEEDED
+            else:
+                plan, status = await generator.generate()
+                assert status == PlanGenerationStatus.PARTIAL_SUCCESS
+                assert len(plan) == expected_days
+
+        assert time.monotonic() - started < 1
+        # Lunch (or dinner, when lunch had enough in the DB) spends the budget, the next slots skip the API
+        assert mock_spoon_service.search_recipes.call_count == 1
+
+    async def test_recipes_are_not_imported_once_the_budget_is_spent(
+        self, mock_user_preferences, mock_db, mock_spoon_service
+    ):
+        stored = recipe_factory(100, "Stored")
+        results = [{"id": i, "title": f"API {i}"} for i in range(1, 11)] + [{"id": 100, "title": "Stored"}]
+
+        def slow_import(db, recipe_data, existing_recipes):
+            if recipe_data["id"] in existing_recipes:
+                return existing_recipes[recipe_data["id"]], False
+            time.sleep(0.03)
+            return recipe_factory(recipe_data["id"], recipe_data["title"]), True
+
+        with patch("app.services.meal_plan_generator.get_recipes_by_spoonacular_ids", return_value={100: stored}), \
+            patch("app.services.meal_plan_generator.get_or_create_spoonacular_recipe", side_effect=slow_import) as mock_import:
+            generator = MealPlanGenerator(mock_user_preferences, mock_db, mock_spoon_service, budget_seconds=0.05)
+            generator.deadline = time.monotonic() + 0.05
+            found = {}
+            generator._store_api_results(results, None, set(), found, limit=20)
+
+        assert generator.deadline_exceeded
+        assert mock_import.call_count <= 4
+        assert stored.id in found and len(found) == mock_import.call_count